@@ -0,0 +1,136 @@
+"""Chooses which captured frames are processed
+    * Frames that will be skipped are only grabbed, never decoded. Video
+    files skip long runs of frames by seeking instead.
+    * With a fixed rate, a frame is processed every FRAME_INTERVAL seconds
+    (of wall time for cameras, of video time for files).
+    * Frames of cameras are stamped with the time they are grabbed. Frames of
+    video files are stamped with their position in the video after the time
+    the recording started, so replays line up with the recorded IMU log.
+    * With an adaptive rate, the interval follows the measured processing
+    latency, so as many frames are processed as the CPU allows.
+    * The number of processed, skipped and seeked over frames and the
+    latency are kept as metrics.
+"""
+
+# ================ Built-in Imports ================ #
+
+from time import time
+
+# ================ Third Party Imports ================ #
+
+import cv2 as cv
+
+# ================ Global Variables ================ #
+
+# Weight of the newest measurement in the latency average
+ALPHA = 0.2
+
+
+# ================ Class definition ================ #
+
+class FrameScheduler:
+
+    def __init__(self, cap, interval=1, adaptive=False, seek_threshold=30, clock=time, start_time=None):
+        """
+        @param: cap (VideoCapture): frame source
+        @param: interval (float): seconds between processed frames with a fixed rate
+        @param: adaptive (bool): follow the processing latency instead of interval
+        @param: seek_threshold (int): video files seek instead of grabbing when more frames are skipped
+        @param: clock (callable): returns the current time in seconds
+        @param: start_time (float): Unix time of the first frame of a video file, defaults to the
+                time its first frame is grabbed. Unused for cameras
+        """
+        self.cap = cap
+        self.interval = interval
+        self.adaptive = adaptive
+        self.seek_threshold = seek_threshold
+        self.clock = clock
+
+        # Video files know their frame count, cameras do not
+        self.fps = cap.get(cv.CAP_PROP_FPS) or 0
+        self.is_file = cap.get(cv.CAP_PROP_FRAME_COUNT) > 0 and self.fps > 0
+
+        self.position = 0
+        self.last_processed_at = None
+        self.start_time = start_time
+
+        # Metrics
+        self.processed = 0
+        self.skipped = 0
+        self.seeked = 0
+        self.latency = None
+
+    def current_interval(self) -> float:
+        if self.adaptive:
+            return self.latency or 0
+        return self.interval
+
+    def record(self, seconds):
+        """Record the time it took to process a frame
+
+        @param: seconds (float): processing time of a frame
+        """
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency = (1 - ALPHA) * self.latency + ALPHA * seconds
+
+    def metrics(self) -> dict:
+        return {'processed': self.processed,
+                'skipped': self.skipped,
+                'seeked': self.seeked,
+                'latency': self.latency}
+
+    def __retrieve(self, grabbed_at):
+        ret, img = self.cap.retrieve()
+        if not ret:
+            return None
+        self.processed += 1
+        self.last_processed_at = grabbed_at
+        return grabbed_at, img
+
+    def __next_file_frame(self):
+        # Frames of video time between processed frames
+        step = max(int(round(self.current_interval() * self.fps)), 1) if self.processed else 1
+        skip = step - 1
+
+        if skip > self.seek_threshold:
+            self.cap.set(cv.CAP_PROP_POS_FRAMES, self.position + skip)
+            self.seeked += skip
+        else:
+            for _ in range(skip):
+                if not self.cap.grab():
+                    return None
+                self.skipped += 1
+        self.position += skip
+
+        if not self.cap.grab():
+            return None
+        self.position += 1
+        return self.__retrieve(self.__video_time())
+
+    def __video_time(self):
+        # capture time of the grabbed frame of a video file
+        if self.start_time is None:
+            self.start_time = self.clock()
+        msec = self.cap.get(cv.CAP_PROP_POS_MSEC) or (self.position - 1) / self.fps * 1000
+        return self.start_time + msec / 1000
+
+    def __next_camera_frame(self):
+        while True:
+            if not self.cap.grab():
+                return None
+            now = self.clock()
+
+            if self.last_processed_at is None or now >= self.last_processed_at + self.current_interval():
+                return self.__retrieve(now)
+            self.skipped += 1
+
+    def next_frame(self):
+        """Next Frame
+            Skips frames until one is due and decodes it
+        @return: (capture time, frame), None at the end of the stream
+        """
+        if self.is_file:
+            return self.__next_file_frame()
+        return self.__next_camera_frame()
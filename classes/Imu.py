@@ -1,56 +1,270 @@
 """Python wrapper to parse the IMU binary data
     Module to read binary data outputted from the IMU and convert it to a usable python object
-    Uses a predefined MatLab parser to parse through the binary data.
+    Uses the native MIP parser (a NumPy port of 3rd_party_scripts/parse_imu.m) to parse through the binary data.
     The parsed data is converted into a dict containing all of the IMU data."""
 
 # ================ Built-in Imports ================ #
 
-from time import time
-import config
-import os
+import logging
+import threading
+from math import atan2, cos, sin
+from types import MappingProxyType
 
 # ================ Third Party Imports ================ #
 
-import matlab.engine as m_engine
 import numpy as np
 
+# ================ User Imports ================ #
+
+from classes import imu_cache, mip_parser
+from classes.RingBuffer import RingBuffer
+
 # ================ Authorship ================ #
 
 __author__ = "Chris Patenaude"
 __contributors__ = ["Chris Patenaude", "Gabriel Michael", "Gregory Sanchez"]
 
+# ================ Global Variables ================ #
+
+# Number of bytes read from the end of the IMU file on each request
+TAIL_BYTES = 5000
+
+# Number of decoded samples returned in follow mode, about as many as fit in TAIL_BYTES
+HISTORY_SAMPLES = 36
+
+# Number of decoded samples kept in the ring buffers in follow mode
+BUFFER_SAMPLES = 4096
+
+# Seconds the background reader waits between reads of the IMU file
+POLL_INTERVAL = 0.01
+
+ATTITUDE_COLUMNS = ('nuc_time', 'roll', 'pitch', 'yaw')
+
+logger = logging.getLogger(__name__)
+
+
+# ================ Functions ================ #
+
+
+def extract_orientation(parsed: dict) -> dict:
+    """Extract Orientation
+        Picks the orientation fields out of the parser output
+    @param: parsed (dict): output of mip_parser.parse_imu / TailReader.read
+    @return: dict: 1D arrays of the orientation fields, missing fields are empty
+    """
+    imu = parsed.get('IMU', {})
+    gnss = parsed.get('GNSS', {})
+    empty = np.zeros(0)
+
+    return {'heading': gnss.get('velocity_north_east_down_frame', {}).get('heading', empty),
+            'pitch': imu.get('cf_euler_angles', {}).get('pitch', empty),
+            'roll': imu.get('cf_euler_angles', {}).get('roll', empty),
+            'yaw': imu.get('cf_euler_angles', {}).get('yaw', empty),
+            'nuc_time': imu.get('nuc_time', empty)}
+
+
+def make_snapshot(heading, pitch, roll, yaw, nuc_time) -> MappingProxyType:
+    """Make Snapshot
+        Builds a read-only orientation dict in the format of get_last_valid_orientation
+    @return: MappingProxyType: read-only dict of (immutable) NumPy float64 scalars
+    """
+    return MappingProxyType({'heading': np.float64(heading),
+                             'pitch': np.float64(pitch),
+                             'roll': np.float64(roll),
+                             'yaw': np.float64(yaw),
+                             'nuc_time': np.float64(nuc_time)})
+
 
 # ================ Class definition ================ #
 
 class Imu:
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, follow=False, history=HISTORY_SAMPLES, buffer_samples=BUFFER_SAMPLES,
+                 cache=False, cache_dir=None):
+        """
+        @param: filepath (str): path to the IMU binary file
+        @param: follow (bool): keep the file open and only parse the bytes appended since the last request
+        @param: history (int): number of samples returned per field in follow mode
+        @param: buffer_samples (int): number of samples kept in the ring buffers in follow mode
+        @param: cache (bool): decode the whole (recorded) file once into a columnar cache
+                and memory-map it, orientation_at then looks up the cached samples
+        @param: cache_dir (str): directory of the cache, defaults to the directory of the file
+        """
         super().__init__()
         self.filepath = filepath
-        start_time = time()
-        print("Initializing IMU...")
-        self.eng = m_engine.start_matlab()
-        print("Initialization Complete. Time elapsed: {0}s".format(time() - start_time))
-        self.eng.addpath(os.path.join(config.ROOT_DIR, '3rd_party_scripts'))
+        self.follow = follow
+        self.history = history
+
+        self.reader = None
+        self.attitudes = RingBuffer(buffer_samples, ATTITUDE_COLUMNS)
+        self.headings = RingBuffer(buffer_samples, ('heading',))
+
+        # Newest attitude, replaced as a whole so readers never need a lock
+        self.latest = None
+
+        self.__thread = None
+        self.__stop_event = threading.Event()
+
+        # nuc_time, roll, pitch, yaw and heading of every sample of the file
+        self.cached = imu_cache.load_cache(filepath, cache_dir) if cache else None
+
+        if follow:
+            self.reader = mip_parser.TailReader(filepath, parse_nuc_timestamps=True, start_bytes=TAIL_BYTES)
+
+    def start(self, poll_interval=POLL_INTERVAL):
+        """Start
+            Starts a background thread that continuously decodes newly written packets
+            into the ring buffers and publishes the newest attitude in self.latest.
+            Implies follow mode.
+        @param: poll_interval (float): seconds to wait between reads of the IMU file
+        """
+        if self.__thread is not None:
+            return
+
+        if self.reader is None:
+            self.follow = True
+            self.reader = mip_parser.TailReader(self.filepath, parse_nuc_timestamps=True, start_bytes=TAIL_BYTES)
+
+        # Decode what is already in the file so a snapshot is available right away
+        self.__ingest()
+
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, args=(poll_interval,),
+                                         name='ImuReader', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop
+            Stops the background thread started by start
+        """
+        if self.__thread is None:
+            return
+
+        self.__stop_event.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def close(self):
+        self.stop()
+        if self.reader is not None:
+            self.reader.close()
+
+    def __run(self, poll_interval):
+        while not self.__stop_event.is_set():
+            try:
+                self.__ingest()
+            except Exception:
+                # a bad chunk must not stop the attitude from being updated
+                logger.exception("Could not ingest the IMU data of %s", self.filepath)
+            self.__stop_event.wait(poll_interval)
+
+    def __ingest(self):
+        """Ingest
+            Decodes the newly written packets into the ring buffers and publishes the newest attitude
+        """
+        new_samples = extract_orientation(self.reader.read())
+
+        if len(new_samples['heading']):
+            self.headings.extend(new_samples['heading'])
+
+        # attitudes are only complete when every column has a value for each sample
+        lengths = {len(new_samples[column]) for column in ATTITUDE_COLUMNS}
+        new_attitudes = lengths.pop() if len(lengths) == 1 else 0
+        if new_attitudes:
+            self.attitudes.extend(np.column_stack([new_samples[column] for column in ATTITUDE_COLUMNS]))
+
+        if len(self.attitudes) and (len(new_samples['heading']) or new_attitudes):
+            (nuc_time, roll, pitch, yaw) = self.attitudes.tail(1)[0]
+            heading = self.headings.tail(1)[0, 0] if len(self.headings) else np.nan
+            self.latest = make_snapshot(heading, pitch, roll, yaw, nuc_time)
+
+    def get_latest_attitude(self):
+        """Get Latest Attitude
+            Newest decoded attitude without any file I/O or parsing.
+            Only updated in follow mode, continuously once start has been called.
+        @return: MappingProxyType: read-only dict in the format of get_last_valid_orientation,
+                 None if no sample was decoded yet
+        """
+        return self.latest
+
+    def first_nuc_time(self):
+        """First Nuc Time
+        @return: float: nuc_time of the first cached (or buffered) sample, None if there is none
+        """
+        samples = self.cached if self.cached is not None else self.attitudes.window()
+        return float(samples[0, 0]) if samples.shape[1] else None
+
+    def orientation_at(self, t):
+        """Orientation At
+            Attitude at time t interpolated from the buffered samples (or the cached
+            samples of the whole file when the cache is enabled).
+            The bracketing samples are found with a binary search on nuc_time and
+            roll, pitch and yaw are interpolated linearly (yaw along the shortest arc).
+            Times outside the buffered range get the nearest sample.
+        @param: t (float): time as a MatLab datenum, see mip_parser.unix_to_datenum
+        @return: MappingProxyType: read-only dict in the format of get_last_valid_orientation,
+                 None if no sample was decoded yet
+        """
+        if self.cached is not None:
+            samples = self.cached
+        else:
+            samples = self.attitudes.window()
+        n = samples.shape[1]
+        if n == 0:
+            return None
+
+        i = int(samples[0].searchsorted(t))
+
+        if self.cached is not None:
+            # Heading of the last GNSS packet before the sample
+            heading = float(samples[4, min(max(i - 1, 0), n - 1)])
+        else:
+            heading = self.latest['heading'] if self.latest is not None else np.nan
+
+        if i == 0 or i == n:
+            (nuc_time, roll, pitch, yaw) = samples[:4, min(i, n - 1)].tolist()
+            return make_snapshot(heading, pitch, roll, yaw, nuc_time)
+
+        ((t0, t1), (roll0, roll1), (pitch0, pitch1), (yaw0, yaw1)) = samples[:4, i - 1:i + 1].tolist()
+        w = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+
+        d_yaw = atan2(sin(yaw1 - yaw0), cos(yaw1 - yaw0))
+        yaw = yaw0 + w * d_yaw
+        yaw = atan2(sin(yaw), cos(yaw))
+
+        return make_snapshot(heading,
+                             pitch0 + w * (pitch1 - pitch0),
+                             roll0 + w * (roll1 - roll0),
+                             yaw,
+                             t)
 
     def get_last_orientation(self) -> dict:
         """Get Last Orientation
             Grabs the last set of binary values from the binary file.
-            Opens and reads the file through MatLab itself to then send it through the parser
-            Documentation of the DsFileReader: https://www.mathworks.com/help/matlab/ref/matlab.io.datastore.dsfilereader-class.html
+            Reads the tail of the file (or only the appended bytes in follow mode)
+            and sends it through the native MIP parser
         @return: dict: data containing the orientations
         """
 
-        orientation = self.eng.parse_imu(self.filepath, self.eng.logical(1))
+        if self.follow:
+            if self.__thread is None:
+                self.__ingest()
+            attitudes = self.attitudes.tail(self.history)
+            orientation = {column: self.attitudes.column(attitudes, column) for column in ATTITUDE_COLUMNS}
+            orientation['heading'] = self.headings.tail(self.history)[:, 0]
+        else:
+            orientation = extract_orientation(mip_parser.parse_imu(mip_parser.read_tail(self.filepath, TAIL_BYTES),
+                                                                   parse_nuc_timestamps=True))
 
+        # Shapes match the MatLab engine output: fields are row vectors, nuc_time a column vector
         # It looks like the valid data field was removed
-        new_dict = {'heading': np.asarray(orientation['GNSS']['velocity_north_east_down_frame']['heading']),
-                    'pitch': np.asarray(orientation['IMU']['cf_euler_angles']['pitch']),
-                    'roll': np.asarray(orientation['IMU']['cf_euler_angles']['roll']),
-                    'yaw': np.asarray(orientation['IMU']['cf_euler_angles']['yaw']),
+        new_dict = {'heading': np.asarray([orientation['heading']]),
+                    'pitch': np.asarray([orientation['pitch']]),
+                    'roll': np.asarray([orientation['roll']]),
+                    'yaw': np.asarray([orientation['yaw']]),
                     # 'valid_heading':np.asarray(orientation['IMU']['cf_euler_angles']['valid_flags']),
                     'valid_orientation': 1,
-                    'nuc_time': np.asarray(orientation['IMU']['nuc_time'])
+                    'nuc_time': np.asarray(orientation['nuc_time']).reshape(-1, 1)
                     }
         return new_dict
 
@@ -78,7 +292,7 @@ class Imu:
                       'pitch': np.asarray(orientation_data['pitch'][0][-1]),
                       'roll': np.asarray(orientation_data['roll'][0][-1]),
                       'yaw': np.asarray(orientation_data['yaw'][0][-1]),
-                      'nuc_time': np.asarray(orientation_data['nuc_time'][0][-1])
+                      'nuc_time': np.asarray(orientation_data['nuc_time'][-1][0])
                       }
 
         return valid_data
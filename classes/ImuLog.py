@@ -0,0 +1,209 @@
+"""Random access to recorded IMU_timestamped* logs
+    * build_index scans a log once through mmap and writes a sidecar index
+    holding the byte offset, descriptor set, length and nuc_time of every
+    valid packet.
+    * ImuLog memory-maps the log and its index. Timestamps are found with a
+    binary search on the index and a time range is decoded straight from the
+    mapped file into a NumPy structured array of nuc_time/roll/pitch/yaw/heading.
+"""
+
+# ================ Built-in Imports ================ #
+
+import mmap
+import os
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+# ================ User Imports ================ #
+
+from classes import mip_parser
+
+# ================ Global Variables ================ #
+
+INDEX_SUFFIX = '.idx.npy'
+
+INDEX_DTYPE = np.dtype([('offset', '<u8'),
+                        ('descriptor', 'u1'),
+                        ('length', 'u1'),
+                        ('nuc_time', '<f8')])
+
+ORIENTATION_DTYPE = np.dtype([('nuc_time', '<f8'),
+                              ('roll', '<f8'),
+                              ('pitch', '<f8'),
+                              ('yaw', '<f8'),
+                              ('heading', '<f8')])
+
+# Bytes scanned at a time while building an index
+CHUNK_BYTES = 1 << 24
+
+IMU_DESCRIPTOR = 0x80
+GNSS_DESCRIPTOR = 0x81
+
+
+# ================ Functions ================ #
+
+
+def index_path_for(filepath: str) -> str:
+    return filepath + INDEX_SUFFIX
+
+
+def build_index(filepath: str, index_path: str = None) -> np.ndarray:
+    """Build Index
+        Scans the log chunk by chunk through mmap and saves the index of its valid packets
+    @param: filepath (str): path to the IMU_timestamped* log
+    @param: index_path (str): where to save the index, defaults to the log path + INDEX_SUFFIX
+    @return: ndarray: the index, an INDEX_DTYPE array in file order
+    """
+    index_path = index_path or index_path_for(filepath)
+    chunks = []
+
+    with open(filepath, 'rb') as fd:
+        size = os.fstat(fd.fileno()).st_size
+        if size > 0:
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = np.frombuffer(mm, dtype=np.uint8)
+
+                start = 0
+                while start < size:
+                    end = min(start + CHUNK_BYTES, size)
+                    header = mip_parser.find_headers(data[start:end], parse_nuc_timestamps=True)
+
+                    chunk = np.zeros(len(header['index']), dtype=INDEX_DTYPE)
+                    chunk['offset'] = header['index'] + start
+                    chunk['descriptor'] = header['descriptor']
+                    chunk['length'] = header['length']
+                    chunk['nuc_time'] = header['ts']
+                    chunks.append(chunk)
+
+                    if end == size:
+                        break
+
+                    # Start the next chunk where an incomplete packet could begin
+                    start += max(mip_parser.packets_end(header),
+                                 end - start - mip_parser.MAX_PACKET_LENGTH - mip_parser.NUC_TIMESTAMP_LENGTH)
+                del data
+
+    index = np.concatenate(chunks) if chunks else np.zeros(0, dtype=INDEX_DTYPE)
+    # through a file object, np.save would add .npy to a path without it
+    with open(index_path, 'wb') as fd:
+        np.save(fd, index)
+    return index
+
+
+# ================ Class definition ================ #
+
+class ImuLog:
+
+    def __init__(self, filepath, index_path=None):
+        """
+        @param: filepath (str): path to the IMU_timestamped* log
+        @param: index_path (str): path to the sidecar index, it is (re)built when
+                missing or older than the log
+        """
+        self.filepath = filepath
+        self.index_path = index_path or index_path_for(filepath)
+
+        if (not os.path.exists(self.index_path)
+                or os.path.getmtime(self.index_path) < os.path.getmtime(filepath)):
+            build_index(filepath, self.index_path)
+
+        index = np.load(self.index_path, mmap_mode='r')
+        self.imu_index = np.asarray(index[index['descriptor'] == IMU_DESCRIPTOR])
+        self.gnss_index = np.asarray(index[index['descriptor'] == GNSS_DESCRIPTOR])
+
+        self.fd = open(filepath, 'rb')
+        size = os.fstat(self.fd.fileno()).st_size
+        self.mm = mmap.mmap(self.fd.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else None
+        self.data = np.frombuffer(self.mm, dtype=np.uint8) if size > 0 else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.imu_index)
+
+    def close(self):
+        self.data = None
+        if self.mm is not None:
+            self.mm.close()
+        self.fd.close()
+
+    @property
+    def start_time(self):
+        return self.imu_index['nuc_time'][0] if len(self) else None
+
+    @property
+    def end_time(self):
+        return self.imu_index['nuc_time'][-1] if len(self) else None
+
+    def seek(self, t) -> int:
+        """Seek
+            Position of the first IMU sample at or after t
+        @param: t (float): time as a MatLab datenum
+        @return: int: sample position, len(self) if t is past the end of the log
+        """
+        return int(self.imu_index['nuc_time'].searchsorted(t))
+
+    def __decode(self, entries, fname, subfields) -> dict:
+        """Decode
+            Decodes fields of the indexed packets straight from the mapped log
+        @param: entries (ndarray): INDEX_DTYPE entries of a single descriptor set
+        @param: fname (str): field name, e.g. 'cf_euler_angles'
+        @param: subfields (tuple): subfield names to decode
+        @return: dict: float64 array per subfield, NaN for packets without the field
+        """
+        values = {sf_name: np.full(len(entries), np.nan) for sf_name in subfields}
+
+        # Packets of a descriptor set with the same length share their field layout
+        for length in np.unique(entries['length']):
+            same_layout = entries['length'] == length
+            offsets = entries['offset'][same_layout].astype(np.int64)
+
+            # One row per packet starting at the descriptor set byte
+            rows = self.data[offsets[:, None] + 2 + np.arange(int(length) + 2)]
+            dtype, fields = mip_parser.packet_dtype(int(entries['descriptor'][0]), rows[0, 2:])
+            packets = rows.view(dtype)[:, 0]
+
+            for sf_name in subfields:
+                name = fname + '.' + sf_name
+                if name in dtype.names:
+                    values[sf_name][same_layout] = packets[name]
+
+        return values
+
+    def slice(self, t0, t1) -> np.ndarray:
+        """Slice
+            Orientation samples with t0 <= nuc_time < t1. Each IMU sample gets the
+            heading of the last GNSS packet at or before it (NaN if there is none).
+        @param: t0 (float): start time as a MatLab datenum
+        @param: t1 (float): end time as a MatLab datenum
+        @return: ndarray: ORIENTATION_DTYPE structured array
+        """
+        return self.slice_samples(self.seek(t0), self.seek(t1))
+
+    def slice_samples(self, start, stop) -> np.ndarray:
+        """Slice Samples
+            Orientation samples start to stop (exclusive), see slice
+        """
+        entries = self.imu_index[start:stop]
+        out = np.zeros(len(entries), dtype=ORIENTATION_DTYPE)
+        if len(entries) == 0:
+            return out
+
+        out['nuc_time'] = entries['nuc_time']
+        euler = self.__decode(entries, 'cf_euler_angles', ('roll', 'pitch', 'yaw'))
+        for name in ('roll', 'pitch', 'yaw'):
+            out[name] = euler[name]
+
+        # GNSS packets from the last one before the range up to the end of the range
+        gnss_times = self.gnss_index['nuc_time']
+        g0 = max(int(gnss_times.searchsorted(entries['nuc_time'][0], side='right')) - 1, 0)
+        g1 = int(gnss_times.searchsorted(entries['nuc_time'][-1], side='right'))
+        gnss = self.gnss_index[g0:g1]
+
+        out['heading'] = np.nan
+        if len(gnss):
+            heading = self.__decode(gnss, 'velocity_north_east_down_frame', ('heading',))['heading']
+            last = gnss['nuc_time'].searchsorted(entries['nuc_time'], side='right') - 1
+            out['heading'] = np.where(last >= 0, heading[np.maximum(last, 0)], np.nan)
+
+        return out
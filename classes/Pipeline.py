@@ -0,0 +1,180 @@
+"""Threaded processing pipeline
+    * Stages run on their own worker thread and are connected by bounded
+    queues, so capture, orientation correction and inference overlap and
+    throughput approaches the one of the slowest stage.
+    * Queues drop their oldest item when full: a slow stage always works on
+    the freshest frames instead of falling further behind.
+    * Closing a queue signals the end of the stream, it propagates down the
+    pipeline once the items already queued have been processed.
+"""
+
+# ================ Built-in Imports ================ #
+
+import threading
+from collections import deque
+
+
+# ================ Class definition ================ #
+
+class QueueClosed(Exception):
+    """Raised when getting from a closed and drained queue"""
+
+
+class DropOldestQueue:
+
+    def __init__(self, maxsize):
+        """
+        @param: maxsize (int): number of items kept before the oldest ones are dropped
+        """
+        self.items = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.closed = False
+        # Number of items dropped because the queue was full
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get_many(self, max_items=1, timeout=None) -> list:
+        """Get Many
+            Waits for at least one item and returns up to max_items of the oldest ones
+        @param: max_items (int): maximum number of items returned
+        @param: timeout (float): seconds to wait for an item, None to wait forever
+        @return: list: items in the order they were put, empty on timeout
+        @raise: QueueClosed: the queue is closed and every item was consumed
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items or self.closed, timeout):
+                return []
+            if not self.items:
+                raise QueueClosed()
+            return [self.items.popleft() for _ in range(min(max_items, len(self.items)))]
+
+    def get(self, timeout=None):
+        items = self.get_many(1, timeout)
+        return items[0] if items else None
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class Stage:
+
+    def __init__(self, name, fn, inbox=None, outbox=None, batch_size=1):
+        """
+        @param: name (str): name of the worker thread
+        @param: fn (callable): work of the stage. Source stages (no inbox) are called
+                without arguments and return an item, or None at the end of the stream.
+                Other stages are called with a list of up to batch_size items and
+                return a list of items for the outbox.
+        @param: inbox (DropOldestQueue): queue the stage consumes, None for a source stage
+        @param: outbox (DropOldestQueue): queue the results are put in
+        @param: batch_size (int): maximum number of items passed to fn at once
+        """
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.batch_size = batch_size
+        # Number of items the stage has processed
+        self.processed = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.inbox is not None:
+            self.inbox.close()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.inbox is None:
+                    item = self.fn()
+                    if item is None:
+                        break
+                    results = [item]
+                    self.processed += 1
+                else:
+                    try:
+                        items = self.inbox.get_many(self.batch_size)
+                    except QueueClosed:
+                        break
+                    results = self.fn(items)
+                    self.processed += len(items)
+
+                if self.outbox is not None:
+                    for result in results:
+                        self.outbox.put(result)
+        finally:
+            if self.outbox is not None:
+                self.outbox.close()
+
+
+class Pipeline:
+
+    def __init__(self, queue_size=2):
+        """
+        @param: queue_size (int): capacity of the queues between stages
+        """
+        self.queue_size = queue_size
+        self.stages = []
+        self.output = None
+
+    def add_source(self, name, fn):
+        """Add Source
+            Adds the first stage, fn is called repeatedly until it returns None
+        """
+        self.output = DropOldestQueue(self.queue_size)
+        self.stages.append(Stage(name, fn, outbox=self.output))
+        return self
+
+    def add_stage(self, name, fn, batch_size=1):
+        """Add Stage
+            Adds a stage consuming the output of the previous one, see Stage
+        """
+        inbox = self.output
+        self.output = DropOldestQueue(self.queue_size)
+        self.stages.append(Stage(name, fn, inbox=inbox, outbox=self.output, batch_size=batch_size))
+        return self
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            stage.join()
+
+    def results(self):
+        """Results
+            Yields the output of the last stage until the stream ends
+        """
+        while True:
+            try:
+                yield self.output.get()
+            except QueueClosed:
+                return
+
+    def dropped(self) -> dict:
+        """Dropped
+        @return: dict: number of items dropped by the output queue of each stage
+        """
+        return {stage.name: stage.outbox.dropped for stage in self.stages}
@@ -0,0 +1,154 @@
+"""Publishes the tracked objects to the navigation system
+    * Each processed frame becomes one datagram with a fixed binary layout:
+    a HEADER followed by one TRACK_DTYPE record per tracked object, all
+    little-endian, so the consumer reads it without parsing text.
+    * Datagrams are sent over a local UDP or Unix-domain socket by a
+    background thread. publish only encodes the message and queues it, and
+    the queue drops its oldest message when the consumer or the socket
+    falls behind, so the detection loop never blocks on output.
+    * Messages that could not be sent (e.g. no consumer listening yet) are
+    counted and dropped.
+"""
+
+# ================ Built-in Imports ================ #
+
+import socket
+import struct
+import threading
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+# ================ User Imports ================ #
+
+from classes.Pipeline import DropOldestQueue, QueueClosed
+
+# ================ Global Variables ================ #
+
+MAGIC = b'AVVS'
+VERSION = 1
+
+# magic, version, reserved, number of tracks, frame id, capture time (Unix time)
+HEADER = struct.Struct('<4sBxHQd')
+
+# bearing in degrees, positive to the right of the camera axis, size_increase is NaN while unknown,
+# class_id indexes labels.LABELS (-1 when unknown)
+TRACK_DTYPE = np.dtype([('id', '<u4'),
+                        ('bearing', '<f4'),
+                        ('size_increase', '<f4'),
+                        ('class_id', '<i2'),
+                        ('reserved', '<u2')])
+
+# Tracks that fit in a single UDP datagram
+MAX_TRACKS = (65507 - HEADER.size) // TRACK_DTYPE.itemsize
+
+
+# ================ Functions ================ #
+
+def encode(frame_id, captured_at, tracks) -> bytes:
+    """Encode
+    @param: frame_id (int): number of the processed frame
+    @param: captured_at (float): capture time of the frame (Unix time)
+    @param: tracks (ndarray): TRACK_DTYPE records, only the first MAX_TRACKS are sent
+    @return: bytes: the message
+    """
+    tracks = np.asarray(tracks, dtype=TRACK_DTYPE)[:MAX_TRACKS]
+    return HEADER.pack(MAGIC, VERSION, len(tracks), frame_id, captured_at) + tracks.tobytes()
+
+
+def decode(message):
+    """Decode
+    @param: message (bytes): message made by encode
+    @return: (frame id, capture time, TRACK_DTYPE array of the tracks)
+    @raise: ValueError: the message does not have the expected layout
+    """
+    if len(message) < HEADER.size:
+        raise ValueError("message too short")
+    (magic, version, count, frame_id, captured_at) = HEADER.unpack_from(message)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("unknown message format")
+    if len(message) != HEADER.size + count * TRACK_DTYPE.itemsize:
+        raise ValueError("message length does not match its track count")
+    return frame_id, captured_at, np.frombuffer(message, dtype=TRACK_DTYPE, offset=HEADER.size)
+
+
+def make_tracks(ids, bearings, size_increases, class_ids) -> np.ndarray:
+    # TRACK_DTYPE records from one array per field
+    tracks = np.zeros(len(ids), dtype=TRACK_DTYPE)
+    tracks['id'] = ids
+    tracks['bearing'] = bearings
+    tracks['size_increase'] = size_increases
+    tracks['class_id'] = class_ids
+    return tracks
+
+
+def open_socket(family):
+    # datagram socket of a family ('udp' or 'unix')
+    if family == 'udp':
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if family == 'unix':
+        return socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    raise ValueError("Unknown socket family: " + str(family))
+
+
+# ================ Class definition ================ #
+
+class Publisher:
+
+    def __init__(self, address, family='udp', queue_size=8):
+        """
+        @param: address (tuple or str): (host, port) for 'udp', a socket path for 'unix'
+        @param: family (str): 'udp' or 'unix'
+        @param: queue_size (int): messages kept before the oldest ones are dropped
+        """
+        self.address = address
+        # a full socket buffer drops the message instead of blocking the sender
+        self.sock = open_socket(family)
+        self.sock.setblocking(False)
+        self.queue_size = queue_size
+        self.queue = DropOldestQueue(queue_size)
+
+        # Metrics
+        self.sent = 0
+        self.failed = 0
+
+        self.thread = threading.Thread(target=self.run, name='publisher', daemon=True)
+        self.thread.start()
+
+    def publish(self, frame_id, captured_at, tracks):
+        """Publish
+            Queues the tracks of a frame, never blocks
+        @param: frame_id (int): number of the processed frame
+        @param: captured_at (float): capture time of the frame (Unix time)
+        @param: tracks (ndarray): TRACK_DTYPE records, see make_tracks
+        """
+        self.queue.put(encode(frame_id, captured_at, tracks))
+
+    def run(self):
+        while True:
+            try:
+                messages = self.queue.get_many(self.queue_size)
+            except QueueClosed:
+                break
+            for message in messages:
+                try:
+                    self.sock.sendto(message, self.address)
+                    self.sent += 1
+                except OSError:
+                    # e.g. nothing listening on the address yet, or a full socket buffer
+                    self.failed += 1
+
+    def metrics(self) -> dict:
+        return {'sent': self.sent,
+                'dropped': self.queue.dropped,
+                'failed': self.failed}
+
+    def close(self, timeout=None):
+        """Close
+            Sends the queued messages, then closes the socket
+        @param: timeout (float): seconds to wait for the queued messages to be sent
+        """
+        self.queue.close()
+        self.thread.join(timeout)
+        self.sock.close()
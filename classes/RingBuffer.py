@@ -0,0 +1,80 @@
+"""Fixed capacity ring buffer of float64 samples
+    * Samples are stored column by column in a preallocated NumPy array, the
+    oldest samples are overwritten once the buffer is full.
+    * Every sample is written twice, at i and i + capacity, so the kept
+    samples are always a contiguous, chronologically ordered window of the
+    array. Columns can then be read as zero-copy views and searched directly
+    with np.searchsorted.
+    * A single writer thread may extend the buffer while other threads read
+    from it without a lock: the write count is only advanced after the samples
+    have been written, so readers never see a partially written sample.
+    Readers should only rely on samples far from the oldest one so the writer
+    cannot overwrite them while they are being read.
+"""
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+
+# ================ Class definition ================ #
+
+class RingBuffer:
+
+    def __init__(self, capacity, columns):
+        """
+        @param: capacity (int): maximum number of samples kept
+        @param: columns (tuple): name of each column of a sample
+        """
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self.data = np.zeros((len(self.columns), 2 * capacity), dtype=np.float64)
+        # Total number of samples ever written
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def extend(self, rows):
+        """Extend
+            Appends samples to the buffer, overwriting the oldest ones when full
+        @param: rows (ndarray): N x len(columns) array of samples
+        """
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(self.columns))
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+        if len(rows) == 0:
+            return
+
+        idx = (self.count + np.arange(len(rows))) % self.capacity
+        self.data[:, idx] = rows.T
+        self.data[:, idx + self.capacity] = rows.T
+
+        self.count += len(rows)
+
+    def window(self, n=None):
+        """Window
+            Zero-copy view of the newest samples in chronological order
+        @param: n (int): number of samples, None for every sample kept
+        @return: ndarray: len(columns) x up to n view, one row per column
+        """
+        count = self.count
+        size = min(count, self.capacity)
+        n = size if n is None else min(n, size)
+
+        end = count % self.capacity + self.capacity
+        return self.data[:, end - n:end]
+
+    def tail(self, n=None):
+        """Tail
+            Copies the newest samples in chronological order
+        @param: n (int): number of samples, None for every sample kept
+        @return: ndarray: up to n x len(columns) array of samples
+        """
+        return self.window(n).T.copy()
+
+    def column(self, rows, name):
+        """Column
+            Selects a named column from rows returned by tail
+        """
+        return rows[:, self.columns.index(name)]
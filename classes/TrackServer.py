@@ -0,0 +1,171 @@
+"""Serves the tracked objects to any number of local clients
+    * An asyncio server runs on its own thread and event loop. publish only
+    hands the message of a frame (see Publisher.encode) to the loop, so the
+    frame loop never waits for a client.
+    * Messages are sent over TCP or a Unix-domain stream socket, each one
+    prefixed with its length (LENGTH).
+    * Clients send one byte commands:
+        SUBSCRIBE: receive the message of every published frame
+        LATEST: receive the message of the last published frame (an empty
+                message before the first one). Messages still buffered for
+                the client are discarded, so a subscriber can resynchronize
+                without replaying history.
+    * Each client has a bounded buffer of messages. A subscriber whose buffer
+    is full when a frame is published is too slow and is disconnected.
+"""
+
+# ================ Built-in Imports ================ #
+
+import asyncio
+import struct
+import threading
+
+# ================ User Imports ================ #
+
+from classes.Publisher import encode
+
+# ================ Global Variables ================ #
+
+SUBSCRIBE = b'S'
+LATEST = b'L'
+
+# Length of the message that follows
+LENGTH = struct.Struct('<I')
+
+
+# ================ Class definition ================ #
+
+class Client:
+
+    def __init__(self, writer, buffer_size, on_disconnect):
+        self.writer = writer
+        self.queue = asyncio.Queue(buffer_size)
+        # called with the client when its connection is lost while sending
+        self.on_disconnect = on_disconnect
+        self.task = asyncio.ensure_future(self.send())
+
+    async def send(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                self.writer.write(LENGTH.pack(len(message)) + message)
+                await self.writer.drain()
+        except ConnectionError:
+            self.on_disconnect(self)
+
+    def resync(self, message):
+        # replaces the buffered messages with message
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    def close(self):
+        self.task.cancel()
+        self.writer.close()
+
+
+class TrackServer:
+
+    def __init__(self, address, family='tcp', buffer_size=16):
+        """
+        @param: address (tuple or str): (host, port) for 'tcp', port 0 picks a free one, a socket path for 'unix'
+        @param: family (str): 'tcp' or 'unix'
+        @param: buffer_size (int): messages buffered per client before it is disconnected
+        """
+        if family not in ('tcp', 'unix'):
+            raise ValueError("Unknown socket family: " + str(family))
+        self.address = address
+        self.family = family
+        self.buffer_size = buffer_size
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='track server', daemon=True)
+        self.server = None
+        self.clients = set()
+        self.subscribers = set()
+        # message of the last published frame
+        self.latest = b''
+
+        # Metrics
+        self.published = 0
+        self.evicted = 0
+
+    def start(self):
+        """Start
+            Starts listening, address is then the address the server is bound to
+        """
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.__serve(), self.loop).result()
+        return self
+
+    async def __serve(self):
+        if self.family == 'tcp':
+            self.server = await asyncio.start_server(self.__handle, *self.address)
+        else:
+            self.server = await asyncio.start_unix_server(self.__handle, self.address)
+        self.address = self.server.sockets[0].getsockname()
+
+    async def __handle(self, reader, writer):
+        client = Client(writer, self.buffer_size, self.__disconnect)
+        self.clients.add(client)
+        try:
+            while True:
+                command = await reader.read(1)
+                if not command:
+                    break
+                if command == SUBSCRIBE:
+                    self.subscribers.add(client)
+                elif command == LATEST:
+                    client.resync(self.latest)
+        except ConnectionError:
+            pass
+        finally:
+            self.__disconnect(client)
+
+    def __disconnect(self, client):
+        self.clients.discard(client)
+        self.subscribers.discard(client)
+        client.close()
+
+    def __fan_out(self, message):
+        self.latest = message
+        self.published += 1
+        for client in list(self.subscribers):
+            try:
+                client.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.evicted += 1
+                self.__disconnect(client)
+
+    def publish(self, frame_id, captured_at, tracks):
+        """Publish
+            Sends the tracks of a frame to the subscribers, never blocks
+        @param: frame_id (int): number of the processed frame
+        @param: captured_at (float): capture time of the frame (Unix time)
+        @param: tracks (ndarray): TRACK_DTYPE records, see Publisher.make_tracks
+        """
+        self.loop.call_soon_threadsafe(self.__fan_out, encode(frame_id, captured_at, tracks))
+
+    def metrics(self) -> dict:
+        return {'published': self.published,
+                'clients': len(self.clients),
+                'evicted': self.evicted}
+
+    async def __close(self):
+        self.server.close()
+        for client in list(self.clients):
+            self.__disconnect(client)
+        await self.server.wait_closed()
+
+    def close(self, timeout=None):
+        """Close
+            Disconnects every client and stops the server thread
+        @param: timeout (float): seconds to wait for the server to stop
+        """
+        if self.thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self.__close(), self.loop).result(timeout)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
+        # a loop still running (the thread did not stop in time) cannot be closed
+        if not self.thread.is_alive():
+            self.loop.close()
@@ -0,0 +1,93 @@
+"""Columnar cache of decoded IMU logs
+    The orientation of every sample of a log (nuc_time, cf_euler_angles and
+    the last GNSS heading) is decoded once and saved as a raw .npy array with
+    one row per column. The cache file name contains the size and mtime of
+    the log, so a modified log never reuses a stale cache, and the caches
+    of earlier versions of the log are deleted when a new one is written.
+    Later runs memory-map the cache instead of parsing the log again."""
+
+# ================ Built-in Imports ================ #
+
+import os
+import re
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+# ================ User Imports ================ #
+
+from classes.ImuLog import ImuLog
+
+# ================ Global Variables ================ #
+
+CACHE_COLUMNS = ('nuc_time', 'roll', 'pitch', 'yaw', 'heading')
+
+
+# ================ Functions ================ #
+
+
+def cache_path_for(filepath: str, cache_dir: str = None) -> str:
+    """Cache Path For
+    @param: filepath (str): path to the IMU log
+    @param: cache_dir (str): directory of the cache, defaults to the directory of the log
+    @return: str: path of the cache keyed by the size and mtime of the log
+    """
+    stat = os.stat(filepath)
+    name = '{0}.{1}.{2}.npy'.format(os.path.basename(filepath), stat.st_size, stat.st_mtime_ns)
+    return os.path.join(cache_dir or os.path.dirname(os.path.abspath(filepath)), name)
+
+
+def build_cache(filepath: str, cache_path: str) -> np.ndarray:
+    """Build Cache
+        Decodes the whole log and saves its orientation columns
+    @param: filepath (str): path to the IMU log
+    @param: cache_path (str): where to save the cache
+    @return: ndarray: len(CACHE_COLUMNS) x N array
+    """
+    # The packet index is only needed while decoding
+    index_path = cache_path + '.idx.tmp.npy'
+    try:
+        log = ImuLog(filepath, index_path=index_path)
+        samples = log.slice_samples(0, len(log))
+        log.close()
+    finally:
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+    columns = np.stack([samples[column] for column in CACHE_COLUMNS])
+
+    # Write to a temporary file first so a partially written cache is never loaded
+    tmp_path = cache_path + '.tmp.npy'
+    np.save(tmp_path, columns)
+    os.replace(tmp_path, cache_path)
+
+    remove_stale_caches(filepath, cache_path)
+    return columns
+
+
+def remove_stale_caches(filepath: str, cache_path: str):
+    """Remove Stale Caches
+        Deletes the caches (and index sidecars) of other sizes and mtimes of a log
+    @param: filepath (str): path to the IMU log
+    @param: cache_path (str): the current cache, which is kept
+    """
+    cache_dir = os.path.dirname(cache_path)
+    pattern = re.compile(re.escape(os.path.basename(filepath)) + r'\.\d+\.\d+(\.idx)?\.npy$')
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if pattern.match(name) and path != cache_path:
+            os.remove(path)
+
+
+def load_cache(filepath: str, cache_dir: str = None) -> np.ndarray:
+    """Load Cache
+        Memory-maps the cache of a log, building it on first use
+    @param: filepath (str): path to the IMU log
+    @param: cache_dir (str): directory of the cache, defaults to the directory of the log
+    @return: ndarray: read-only len(CACHE_COLUMNS) x N array, one contiguous row per column
+    """
+    cache_path = cache_path_for(filepath, cache_dir)
+    if not os.path.exists(cache_path):
+        build_cache(filepath, cache_path)
+    return np.load(cache_path, mmap_mode='r')
@@ -0,0 +1,444 @@
+"""Native parser for the LORD MIP binary stream
+    Python/NumPy port of 3rd_party_scripts/parse_imu.m. Packets are located
+    with a vectorized search for the 0x75 0x65 sync bytes, validated with a
+    vectorized 16-bit Fletcher checksum and decoded field by field with
+    np.frombuffer using the descriptor definitions below.
+    The output mirrors the structure of the MatLab parser:
+    output[descriptor_set_name][field_name][subfield_name]"""
+
+# ================ Built-in Imports ================ #
+
+import os
+from typing import Dict, Tuple
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+# ================ Global Variables ================ #
+
+SYNC1 = 0x75
+SYNC2 = 0x65
+
+# Sync bytes, descriptor set byte and payload length byte
+HEADER_LENGTH = 4
+CHECKSUM_LENGTH = 2
+
+# Largest possible packet, the payload length is a single byte
+MAX_PACKET_LENGTH = HEADER_LENGTH + 255 + CHECKSUM_LENGTH
+
+# Timestamp inserted by the ROSE computer in front of every packet
+# (year - 2000, month, day, hour, minute, second, hundredths of a second)
+NUC_TIMESTAMP_LENGTH = 7
+
+# MatLab datenum of 1970-01-01
+DATENUM_UNIX_EPOCH = 719529
+
+# Descriptor set byte -> descriptor set name
+DESCRIPTOR_SETS = {
+    0x80: 'IMU',
+    0x81: 'GNSS',
+    0x82: 'attitude',
+}
+
+# (descriptor set, field descriptor) -> (field name, [(subfield, offset, dtype, units), ...])
+# All MIP values are transmitted big-endian.
+FIELD_DEFS = {
+    # IMU Data
+    (0x80, 0x04): ('scaled_accelerometer_vector', [
+        ('x_accel', 0, '>f4', 'g'),
+        ('y_accel', 4, '>f4', 'g'),
+        ('z_accel', 8, '>f4', 'g')]),
+    (0x80, 0x05): ('scaled_gyro_vector', [
+        ('x_gyro', 0, '>f4', 'rad/s'),
+        ('y_gyro', 4, '>f4', 'rad/s'),
+        ('z_gyro', 8, '>f4', 'rad/s')]),
+    (0x80, 0x06): ('scaled_magnetometer_vector', [
+        ('x_mag', 0, '>f4', 'gauss'),
+        ('y_mag', 4, '>f4', 'gauss'),
+        ('z_mag', 8, '>f4', 'gauss')]),
+    (0x80, 0x17): ('scaled_ambient_pressure', []),
+    (0x80, 0x07): ('delta_theta_vector', []),
+    (0x80, 0x08): ('delta_velocity_vector', []),
+    (0x80, 0x09): ('cf_orientation_matrix', []),
+    (0x80, 0x0A): ('cf_quaternion', []),
+    (0x80, 0x0C): ('cf_euler_angles', [
+        ('roll', 0, '>f4', 'radians'),
+        ('pitch', 4, '>f4', 'radians'),
+        ('yaw', 8, '>f4', 'radians')]),
+    (0x80, 0x10): ('cf_stabilized_north_vector', []),
+    (0x80, 0x11): ('cf_stabilized_up_vector', []),
+    (0x80, 0x12): ('gps_correlation_timestamp', [
+        ('gps_time_of_week', 0, '>f8', 'seconds'),
+        ('gps_week_number', 8, '>u2', 'n/a'),
+        ('timestamp_flags', 10, '>u2', 'see manual')]),
+
+    # GNSS Data
+    (0x81, 0x03): ('llh_position', [
+        ('latitude', 0, '>f8', 'decimal degrees'),
+        ('longitude', 8, '>f8', 'decimal degrees'),
+        ('height_above_ellipsoid', 16, '>f8', 'meters'),
+        ('height_above_msl', 24, '>f8', 'meters'),
+        ('horizontal_accuracy', 32, '>f4', 'meters'),
+        ('vertical_accuracy', 36, '>f4', 'meters'),
+        ('valid_flags', 40, '>u2', 'see manual')]),
+    (0x81, 0x04): ('position_eath_centered_earth_fixed_frame', [
+        ('x_pos', 0, '>f8', 'meters'),
+        ('y_pos', 8, '>f8', 'meters'),
+        ('z_pos', 16, '>f8', 'meters'),
+        ('pos_accuracy', 24, '>f4', 'meters'),
+        ('valid_flags', 28, '>u2', 'see manual')]),
+    (0x81, 0x05): ('velocity_north_east_down_frame', [
+        ('north', 0, '>f4', 'm/sec'),
+        ('east', 4, '>f4', 'm/sec'),
+        ('down', 8, '>f4', 'm/sec'),
+        ('speed', 12, '>f4', 'm/sec'),
+        ('ground_speed', 16, '>f4', 'm/sec'),
+        ('heading', 20, '>f4', 'decimal degrees'),
+        ('speed_accuracy', 24, '>f4', 'm/sec'),
+        ('heading_accuracy', 28, '>f4', 'decimal degrees'),
+        ('valid_flags', 32, '>u2', 'see manual')]),
+    (0x81, 0x06): ('velocity_eath_centered_earth_fixed_frame', [
+        ('x_vel', 0, '>f4', 'm/sec'),
+        ('y_vel', 4, '>f4', 'm/sec'),
+        ('z_vel', 8, '>f4', 'm/sec'),
+        ('vel_accuracy', 12, '>f4', 'm/sec'),
+        ('valid_flags', 16, '>u2', 'see manual')]),
+    (0x81, 0x07): ('DOP_data', []),
+    (0x81, 0x08): ('UTC_time', [
+        ('year', 0, '>u2', 'years'),
+        ('month', 2, 'u1', 'months'),
+        ('day', 3, 'u1', 'days'),
+        ('hour', 4, 'u1', 'hours'),
+        ('minute', 5, 'u1', 'minutes'),
+        ('second', 6, 'u1', 'seconds'),
+        ('millisecond', 7, '>u4', 'milliseconds'),
+        ('valid_flags', 11, '>u2', 'see manual')]),
+    (0x81, 0x09): ('GPS_time', [
+        ('time_of_week', 0, '>f8', 'seconds'),
+        ('week_number', 8, '>u2', 'n/a'),
+        ('valid_flags', 10, '>u2', 'see manual')]),
+    (0x81, 0x0A): ('clock_information', []),
+    (0x81, 0x0B): ('gnss_fix_information', []),
+    (0x81, 0x0C): ('space_vehicle_information', []),
+    (0x81, 0x0D): ('hardware_status', []),
+    (0x81, 0x0E): ('dgnss_information', []),
+    (0x81, 0x0F): ('dgnss_channel_status', []),
+
+    # Estimation Filter (Attitude) Data
+    (0x82, 0x10): ('filter_status', []),
+    (0x82, 0x11): ('gps_timestamp', [
+        ('time_of_week', 0, '>f8', 'seconds'),
+        ('week_number', 8, '>u2', 'n/a'),
+        ('valid', 10, '>u2', '1=valid, 0=invalid')]),
+    (0x82, 0x03): ('orientation_quaternion', []),
+    (0x82, 0x12): ('attitude_uncertainty_quaternion_elements', []),
+    (0x82, 0x05): ('orientation_euler_angles', [
+        ('roll', 0, '>f4', 'radians'),
+        ('pitch', 4, '>f4', 'radians'),
+        ('yaw', 8, '>f4', 'radians'),
+        ('valid', 12, '>u2', '1=valid, 0=invalid')]),
+    (0x82, 0x0A): ('attitude_uncertainty_euler_angles', []),
+    (0x82, 0x04): ('orientation_matrix', []),
+    (0x82, 0x0E): ('compensated_angular_rate', [
+        ('X', 0, '>f4', 'rads/sec'),
+        ('Y', 4, '>f4', 'rads/sec'),
+        ('Z', 8, '>f4', 'rads/sec'),
+        ('valid', 12, '>u2', '1=valid, 0=invalid')]),
+    (0x82, 0x06): ('gyro_bias', []),
+    (0x82, 0x0B): ('gyro_bias_uncertainty', []),
+    (0x82, 0x1C): ('compensated_acceleration', []),
+    (0x82, 0x0D): ('linear_acceleration', [
+        ('X', 0, '>f4', 'm/sec^2'),
+        ('Y', 4, '>f4', 'm/sec^2'),
+        ('Z', 8, '>f4', 'm/sec^2'),
+        ('valid', 12, '>u2', '1=valid, 0=invalid')]),
+    (0x82, 0x21): ('pressure_altitude', []),
+    (0x82, 0x13): ('gravity_vector', []),
+    (0x82, 0x0F): ('wgs84_local_gravity_magnitude', []),
+    (0x82, 0x14): ('heading_update_source_state', [
+        ('heading', 0, '>f4', 'radians'),
+        ('heading_1_sigma_uncertainty', 4, '>f4', 'radians'),
+        ('source', 8, '>u2', '0=no source, 1=Magnetometer, 4=External'),
+        ('valid', 10, '>u2', '1=valid, 0=invalid')]),
+    (0x82, 0x15): ('magnetic_model_solution', []),
+    (0x82, 0x25): ('mag_auto_hard_iron_offset', []),
+    (0x82, 0x28): ('mag_auto_hard_iron_offset_uncertainty', []),
+    (0x82, 0x26): ('mag_auto_soft_iron_matrix', []),
+    (0x82, 0x29): ('mag_auto_soft_iron_matrix_uncertainty', []),
+}
+
+
+# ================ Functions ================ #
+
+
+def fletcher_checksums(buf: np.ndarray, start: np.ndarray, length: np.ndarray) -> np.ndarray:
+    """Fletcher Checksums
+        Computes the 16-bit Fletcher checksum of every buf[start:start + length]
+        without looping over the packets. Running sums are kept in uint64 so
+        overflow wraps modulo 2**64, which preserves the result modulo 256.
+    @param: buf (ndarray): uint8 buffer
+    @param: start (ndarray): index of the first byte of each packet
+    @param: length (ndarray): number of bytes covered by each checksum
+    @return: ndarray: uint16 checksum of each packet
+    """
+    s1 = np.zeros(len(buf) + 1, dtype=np.uint64)
+    np.cumsum(buf, dtype=np.uint64, out=s1[1:])
+    s2 = np.cumsum(s1, dtype=np.uint64)
+
+    start = start.astype(np.uint64)
+    end = start + length.astype(np.uint64)
+    n = length.astype(np.uint64)
+
+    sum1 = (s1[end] - s1[start]) & 0xFF
+    # sum2 = sum over k in [start, end) of (s1[k + 1] - s1[start])
+    sum2 = (s2[end] - s2[start] - n * s1[start]) & 0xFF
+
+    return ((sum1 << np.uint64(8)) | sum2).astype(np.uint16)
+
+
+def nuc_datenum(stamps: np.ndarray) -> np.ndarray:
+    """Nuc Datenum
+        Converts the 7 byte ROSE timestamps into MatLab datenums (days since year 0)
+    @param: stamps (ndarray): N x 7 uint8 array of timestamps
+    @return: ndarray: float64 datenums
+    """
+    stamps = stamps.astype(np.int64)
+    years = (stamps[:, 0] + 2000 - 1970).astype('datetime64[Y]')
+    months = (stamps[:, 1] - 1).astype('timedelta64[M]')
+    days = (years + months).astype('datetime64[D]') + (stamps[:, 2] - 1).astype('timedelta64[D]')
+
+    seconds = stamps[:, 3] * 3600 + stamps[:, 4] * 60 + stamps[:, 5] + stamps[:, 6] / 100
+
+    return days.astype(np.int64) + DATENUM_UNIX_EPOCH + seconds / 86400
+
+
+def unix_to_datenum(seconds):
+    """Unix to Datenum
+        Converts Unix time (e.g. time.time()) to a MatLab datenum comparable with nuc_time
+    @param: seconds (float | ndarray): seconds since 1970-01-01
+    @return: float | ndarray: days since year 0
+    """
+    return seconds / 86400 + DATENUM_UNIX_EPOCH
+
+
+def datenum_to_unix(days):
+    """Datenum to Unix
+        Converts a MatLab datenum (e.g. nuc_time) to Unix time
+    @param: days (float | ndarray): days since year 0
+    @return: float | ndarray: seconds since 1970-01-01
+    """
+    return (days - DATENUM_UNIX_EPOCH) * 86400
+
+
+def find_headers(buf: np.ndarray, parse_nuc_timestamps: bool = False) -> Dict[str, np.ndarray]:
+    """Find Headers
+        Locates and validates the MIP packets in a uint8 buffer.
+        Packets that run past the end of the buffer or have an invalid checksum are discarded.
+    @param: buf (ndarray): uint8 buffer of raw IMU data
+    @param: parse_nuc_timestamps (bool): parse the ROSE timestamps preceding each packet
+    @return: dict: index, descriptor and length of each valid packet (and ts if requested)
+    """
+    h = np.flatnonzero((buf[:-1] == SYNC1) & (buf[1:] == SYNC2))
+
+    # Throw out trailing headers with no payload length
+    h = h[h + HEADER_LENGTH <= len(buf)]
+
+    # Discard the first header if the preceding timestamp is incomplete
+    if parse_nuc_timestamps:
+        h = h[h >= NUC_TIMESTAMP_LENGTH]
+
+    descriptor = buf[h + 2]
+    length = buf[h + 3].astype(np.int64)
+
+    # Discard packets that run past the end of the buffer
+    complete = h + HEADER_LENGTH + length + CHECKSUM_LENGTH <= len(buf)
+    h, descriptor, length = h[complete], descriptor[complete], length[complete]
+
+    # Verify checksums of each packet (16-bit Fletcher checksum)
+    chk_idx = h + HEADER_LENGTH + length
+    expected = (buf[chk_idx].astype(np.uint16) << 8) | buf[chk_idx + 1]
+    valid = fletcher_checksums(buf, h, length + HEADER_LENGTH) == expected
+
+    header = {
+        'index': h[valid],
+        'descriptor': descriptor[valid],
+        'length': length[valid],
+    }
+
+    if parse_nuc_timestamps:
+        ts_idx = header['index'][:, None] - np.arange(NUC_TIMESTAMP_LENGTH, 0, -1)
+        header['ts'] = nuc_datenum(buf[ts_idx])
+
+    return header
+
+
+def packet_dtype(descriptor: int, payload: np.ndarray) -> Tuple[np.dtype, list]:
+    """Packet dtype
+        Builds a structured dtype describing a whole packet (descriptor set byte onwards)
+        by walking the fields of a sample payload.
+    @param: descriptor (int): descriptor set byte
+    @param: payload (ndarray): payload bytes of a sample packet
+    @return: tuple: the structured dtype and a list of (field name, [(subfield, units), ...])
+    """
+    names, formats, offsets = [], [], []
+    fields = []
+
+    pos = 0
+    while pos + 1 < len(payload):
+        flen = int(payload[pos])
+        fdesc = int(payload[pos + 1])
+        if flen < 2:
+            break
+
+        fname, subfields = FIELD_DEFS.get((descriptor, fdesc), (None, []))
+        if fname is not None:
+            field_subfields = []
+            for (sf_name, sf_offset, sf_type, sf_units) in subfields:
+                # Skip past the descriptor set and payload length bytes
+                # then the field length and field descriptor bytes
+                names.append(fname + '.' + sf_name)
+                formats.append(sf_type)
+                offsets.append(2 + pos + 2 + sf_offset)
+                field_subfields.append((sf_name, sf_units))
+            fields.append((fname, field_subfields))
+
+        pos += flen
+
+    dtype = np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                      'itemsize': len(payload) + 2})
+    return dtype, fields
+
+
+def parse_data(header: Dict[str, np.ndarray], buf: np.ndarray) -> dict:
+    """Parse Data
+        Converts the validated packets into a dict of float64 arrays.
+        Every packet of a descriptor set is assumed to share the field layout
+        of the first one, packets of a different length are ignored.
+    @param: header (dict): output of find_headers
+    @param: buf (ndarray): uint8 buffer the headers were found in
+    @return: dict: data containing the IMU fields, empty if no packets were found
+    """
+    output = {}
+    if len(header['index']) == 0:
+        return output
+
+    output['units'] = {}
+
+    for descriptor in np.unique(header['descriptor']):
+        dname = DESCRIPTOR_SETS.get(int(descriptor))
+        if dname is None:
+            continue
+
+        of_set = header['descriptor'] == descriptor
+        length = header['length'][of_set][0]
+        same_layout = of_set & (header['length'] == length)
+        index = header['index'][same_layout]
+
+        # One row per packet starting at the descriptor set byte
+        rows = buf[index[:, None] + 2 + np.arange(length + 2)]
+        dtype, fields = packet_dtype(int(descriptor), rows[0, 2:])
+        packets = np.frombuffer(rows.tobytes(), dtype=dtype)
+
+        output.setdefault(dname, {})
+        output['units'].setdefault(dname, {})
+        if 'ts' in header and 'nuc_time' not in output[dname]:
+            output[dname]['nuc_time'] = header['ts'][same_layout]
+
+        for (fname, subfields) in fields:
+            output[dname].setdefault(fname, {})
+            output['units'][dname].setdefault(fname, {})
+            for (sf_name, sf_units) in subfields:
+                output[dname][fname][sf_name] = packets[fname + '.' + sf_name].astype(np.float64)
+                output['units'][dname][fname][sf_name] = sf_units
+
+    return output
+
+
+def parse_imu(buf: np.ndarray, parse_nuc_timestamps: bool = False) -> dict:
+    """Parse IMU
+        Locates, validates and decodes all MIP packets in the buffer
+    @param: buf (ndarray | bytes): raw IMU data
+    @param: parse_nuc_timestamps (bool): parse the ROSE timestamps inserted into IMU_timestamped* files
+    @return: dict: data containing the IMU fields
+    """
+    buf = np.frombuffer(buf, dtype=np.uint8)
+    return parse_data(find_headers(buf, parse_nuc_timestamps), buf)
+
+
+def read_tail(filepath: str, num_bytes: int) -> np.ndarray:
+    """Read Tail
+        Reads up to the last num_bytes of a file
+    @param: filepath (str): path to the binary file
+    @param: num_bytes (int): maximum number of bytes to read
+    @return: ndarray: uint8 buffer
+    """
+    with open(filepath, 'rb') as fd:
+        fd.seek(0, 2)
+        fd.seek(max(fd.tell() - num_bytes, 0))
+        return np.frombuffer(fd.read(), dtype=np.uint8)
+
+
+def packets_end(header: Dict[str, np.ndarray]) -> int:
+    """Packets End
+        Index one past the checksum of the last valid packet
+    @param: header (dict): output of find_headers
+    @return: int: end of the last valid packet, 0 if there are none
+    """
+    if len(header['index']) == 0:
+        return 0
+    return int(np.max(header['index'] + HEADER_LENGTH + header['length'] + CHECKSUM_LENGTH))
+
+
+# ================ Class definition ================ #
+
+class TailReader:
+    """Follows a growing IMU file
+        Keeps the file open and remembers the byte offset of the last read so
+        each call only parses the newly appended bytes. Bytes after the last
+        valid packet that may still hold an incomplete packet (and its nuc
+        timestamp) are carried over to the next read."""
+
+    def __init__(self, filepath: str, parse_nuc_timestamps: bool = False, start_bytes: int = None):
+        """
+        @param: filepath (str): path to the binary file
+        @param: parse_nuc_timestamps (bool): parse the ROSE timestamps preceding each packet
+        @param: start_bytes (int): only the last start_bytes of the existing file are read
+                on the first call, None to read the whole file
+        """
+        self.filepath = filepath
+        self.parse_nuc_timestamps = parse_nuc_timestamps
+        self.fd = open(filepath, 'rb')
+        self.carry = np.zeros(0, dtype=np.uint8)
+
+        size = os.fstat(self.fd.fileno()).st_size
+        self.offset = 0 if start_bytes is None else max(size - start_bytes, 0)
+
+    def read(self) -> dict:
+        """Read
+            Parses the bytes appended since the last call
+        @return: dict: data containing the IMU fields of the new packets, empty if there are none
+        """
+        size = os.fstat(self.fd.fileno()).st_size
+        if size < self.offset:
+            # The file was truncated or replaced, start over
+            self.offset = 0
+            self.carry = np.zeros(0, dtype=np.uint8)
+
+        self.fd.seek(self.offset)
+        new_bytes = self.fd.read(size - self.offset)
+        self.offset += len(new_bytes)
+        if not new_bytes:
+            return {}
+
+        buf = np.concatenate((self.carry, np.frombuffer(new_bytes, dtype=np.uint8)))
+        header = find_headers(buf, self.parse_nuc_timestamps)
+
+        # Anything past the last valid packet could be the start of a packet still being written
+        keep_from = max(packets_end(header), len(buf) - MAX_PACKET_LENGTH - NUC_TIMESTAMP_LENGTH, 0)
+        self.carry = buf[keep_from:].copy()
+
+        return parse_data(header, buf)
+
+    def close(self):
+        self.fd.close()
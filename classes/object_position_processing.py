@@ -1,6 +1,13 @@
 """Python function that is able to calculate the angle in degrees of an object from the visual
-   censor. The function requires the height and width in pixels, the degrees the visual sensor covers as well as the position of the object in pixel coordinates."""
+   censor. The function requires the height and width in pixels, the degrees the visual sensor covers as well as the position of the object in pixel coordinates.
+   calculate_angles finds the bearings of many objects at once with the pinhole camera model, from a
+   table of the bearing of every pixel column computed once per image width."""
 import math
+from functools import lru_cache
+
+import numpy as np
+
+import config
 
 
 def calculate_angle(width, height, viewport_angle, object_x):
@@ -9,3 +16,42 @@ def calculate_angle(width, height, viewport_angle, object_x):
     distance_from_center = object_x - width / 2
     angle_of_object = degree_per_pixel * distance_from_center
     return angle_of_object
+
+
+def focal_length_pixels(width, focal_length, sensor_width):
+    # focal length expressed in pixel units, as in image_transformation
+    return focal_length / sensor_width * width
+
+
+@lru_cache(maxsize=8)
+def angle_table(width, focal_length, sensor_width):
+    # bearing in degrees of every pixel column, atan((x - cx) / f)
+    f = focal_length_pixels(width, focal_length, sensor_width)
+    table = np.degrees(np.arctan((np.arange(width) - width / 2) / f))
+    table.flags.writeable = False
+    return table
+
+
+def calculate_angles(centroids_x, width, focal_length=None, sensor_width=None):
+    """Bearings of objects from their horizontal pixel positions
+
+    @param: centroids_x (np array): x of each object centroid in pixels
+    @param: width (int): image width in pixels
+    @param: focal_length (float): focal length in mm, defaults to config.CAM_FOCAL_LENGTH
+    @param: sensor_width (float): sensor width in mm, defaults to config.CAM_SENSOR_WIDTH
+
+    @return: np array of the bearings in degrees, positive to the right of the image center
+    """
+    focal_length = focal_length or config.CAM_FOCAL_LENGTH
+    sensor_width = sensor_width or config.CAM_SENSOR_WIDTH
+    table = angle_table(int(width), focal_length, sensor_width)
+
+    x = np.asarray(centroids_x).astype(int)
+    inside = (x >= 0) & (x < width)
+    if inside.all():
+        return table[x]
+
+    # objects coasting out of the image are computed directly
+    angles = np.degrees(np.arctan((x - width / 2) / focal_length_pixels(width, focal_length, sensor_width)))
+    angles[inside] = table[x[inside]]
+    return angles
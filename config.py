@@ -9,22 +9,149 @@ IMU_PATH = os.path.join(ROOT_DIR, 'test/mocks/IMU_timestamped_test_data.bin')
 # Path to IMU Raw Data File
 # IMU_PATH = "path to raw data file"
 
+# Keep the IMU file open and only parse newly appended bytes on each request
+IMU_FOLLOW = True
+
+# Decode the IMU file on a background thread, frames use the newest decoded attitude
+IMU_BACKGROUND = True
+
+# Seconds added to a frame's capture time (Unix time) to get the IMU's nuc_time clock.
+# Only used with IMU_BACKGROUND, the attitude is interpolated at the corrected capture time
+IMU_CLOCK_OFFSET = 0
+
+# Decode a recorded IMU file once into a cache next to it and look up the attitude of each frame
+# in the cache (replays of archived deployments). Also interpolates at the frame capture time
+IMU_CACHE = False
+
+# Unix time the video file of CAPTURE_DEVICE started recording at, frames of the file are stamped
+# with it plus their position in the video. None starts the video at the first sample of the IMU log
+# (replays with IMU_CACHE, see IMU_CLOCK_OFFSET)
+VIDEO_START_TIME = None
+
 # Path to video file or camera device ID (Integer)
 # Example of Device ID: CAPTURE_DEVICE = 0
 # CAPTURE_DEVICE = 0
 CAPTURE_DEVICE = 'MVI_1610_VIS_cut.avi'
 
-# How often a frame is processed (seconds)
+# How often a frame is processed (seconds), of video time for video files
 FRAME_INTERVAL = 1
 
+# Process frames as fast as they are processed instead of every FRAME_INTERVAL
+ADAPTIVE_FRAME_RATE = True
+
+# Video files seek instead of grabbing when more frames than this are skipped at once
+SEEK_THRESHOLD = 30
+
+# Number of processed frames run through the DNN in a single forward pass.
+# With MOTION_GATING, the frames skipped in between wait with the batch, so objects are output up to
+# BATCH_SIZE * DETECTION_EVERY frames late. Keep at 1 for live cameras, raise it to process recorded
+# video faster: with ADAPTIVE_FRAME_RATE the frame rate follows the time per frame, FRAME_INTERVAL
+# only applies when ADAPTIVE_FRAME_RATE is False
+BATCH_SIZE = 1
+
+# Only run the DNN every DETECTION_EVERY frames, or sooner when the mean absolute difference
+# of gray levels (0-255) with the frame of the last detection exceeds MOTION_THRESHOLD.
+# In between, tracked objects are moved with optical flow on frames downscaled to FLOW_WIDTH pixels
+MOTION_GATING = True
+DETECTION_EVERY = 5
+MOTION_THRESHOLD = 8.0
+FLOW_WIDTH = 320
+
+# Run capture, orientation correction and inference on their own threads
+PIPELINE = False
+
+# Frames held between pipeline stages before the oldest one is dropped
+PIPELINE_QUEUE_SIZE = 2
+
 # Device's viewport angle in degrees
 VIEWPORT_ANGLE = 78
 
 # Output detected objects and bounding boxes
 DRAW_TO_SCREEN = True
 
+# Socket the tracked objects are published to (see classes/Publisher.py): 'udp', 'unix',
+# or None to print them to stdout instead
+PUBLISHER = 'udp'
+# (host, port) for 'udp', a socket path for 'unix'
+PUBLISH_ADDRESS = ('127.0.0.1', 5005)
+# Messages waiting to be sent before the oldest one is dropped
+PUBLISH_QUEUE_SIZE = 8
+
+# Server the tracked objects are streamed from to any number of local clients (see classes/TrackServer.py):
+# 'tcp', 'unix', or None to not serve them
+TRACK_SERVER = None
+# (host, port) for 'tcp', a socket path for 'unix'
+TRACK_SERVER_ADDRESS = ('127.0.0.1', 5006)
+# Messages buffered per client before a slow client is disconnected
+TRACK_SERVER_BUFFER = 16
+
 VERBOSE = False
 
+# ================ Object Detection Configs ================ #
+
+# Minimum DNN score for a detection to be tracked
+DETECTION_THRESHOLD = 0.5
+
+# Models available to the detector. Paths are relative to ROOT_DIR, 'config' may be omitted
+# for single file models. Optional keys: input_size (width, height), scale, mean, swap_rb.
+# All models are expected to predict the classes of labels.LABELS
+DNN_MODELS = {
+    'ssd_inception_v2_smd': {
+        'weights': 'object_detection/ssd_inception_v2_smd_2019_01_29/frozen_inference_graph.pb',
+        'config': 'object_detection/ssd_inception_v2_smd_2019_01_29/graph.pbtxt',
+        'input_size': (300, 300),
+    },
+}
+
+# Model loaded on the first detection, can be swapped at runtime with Detector.use_model
+DNN_MODEL = 'ssd_inception_v2_smd'
+
+# OpenCV DNN backend and target, names of the cv2.dnn.DNN_BACKEND_* / DNN_TARGET_* constants
+# Backends: 'default', 'opencv', 'inference_engine', 'cuda'
+# Targets: 'cpu', 'opencl', 'opencl_fp16', 'myriad', 'cuda', 'cuda_fp16'
+DNN_BACKEND = 'default'
+DNN_TARGET = 'cpu'
+
+# Number of threads used by OpenCV, 0 keeps OpenCV's default
+DNN_THREADS = 0
+
+# Forward passes run right after loading a model to absorb the graph initialization
+DNN_WARMUP_RUNS = 1
+
+# Predict the motion of tracked objects with a constant velocity Kalman filter. Detections are
+# matched to the predicted centroids and objects keep moving while they are not detected
+TRACKER_PREDICTION = True
+
+# Standard deviations of the accelerations of objects (pixels / second^2), of the detected
+# centroids (pixels) and of the velocities of newly detected objects (pixels / second)
+KALMAN_PROCESS_NOISE = 20.0
+KALMAN_MEASUREMENT_NOISE = 5.0
+KALMAN_VELOCITY_UNCERTAINTY = 100.0
+
+# Number of detections kept in memory for each tracked object
+TRACK_HISTORY_DEPTH = 64
+
+# Binary file older detections of tracked objects are appended to (see TrackHistory), None to drop them
+TRACK_LOG = None
+
+# How tracked objects are matched to detections: 'hungarian' (optimal) or 'greedy' (cheapest pairs first)
+ASSOCIATION = 'hungarian'
+
+# Cost of matching an object to a detection:
+#   'centroid': distance between centroids (pixels)
+#   'size':     distance between centroids in object sizes, plus the log ratio of the sizes
+#   'iou':      1 - intersection over union of the bounding boxes
+ASSOCIATION_COST = 'centroid'
+
+# Objects and detections costing more than this are never matched, per cost
+ASSOCIATION_MAX_COST = {
+    'centroid': 200,
+    'size': 3.0,
+    'iou': 0.9,
+}
+
+# ================ END Object Detection Configs ================ #
+
 # ================ Image Manipulation Configs ================ #
 
 # Focal length and sensor width of the camera in use (in mm)
@@ -38,4 +165,45 @@ USE_ROLL = True
 USE_PITCH = False
 USE_YAW = False
 
+# Roll angles (radians) too small to be corrected when only rolling (~0.1 degree)
+ROLL_DEAD_BAND = 0.002
+
+# Interpolation used to warp frames: 'nearest', 'linear', 'cubic', 'lanczos',
+# or 'auto' to use the best one whose measured warp time fits in WARP_TIME_BUDGET (seconds)
+INTERPOLATION = 'lanczos'
+WARP_TIME_BUDGET = 0.03
+# In 'auto' mode, warps between measurements of the next better interpolation
+INTERPOLATION_PROBE_INTERVAL = 30
+
+# How frames are prepared for the DNN:
+#   'full':  correct the orientation of the full resolution frame, then resize it to the DNN input size
+#   'fused': warp the frame once, straight to the DNN input size
+#   'raw':   detect in the captured frame and map the bounding boxes and centroids
+#            into the corrected frame instead of warping its pixels
+#   'roi':   like 'raw', but only detect in tiles of the band around the horizon
+# With 'fused', 'raw' and 'roi', the full resolution corrected frame is only made when DRAW_TO_SCREEN needs it
+PREPROCESSING = 'fused'
+
+# Fraction of the frame height kept above and below the horizon in 'roi' preprocessing
+ROI_BAND_MARGIN = 0.15
+
+# Fraction of a horizon band tile shared with its neighbour
+ROI_TILE_OVERLAP = 0.2
+
+# Detections from neighbouring tiles overlapping more than this (IoU) are merged
+ROI_NMS_THRESHOLD = 0.4
+
+# Attitudes are rounded to multiples of this angle (radians) when looking up cached transformations,
+# 0.002 moves the corners of a 1080p frame by at most about a pixel
+ATTITUDE_QUANTUM = 0.002
+
+# Memory (bytes) used to cache the homography and remap tables of recent attitudes, 0 disables the cache.
+# A 1920x1080 entry takes about 12 MB, a 300x300 one about 0.5 MB
+TRANSFORMATION_CACHE_BYTES = 64 * 1024 * 1024
+
+# Remap tables are only built for attitudes seen this many times. Building the tables of a
+# 1920x1080 frame takes about as long as one lanczos warpPerspective (~65 ms), and a remap
+# is no faster than a linear warpPerspective, so tables of attitudes seen once are wasted
+TRANSFORMATION_CACHE_MIN_REQUESTS = 2
+
 # ================ END Image Manipulation Configs ================ #
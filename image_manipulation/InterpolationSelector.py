@@ -0,0 +1,94 @@
+"""Picks the interpolation used to warp frames
+
+Interpolation tiers range from Lanczos (best, slowest) to nearest
+neighbour (fastest). A fixed tier can be selected, or in 'auto' mode the
+best tier whose measured warp time fits the per-frame time budget is used.
+Warp times are measured per output size, since small DNN inputs and full
+resolution frames are warped at very different costs. Every probe_interval
+warps, the tier just better than the one in use is measured again, so a
+single slow warp (a GC pause, a cold first warp) does not demote a tier for
+the rest of the run.
+"""
+# ================ Built-in Imports ================
+
+from collections import OrderedDict
+
+# ================ Third Party Imports ================
+
+from cv2 import INTER_NEAREST, INTER_LINEAR, INTER_CUBIC, INTER_LANCZOS4
+
+# ================ Global Variables ================
+
+# Interpolation tiers, best quality first
+INTERPOLATIONS = OrderedDict([
+    ('lanczos', INTER_LANCZOS4),
+    ('cubic', INTER_CUBIC),
+    ('linear', INTER_LINEAR),
+    ('nearest', INTER_NEAREST),
+])
+
+# Weight of the newest measurement in the warp time averages
+ALPHA = 0.2
+
+
+class InterpolationSelector:
+
+    def __init__(self, mode: str = 'lanczos', time_budget: float = 0.03, probe_interval: int = 30):
+        """
+        @param: mode (str): a key of INTERPOLATIONS, or 'auto'
+        @param: time_budget (float): seconds a warp may take in 'auto' mode
+        @param: probe_interval (int): warps between measurements of a better tier in 'auto' mode
+        """
+        if mode != 'auto' and mode not in INTERPOLATIONS:
+            raise ValueError("Unknown interpolation: {}".format(mode))
+        self.mode = mode
+        self.time_budget = time_budget
+        self.probe_interval = probe_interval
+        # Exponential moving average of the warp time of each tier, per output size
+        self.warp_times = {}
+        # Warps selected per output size, and the tier being probed
+        self.selections = {}
+        self.probing = {}
+
+    def select(self, key=None) -> str:
+        """Select
+
+        @param: key (hashable): output size of the warp, warp times are measured per key
+
+        @return: name of the interpolation tier to use for the next warp
+        """
+        if self.mode != 'auto':
+            return self.mode
+
+        # Best tier that fits in the budget, tiers that were never measured are tried
+        warp_times = self.warp_times.get(key, {})
+        names = list(INTERPOLATIONS)
+        best = next((i for (i, name) in enumerate(names) if warp_times.get(name, 0) <= self.time_budget),
+                    len(names) - 1)
+
+        # Measure the next better tier again once in a while
+        self.selections[key] = self.selections.get(key, 0) + 1
+        if best > 0 and self.selections[key] % self.probe_interval == 0:
+            self.probing[key] = names[best - 1]
+            return names[best - 1]
+        return names[best]
+
+    def flag(self, name: str) -> int:
+        return INTERPOLATIONS[name]
+
+    def record(self, name: str, seconds: float, key=None):
+        """Record
+
+        @param: name (str): interpolation tier that was used
+        @param: seconds (float): time the warp took
+        @param: key (hashable): output size of the warp, see select
+        """
+        warp_times = self.warp_times.setdefault(key, {})
+        if self.probing.get(key) == name:
+            # A probe replaces the stale average of the tier
+            del self.probing[key]
+            warp_times[name] = seconds
+        elif name in warp_times:
+            warp_times[name] = (1 - ALPHA) * warp_times[name] + ALPHA * seconds
+        else:
+            warp_times[name] = seconds
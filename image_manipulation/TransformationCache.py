@@ -0,0 +1,70 @@
+"""Least recently used cache of image transformations
+
+Holds the homography and remap tables of recently seen attitudes so
+repeated attitudes do not rebuild them. Entries are evicted, least
+recently used first, once the arrays they hold exceed the memory cap.
+Building an entry can cost more than using it saves, so an entry can be
+built only once its key has been requested a number of times.
+"""
+# ================ Built-in Imports ================
+
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+class TransformationCache:
+
+    def __init__(self, max_bytes: int, max_pending: int = 1024):
+        """
+        @param: max_bytes (int): memory cap of the cached arrays
+        @param: max_pending (int): keys requested but not built yet whose requests are counted
+        """
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.entries = OrderedDict()
+        # number of requests of the keys not built yet, least recently requested first
+        self.pending = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: Hashable, build: Callable[[], tuple], min_requests: int = 1) -> Optional[tuple]:
+        """Get
+
+        @param: key: hashable key of the transformation
+        @param: build (callable): builds the tuple of arrays on a cache miss
+        @param: min_requests (int): requests of the key before it is built
+
+        @return: the cached tuple of arrays, None until the key was requested min_requests times
+        """
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        requests = self.pending.pop(key, 0) + 1
+        if requests < min_requests:
+            self.pending[key] = requests
+            if len(self.pending) > self.max_pending:
+                self.pending.popitem(last=False)
+            return None
+
+        value = build()
+        self.entries[key] = value
+        self.nbytes += sum(array.nbytes for array in value)
+
+        # Always keep the newest entry, even if it alone exceeds the cap
+        while self.nbytes > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= sum(array.nbytes for array in evicted)
+
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.pending.clear()
+        self.nbytes = 0
@@ -6,32 +6,66 @@ to then pass to object detection algorithms
 # ================ Built-in Imports ================
 
 from math import cos, sin
+from time import perf_counter
 from typing import Tuple
 
 # ================ Third Party Imports ================
 
-from numpy import ndarray, matmul, array
-from cv2 import warpPerspective, INTER_LANCZOS4
+from numpy import ndarray, matmul, array, arange, float32, meshgrid, ones_like, stack, diag
+from numpy.linalg import inv
+from cv2 import warpAffine, warpPerspective, remap, resize, convertMaps, CV_16SC2
 
 # ================ User Imports ================
 
 import config
+from image_manipulation.InterpolationSelector import InterpolationSelector
+from image_manipulation.TransformationCache import TransformationCache
 
 # ================ Authorship ================
 
 __author__ = "Gregory Sanchez"
 
+# ================ Global Variables ================
+
+# Homographies and remap tables of recently seen attitudes
+transformation_cache = TransformationCache(config.TRANSFORMATION_CACHE_BYTES)
+
+# Interpolation used by rotate_image
+interpolation_selector = InterpolationSelector(config.INTERPOLATION, config.WARP_TIME_BUDGET,
+                                               config.INTERPOLATION_PROBE_INTERVAL)
+
+
+def get_attitude_angles(orientation: dict) -> Tuple[float, float, float]:
+    """Get Attitude Angles
+
+    @param: orientation (dict): orientation data of the vessel
+
+    @return: (pitch, yaw, roll) in radians, 0 for the axis disabled in the config
+    """
+    # Use the newest sample when given the arrays of get_last_orientation
+    pitch = orientation["pitch"].item(-1) if config.USE_PITCH else 0
+    yaw = orientation["yaw"].item(-1) if config.USE_YAW else 0
+    roll = orientation["roll"].item(-1) if config.USE_ROLL else 0
+    return pitch, yaw, roll
+
 
 def get_transformation_matrix(orientation: dict, img_szie: Tuple[float, float]) -> ndarray:
     """Get Transformation Matrix
 
     Creates the matrix transformation for the image based
     off the orientation data.
+    """
+    return compose_transformation_matrix(*get_attitude_angles(orientation), img_szie)
+
+
+def compose_transformation_matrix(pitch: float, yaw: float, roll: float,
+                                  img_szie: Tuple[float, float]) -> ndarray:
+    """Compose Transformation Matrix
+
+    Creates the matrix transformation for the image based
+    off the attitude angles (radians).
     This was taken from https://stackoverflow.com/a/37279632
     """
-    pitch = orientation["pitch"].item(0) if config.USE_PITCH else 0
-    yaw = orientation["yaw"].item(0) if config.USE_YAW else 0
-    roll = orientation["roll"].item(0) if config.USE_ROLL else 0
     dx, dy, dz = 0, 0, 1
 
     cx, cy = img_szie  # principal point that is usually at the image center
@@ -96,18 +130,164 @@ def get_transformation_matrix(orientation: dict, img_szie: Tuple[float, float])
     return h
 
 
-def rotate_image(img: ndarray, orientation: dict) -> ndarray:
-    """Rotate Image
+def get_frame_homography(orientation: dict, frame_size: Tuple[int, int]) -> ndarray:
+    """Get Frame Homography
+
+    @param: orientation (dict): orientation data of the vessel
+    @param: frame_size (tuple): (width, height) of the frame
+
+    @return: 3x3 homography from the captured to the orientation corrected frame,
+             None when the correction is within config.ROLL_DEAD_BAND
+    """
+    pitch, yaw, roll = get_attitude_angles(orientation)
+    if pitch == 0 and yaw == 0 and abs(roll) < config.ROLL_DEAD_BAND:
+        return None
+    return compose_transformation_matrix(pitch, yaw, roll, (frame_size[0] / 2, frame_size[1] / 2))
+
+
+def scale_matrix(src_size: Tuple[int, int], dsize: Tuple[int, int]) -> ndarray:
+    """Scale Matrix
+
+    @param: src_size (tuple): (width, height) of the source image
+    @param: dsize (tuple): (width, height) of the destination image
+
+    @return: 3x3 matrix scaling the source image to the destination size
+    """
+    return diag([dsize[0] / src_size[0], dsize[1] / src_size[1], 1.0])
+
+
+def quantize_attitude(pitch: float, yaw: float, roll: float) -> Tuple[int, int, int]:
+    """Quantize Attitude
+
+    @return: the attitude angles as whole multiples of config.ATTITUDE_QUANTUM
+    """
+    q = config.ATTITUDE_QUANTUM
+    return round(pitch / q), round(yaw / q), round(roll / q)
+
+
+def build_remap_tables(h: ndarray, dsize: Tuple[int, int]) -> Tuple[ndarray, ndarray]:
+    """Build Remap Tables
+
+    Computes the source pixel of every destination pixel of warpPerspective(img, h, dsize)
+    and converts the coordinates to the fixed-point format of cv2.remap.
+
+    @param: h (ndarray): 3x3 homography
+    @param: dsize (tuple): (width, height) of the destination image
+
+    @return: (CV_16SC2 map, interpolation table map)
+    """
+    width, height = dsize
+    xs, ys = meshgrid(arange(width, dtype=float32), arange(height, dtype=float32))
+    dst = stack((xs, ys, ones_like(xs)), axis=-1)
+
+    # Destination pixels are mapped back through the inverse homography
+    src = dst @ inv(h).T.astype(float32)
+    map_x = src[..., 0] / src[..., 2]
+    map_y = src[..., 1] / src[..., 2]
+
+    return convertMaps(map_x, map_y, CV_16SC2)
+
+
+def get_cached_transformation(orientation: dict, dsize: Tuple[int, int],
+                              src_size: Tuple[int, int] = None) -> Tuple[ndarray, ndarray, ndarray]:
+    """Get Cached Transformation
+
+    Looks up the homography and remap tables of the quantized attitude.
+    Building the tables costs about as much as the warps they save, so they
+    are only built once the attitude was seen config.TRANSFORMATION_CACHE_MIN_REQUESTS times.
+
+    @param: orientation (dict): orientation data of the vessel
+    @param: dsize (tuple): (width, height) of the transformed image
+    @param: src_size (tuple): (width, height) of the source image, defaults to dsize
+
+    @return: (homography, CV_16SC2 map, interpolation table map), None while they are not built
+    """
+    src_size = src_size or dsize
+    steps = quantize_attitude(*get_attitude_angles(orientation))
+    key = (steps, src_size, dsize, config.CAM_FOCAL_LENGTH, config.CAM_SENSOR_WIDTH)
+
+    def build():
+        angles = [step * config.ATTITUDE_QUANTUM for step in steps]
+        h = compose_transformation_matrix(*angles, (src_size[0] / 2, src_size[1] / 2))
+        if src_size != dsize:
+            h = matmul(scale_matrix(src_size, dsize), h)
+        return (h, *build_remap_tables(h, dsize))
+
+    return transformation_cache.get(key, build, config.TRANSFORMATION_CACHE_MIN_REQUESTS)
+
+
+def needs_warp(orientation: dict) -> bool:
+    """Needs Warp
 
-    @param: img_path (str): path to the image to rotate
     @param: orientation (dict): orientation data of the vessel
 
+    @return: False when the orientation is not corrected, see config.ROLL_DEAD_BAND
+    """
+    pitch, yaw, roll = get_attitude_angles(orientation)
+    return pitch != 0 or yaw != 0 or abs(roll) >= config.ROLL_DEAD_BAND
+
+
+def warp_image(img: ndarray, orientation: dict, interpolation: int,
+               dsize: Tuple[int, int] = None) -> ndarray:
+    """Warp Image
+
+    Applies the orientation correction with the given interpolation.
+    A pure roll is an in-plane rotation about the principal point, so it is
+    applied as an affine warp. Rolls within config.ROLL_DEAD_BAND are not applied.
+    When dsize differs from the image size, the scaling is composed with the
+    correction so the image is only resampled once, straight to dsize.
+
+    @param: img (ndarray): image to warp
+    @param: orientation (dict): orientation data of the vessel
+    @param: interpolation (int): OpenCV interpolation flag
+    @param: dsize (tuple): (width, height) of the warped image, defaults to the image size
+
     @return: numpy array with the (un)altered image
     """
     cols, rows, colors = img.shape
+    src_size = (rows, cols)
+    dsize = tuple(dsize or src_size)
+    pitch, yaw, roll = get_attitude_angles(orientation)
+
+    if not needs_warp(orientation):
+        return img if dsize == src_size else resize(img, dsize, interpolation=interpolation)
+
+    if pitch == 0 and yaw == 0:
+        # The last row of a pure roll homography is (0, 0, 1)
+        t = compose_transformation_matrix(0, 0, roll, (rows/2, cols/2))
+        t = matmul(scale_matrix(src_size, dsize), t)
+        return warpAffine(img, t[:2] / t[2, 2], dsize, flags=interpolation)
+
+    # Repeated (quantized) attitudes only cost a table lookup and a remap
+    cached = None
+    if config.TRANSFORMATION_CACHE_BYTES:
+        cached = get_cached_transformation(orientation, dsize, src_size)
+    if cached is not None:
+        _, map1, map2 = cached
+        return remap(img, map1, map2, interpolation)
 
     t = get_transformation_matrix(orientation, (rows/2, cols/2))
-    dst = warpPerspective(img, t, (rows, cols), flags=INTER_LANCZOS4)
+    t = matmul(scale_matrix(src_size, dsize), t)
+    return warpPerspective(img, t, dsize, flags=interpolation)
+
+
+def rotate_image(img: ndarray, orientation: dict, dsize: Tuple[int, int] = None) -> ndarray:
+    """Rotate Image
+
+    @param: img_path (str): path to the image to rotate
+    @param: orientation (dict): orientation data of the vessel
+    @param: dsize (tuple): (width, height) of the rotated image, defaults to the image size
+
+    @return: numpy array with the (un)altered image
+    """
+    # Warp times are measured per output size, no-op corrections and plain resizes are not measured
+    key = tuple(dsize or img.shape[1::-1])
+    name = interpolation_selector.select(key)
+
+    start = perf_counter()
+    dst = warp_image(img, orientation, interpolation_selector.flag(name), dsize)
+    if needs_warp(orientation):
+        interpolation_selector.record(name, perf_counter() - start, key)
 
     return dst
 
@@ -0,0 +1,72 @@
+"""Provides Region Of Interest Module
+
+Obstacles sit in a narrow band around the horizon. Functions provided in
+this module locate that band in a captured frame from the vessel's attitude
+and split it into square tiles the DNN can run on at native resolution.
+"""
+# ================ Built-in Imports ================
+
+from math import ceil, tan
+from typing import List, Tuple
+
+# ================ Third Party Imports ================
+
+from numpy import array, linspace
+
+# ================ User Imports ================
+
+import config
+
+
+def horizon_band(attitude: dict, frame_size: Tuple[int, int], margin: float) -> Tuple[int, int]:
+    """Horizon Band
+
+    The horizon crosses the middle column f * tan(pitch) pixels below the
+    image center and is tilted by the roll. Both angles are used whether or
+    not the orientation correction uses them (see config.USE_PITCH).
+
+    @param: attitude (dict): orientation data of the vessel, None when unknown (level)
+    @param: frame_size (tuple): (width, height) of the frame
+    @param: margin (float): fraction of the frame height kept above and below the horizon
+
+    @return: (top, bottom) rows of the band in the captured frame
+    """
+    width, height = frame_size
+    ys = array([height / 2, height / 2])
+
+    if attitude is not None:
+        # focal length expressed in pixel units
+        f = config.CAM_FOCAL_LENGTH / config.CAM_SENSOR_WIDTH * width
+        pitch = attitude["pitch"].item(-1)
+        roll = attitude["roll"].item(-1)
+        # rows of the horizon at the left and right edges of the frame
+        ys = height / 2 + f * tan(pitch) - (array([0, width]) - width / 2) * tan(roll)
+
+    top = int(min(max(ys.min() - margin * height, 0), height))
+    bottom = int(min(ys.max() + margin * height, height))
+    return top, max(top, bottom)
+
+
+def band_tiles(band: Tuple[int, int], frame_size: Tuple[int, int],
+               tile_size: int, overlap: float) -> List[Tuple[int, int, int, int]]:
+    """Band Tiles
+
+    Covers the band with overlapping square tiles, at least tile_size pixels wide.
+
+    @param: band (tuple): (top, bottom) rows of the band
+    @param: frame_size (tuple): (width, height) of the frame
+    @param: tile_size (int): smallest side of a tile, usually the DNN input size
+    @param: overlap (float): fraction of a tile shared with its neighbour
+
+    @return: (x, y, width, height) of each tile in the frame
+    """
+    width, height = frame_size
+    top, bottom = band
+    side = min(max(bottom - top, tile_size), height, width)
+
+    # Center the tiles on the band, inside the frame
+    y = min(max((top + bottom - side) // 2, 0), height - side)
+
+    step = side * (1 - overlap)
+    count = max(ceil((width - side) / step), 0) + 1
+    return [(int(round(x)), y, side, side) for x in linspace(0, width - side, count)]
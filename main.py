@@ -5,20 +5,30 @@
 # ================ Built-in Imports ================ #
 
 import argparse
+from collections import namedtuple
+from itertools import count
 
 # ================ Third Party Imports ================ #
 
 import cv2 as cv
-from time import time
+import numpy as np
+from time import perf_counter
 
 # ================ User Imports ================ #
 
 import config
+from classes.FrameScheduler import FrameScheduler
 from classes.Imu import Imu
-from classes.object_position_processing import calculate_angle
+from classes.Pipeline import Pipeline
+from classes.Publisher import Publisher, make_tracks
+from classes.TrackServer import TrackServer
+from classes.mip_parser import datenum_to_unix, unix_to_datenum
+from classes.object_position_processing import calculate_angles
 from image_manipulation import image_transformation
+from image_manipulation import region_of_interest
 from object_detection import detect_and_track
 from object_detection import CentroidTracker
+from object_detection.MotionGate import MotionGate
 
 # ================ Authorship ================ #
 
@@ -29,6 +39,14 @@ __contributors__ = ["Chris Patenaude", "Gabriel Michael",
 
 # ================ Global Variables ================ #
 
+# A captured frame prepared for the DNN, see preprocess
+# flow is the (grayscale image, matrix) of the frame from MotionGate.prepare, None without motion gating
+# and detect tells whether the DNN runs on the frame or the tracked objects are moved with optical flow.
+# frame_id numbers the processed frames and captured_at is their capture time, see capture
+Frame = namedtuple('Frame', ['network_input', 'display_image', 'frame_size', 'homography', 'tiles', 'flow', 'detect',
+                             'frame_id', 'captured_at'],
+                   defaults=[None, None, True, None, None])
+
 # ================ Functions ================ #
 
 
@@ -38,109 +56,358 @@ def get_args():
     return vars(ap.parse_args())
 
 
-# ================ Main ================ #
+def output_tracked_objects(frame, tracker, publishers=()):
+    """Draw and output the objects being tracked after a frame was processed
 
-if __name__ == "__main__":
+    @param: frame (Frame): the processed frame, see preprocess
+    @param: tracker (CentroidTracker): tracker updated with the frame's detections
+    @param: publishers (list): Publisher and TrackServer the objects are sent to, printed when empty
+    """
+    # display on system
+    if config.DRAW_TO_SCREEN and frame.display_image is not None:
+        # Draw the objects being tracked
+        tracker.draw_objects(frame.display_image)
+        cv.imshow('Tracked Objects', frame.display_image)
 
-    # Parse Command Line Arguments
-    args = get_args()
+    # calculate pos, one bearing per tracked object ordered by ID
+    rows = np.argsort(tracker.ids[:len(tracker)], kind='stable')
+    object_ids = tracker.ids[rows]
+    centroids_x = tracker.centroids[rows, 0]  # horizontal center of bounding box
+    compass_angles = calculate_angles(centroids_x, frame.frame_size[1])
 
-    # Component initilization
-    imu = Imu(config.IMU_PATH)
+    if config.VERBOSE:
+        for (objID, obj) in tracker.objects.items():
+            print("objID: " + str(objID) +
+                  ", Centroid_xpos: " + str(obj.centroid[0]) +
+                  ", size_increase: " + str(obj.size_increase))
 
-    # Video Frame Streaming
-    cap = cv.VideoCapture(config.CAPTURE_DEVICE)
+    # output pos
+    if not publishers:
+        print(list(zip(object_ids.tolist(), compass_angles.tolist())))
+        return
 
-    # Set up video writer
-    # Define the codec and create VideoWriter object
-    fourcc = cv.VideoWriter_fourcc(*'XVID')
-    out = cv.VideoWriter('output.avi', fourcc, 20.0, (1200, 675))
+    class_ids = [getattr(tracker.histories[row].last, 'class_id', -1) for row in rows.tolist()]
+    tracks = make_tracks(object_ids, compass_angles, 10000 * tracker.rates[rows], class_ids)
+    for publisher in publishers:
+        publisher.publish(frame.frame_id or 0, frame.captured_at or 0.0, tracks)
 
-    # Set up object tracker
-    tracker = CentroidTracker.CentroidTracker()
 
-    # Time in seconds
-    frame_processing_interval = config.FRAME_INTERVAL
+def detect_batch(frames, tracker, gate=None, publishers=()):
+    """Detect and track objects in a batch of processed frames with a single forward pass
+
+    @param: frames (list): processed Frames in capture order, see preprocess. Frames the
+            gate skipped (detect is False) are only tracked, in order with the others
+    @param: tracker (CentroidTracker): tracker to persistently track found objects
+    @param: gate (MotionGate): gate shared by the frames, None without motion gating
+    @param: publishers (list): Publisher and TrackServer the tracked objects are sent to, printed when empty
+    """
+    detected = [frame for frame in frames if frame.detect]
+    detections = iter(detect_frames(detected) if detected else [])
+
+    for frame in frames:
+        track_frame(frame, tracker, gate, next(detections) if frame.detect else None, publishers)
+
+
+def detect_frames(frames):
+    """Run the DNN on a batch of processed frames with a single forward pass
+
+    @param: frames (list): processed Frames, see preprocess
+
+    @return: list of Detections, one per frame
+    """
+    return detect_and_track.detect_objects(
+        [frame.network_input for frame in frames],
+        frame_sizes=[frame.frame_size for frame in frames],
+        homographies=[frame.homography for frame in frames],
+        tiles=[frame.tiles for frame in frames])
+
+
+def get_attitude(imu, captured_at):
+    """Attitude of the vessel when a frame was captured
+
+    @param: imu (Imu): the vessel's IMU
+    @param: captured_at (float): capture time of the frame (Unix time)
+
+    @return: orientation data, None if no attitude has been decoded yet
+    """
+    if config.IMU_BACKGROUND or config.IMU_CACHE:
+        return imu.orientation_at(
+            unix_to_datenum(captured_at + config.IMU_CLOCK_OFFSET))
+    return imu.get_last_orientation()
+
+
+def replay_start_time(imu):
+    """Unix time the first frame of a replayed video file was captured at, see config.VIDEO_START_TIME
+
+    @param: imu (Imu): the vessel's IMU
+
+    @return: the start time, None when it is unknown
+    """
+    if config.VIDEO_START_TIME is not None:
+        return config.VIDEO_START_TIME
+    nuc_time = imu.first_nuc_time()
+    if nuc_time is None:
+        return None
+    return datenum_to_unix(nuc_time) - config.IMU_CLOCK_OFFSET
+
+
+def correct_orientation(img, attitude):
+    """Transform the frame with the vessel's attitude
+
+    @param: img (np array): captured frame
+    @param: attitude (dict): orientation data, None if no attitude has been decoded yet
+
+    @return: the orientation corrected frame (or the frame itself without attitude)
+    """
+    if attitude is None:
+        return img
+    return image_transformation.rotate_image(img, attitude)
+
+
+def preprocess(img, attitude):
+    """Prepare a captured frame for the DNN, see config.PREPROCESSING
+
+    @param: img (np array): captured frame
+    @param: attitude (dict): orientation data, None if no attitude has been decoded yet
+
+    @return: Frame with the DNN input, the full resolution corrected frame (None when
+             it is not needed), the (rows, cols) of the frame, the homography mapping
+             detections into the corrected frame (None when they are found in it) and
+             the tiles of the frame to detect in (None to detect in the whole input)
+    """
+    frame_size = img.shape[:2]
+
+    if config.PREPROCESSING == 'full':
+        transformed_image = correct_orientation(img, attitude)
+        return Frame(transformed_image, transformed_image, frame_size, None)
+
+    display_image = correct_orientation(img, attitude) if config.DRAW_TO_SCREEN else None
+    input_size = detect_and_track.detector.input_size
+
+    # Detect in the captured frame, only the detections are transformed
+    if config.PREPROCESSING in ('raw', 'roi'):
+        homography = None
+        if attitude is not None:
+            homography = image_transformation.get_frame_homography(attitude, frame_size[::-1])
+
+        if config.PREPROCESSING == 'raw':
+            return Frame(cv.resize(img, input_size), display_image, frame_size, homography)
+
+        # Tiles of the band around the horizon at native resolution
+        band = region_of_interest.horizon_band(attitude, frame_size[::-1], config.ROI_BAND_MARGIN)
+        tiles = region_of_interest.band_tiles(band, frame_size[::-1], input_size[1], config.ROI_TILE_OVERLAP)
+        return Frame(img, display_image, frame_size, homography, tiles)
+
+    # Warp once, straight to the DNN input size
+    if attitude is None:
+        network_input = cv.resize(img, input_size)
+    else:
+        network_input = image_transformation.rotate_image(img, attitude, input_size)
+
+    return Frame(network_input, display_image, frame_size, None)
+
+
+def gate_frame(frame, gate):
+    """Decide whether the DNN runs on a frame, see config.MOTION_GATING
+
+    @param: frame (Frame): the processed frame
+    @param: gate (MotionGate): gate shared by the frames, None to detect in every frame
 
-    # Last time a frame was processed
-    last_processed_at = time()
+    @return: the Frame with its flow image and detection decision
+    """
+    if gate is None:
+        return frame
+    flow = gate.prepare(frame.network_input, frame.frame_size, frame.homography)
+    return frame._replace(flow=flow, detect=gate.needs_detection(flow[0]))
 
-    # Number of skipped frames
-    skipped_frames = 0
 
-    # Current frame count
-    frame_count = 0
+def track_frame(frame, tracker, gate, detections=None, publishers=()):
+    """Update the tracker with a frame, then output the tracked objects
+
+    @param: frame (Frame): the processed frame
+    @param: tracker (CentroidTracker): tracker to persistently track found objects
+    @param: gate (MotionGate): gate shared by the frames, None without motion gating
+    @param: detections (Detections): the frame's detections, None when they were not run
+    @param: publishers (list): Publisher and TrackServer the tracked objects are sent to, printed when empty
+    """
+    if detections is not None:
+        # the objects were found when the frame was captured, not when the DNN finished
+        if frame.captured_at is not None:
+            detections.timestamp = frame.captured_at
+        tracker.update(detections, detections.centroids(), timestamp=frame.captured_at)
+        if gate is not None:
+            gate.track(*frame.flow)
+    elif gate is not None:
+        gate.propagate(tracker, *frame.flow, timestamp=frame.captured_at)
+
+    output_tracked_objects(frame, tracker, publishers)
+
+
+def capture(scheduler, frame_ids):
+    """Next frame to process, numbered
+
+    @param: scheduler (FrameScheduler): source of the frames to process
+    @param: frame_ids (iterator): numbers of the processed frames
+
+    @return: (frame id, capture time, frame), None at the end of the stream
+    """
+    captured = scheduler.next_frame()
+    if captured is None:
+        return None
+    return (next(frame_ids),) + tuple(captured)
+
+
+def prepare_frame(captured, imu, gate):
+    """Preprocess and gate a captured frame
+
+    @param: captured (tuple): (frame id, capture time, frame) from capture
+    @param: imu (Imu): the vessel's IMU
+    @param: gate (MotionGate): gate shared by the frames, None without motion gating
+
+    @return: the Frame
+    """
+    (frame_id, captured_at, img) = captured
+    frame = preprocess(img, get_attitude(imu, captured_at))
+    return gate_frame(frame._replace(frame_id=frame_id, captured_at=captured_at), gate)
+
+
+def run_sequential(scheduler, imu, tracker, publishers=()):
+    """Capture, transform, detect and output each processed frame one after another
+
+    @param: scheduler (FrameScheduler): source of the frames to process
+    @param: imu (Imu): the vessel's IMU
+    @param: tracker (CentroidTracker): tracker to persistently track found objects
+    @param: publishers (list): Publisher and TrackServer the tracked objects are sent to, printed when empty
+    """
+    gate = MotionGate() if config.MOTION_GATING else None
+    frame_ids = count()
+
+    # Processed frames waiting for a batched forward pass, with the frames the
+    # gate skipped in between so they are tracked in capture order
+    batch = []
+    detected = 0
 
     while True:
-        # Press Q on keyboard to  exit
-        if cv.waitKey(1) & 0xFF == ord('q'):
+        # get image
+        captured = capture(scheduler, frame_ids)
+        if captured is None:
             break
+        started_at = perf_counter()
 
-        # get image
-        ret, img = cap.read()
-        if not ret:
+        # get attitude if valid image and transform the image
+        frame = prepare_frame(captured, imu, gate)
+
+        # detect and classify objects once a batch of frames to detect in is gathered
+        batch.append(frame)
+        detected += frame.detect
+        if detected >= config.BATCH_SIZE:
+            detect_batch(batch, tracker, gate, publishers)
+            batch = []
+            detected = 0
+
+        scheduler.record(perf_counter() - started_at)
+
+        # Press Q on keyboard to  exit
+        if config.DRAW_TO_SCREEN and cv.waitKey(1) & 0xFF == ord('q'):
             break
 
-        frame_count += 1
+    # Process the frames left in the last (partial) batch
+    detect_batch(batch, tracker, gate, publishers)
+
+
+def run_pipeline(scheduler, imu, tracker, publishers=()):
+    """Run capture, orientation correction and inference on their own threads
 
-        # Process a frame each time the interval has passed
-        if last_processed_at + frame_processing_interval < time():
+    The stages are connected by bounded queues that drop their oldest frame
+    when full, tracking and output run on the main thread.
 
-            if config.VERBOSE:
-                print("__________ Frame: " + str(frame_count) + " __________")
-                print("Skipped Frames: " + str(skipped_frames))
-                skipped_frames = 0
+    @param: scheduler (FrameScheduler): source of the frames to process
+    @param: imu (Imu): the vessel's IMU
+    @param: tracker (CentroidTracker): tracker to persistently track found objects
+    @param: publishers (list): Publisher and TrackServer the tracked objects are sent to, printed when empty
+    """
+    gate = MotionGate() if config.MOTION_GATING else None
+    frame_ids = count()
 
-            last_processed_at = time()
+    def orient(frames):
+        return [prepare_frame(captured, imu, gate) for captured in frames]
 
-            # get attitude if valid image
-            attitude = imu.get_last_orientation()
+    def infer(frames):
+        started_at = perf_counter()
+        detected = [frame for frame in frames if frame.detect]
+        detections = iter(detect_frames(detected) if detected else [])
 
-            # Transform image
-            transformed_image = image_transformation.rotate_image(
-                img, attitude)
+        # Inference is the slowest stage, it sets the rate frames are captured at
+        scheduler.record((perf_counter() - started_at) / len(frames))
+        return [(frame, next(detections) if frame.detect else None) for frame in frames]
 
-            # detect and classify object
-            detect_and_track.detect_in_image(transformed_image, tracker)
+    pipeline = Pipeline(config.PIPELINE_QUEUE_SIZE)
+    pipeline.add_source('capture', lambda: capture(scheduler, frame_ids))
+    pipeline.add_stage('orientation', orient)
+    pipeline.add_stage('inference', infer, batch_size=config.BATCH_SIZE)
+    pipeline.start()
 
-            # display on system
-            if config.DRAW_TO_SCREEN:
-                # Draw the objects being tracked
-                tracker.draw_objects(transformed_image)
-                cv.imshow('Tracked Objects', transformed_image)
+    for (frame, detections) in pipeline.results():
+        track_frame(frame, tracker, gate, detections, publishers)
 
-            # calculate pos
-            output = []
-            viewport_width = transformed_image.shape[1]  # image x dimension px
-            viewport_height = transformed_image.shape[0]  # image y dimension px
-            viewport_angle = config.VIEWPORT_ANGLE  # image diagnal px
-            for item in tracker.objects.items():
+        # Press Q on keyboard to  exit
+        if config.DRAW_TO_SCREEN and cv.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    pipeline.stop()
+
+    if config.VERBOSE:
+        print("Dropped Frames: " + str(pipeline.dropped()))
+
+
+# ================ Main ================ #
+
+if __name__ == "__main__":
+
+    # Parse Command Line Arguments
+    args = get_args()
 
-                (objID, obj) = item
-                centroid_xpos = obj.centroid[0]  # horizontal center of bounding box
+    # Component initilization
+    imu = Imu(config.IMU_PATH, follow=config.IMU_FOLLOW, cache=config.IMU_CACHE)
+    if config.IMU_BACKGROUND:
+        imu.start()
 
-                compass_angle = calculate_angle(
-                    viewport_width,
-                    viewport_height,
-                    viewport_angle,
-                    centroid_xpos
-                )
+    # Video Frame Streaming
+    cap = cv.VideoCapture(config.CAPTURE_DEVICE)
+    scheduler = FrameScheduler(cap, config.FRAME_INTERVAL, config.ADAPTIVE_FRAME_RATE, config.SEEK_THRESHOLD,
+                               start_time=replay_start_time(imu))
 
-                if config.VERBOSE:
-                    print("objID: " + str(objID) +
-                          ", Centroid_xpos: " + str(centroid_xpos) +
-                          ", size_increase: " + str(obj.size_increase))
+    # Set up video writer
+    # Define the codec and create VideoWriter object
+    fourcc = cv.VideoWriter_fourcc(*'XVID')
+    out = cv.VideoWriter('output.avi', fourcc, 20.0, (1200, 675))
+
+    # Set up object tracker
+    tracker = CentroidTracker.CentroidTracker()
 
-                detected_obj = (objID, compass_angle)
-                output.append(detected_obj)
+    # Set up the outputs to the navigation system and other subscribers
+    publishers = []
+    if config.PUBLISHER:
+        publishers.append(Publisher(config.PUBLISH_ADDRESS, config.PUBLISHER, config.PUBLISH_QUEUE_SIZE))
+    if config.TRACK_SERVER:
+        publishers.append(TrackServer(config.TRACK_SERVER_ADDRESS, config.TRACK_SERVER,
+                                      config.TRACK_SERVER_BUFFER).start())
 
-            # output pos
-            print(output)
+    if config.PIPELINE:
+        run_pipeline(scheduler, imu, tracker, publishers)
+    else:
+        run_sequential(scheduler, imu, tracker, publishers)
 
-        else:
-            skipped_frames += 1
+    if config.VERBOSE:
+        print("Frames: " + str(scheduler.metrics()))
+        for publisher in publishers:
+            print("Published: " + str(publisher.metrics()))
 
     # Clean up
+    for publisher in publishers:
+        publisher.close(1.0)
+    tracker.close()
+    imu.close()
     cap.release()
     out.release()
     cv.destroyAllWindows()
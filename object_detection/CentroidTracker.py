@@ -1,177 +1,377 @@
 """ Centroid tracker based on code by Adrian Rosebrock
     (Avaliable:  https://www.pyimagesearch.com/2018/07/23/simple-object-tracking-with-opencv/)
     * Takes a list of rectangles at each time step, and
-    matches them by dynamically minimizing the euclidian
-    distance between center points from one frame to another.
+    matches them by minimizing the euclidian distance between center
+    points (or another cost, see association.py) from one frame to
+    another. Matches costing more than a gate are not made.
+    * The state of the tracked objects (IDs, centroids, bounding boxes,
+    disappeared counters, size increase rates) is kept in preallocated
+    NumPy arrays with a row per object, so ageing, deregistering and
+    matching are vectorized. Deregistering moves the last row into the
+    place of the removed one.
     * Also stores information about each detected object over
-    time by keeping a dictionary of lists of data objects.
+    time by keeping a bounded TrackHistory per object, older samples can
+    be spilled to a TrackLog (see config.TRACK_LOG).
+    * The objects property is an ordered mapping of TrackedObject
+    snapshots, built when it is first read after each change, for code
+    that reads objects one by one.
     * Contains a draw method which displays all objects
     being tracked on an image.
+    * Optionally predicts the motion of every object with a constant
+    velocity Kalman filter, so detections are matched to where objects are
+    expected to be and undetected objects keep moving.
 """
 
 # ================ Built-in Imports ================ #
 from collections import OrderedDict
+from collections.abc import Mapping
 
 # ================ Third Party Imports ================ #
 
-from scipy.spatial import distance as dist
 import numpy as np
 
 # ================ User Imports ================ #
 
+import config
 from object_detection import TrackedObject
+from object_detection import association
+from object_detection.KalmanFilter import KalmanFilter
+from object_detection.TrackHistory import TrackHistory, TrackLog
 
 
 # ================ Class defenition ================ #
+class TrackedObjects(Mapping):
+    # ordered by ID, the TrackedObject snapshots are only built when the
+    # mapping is first read and are not written back to the tracker
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.__objects = None
+
+    def __materialize(self):
+        if self.__objects is None:
+            tracker = self.tracker
+            self.__objects = OrderedDict()
+            for row in np.argsort(tracker.ids[:tracker.count], kind='stable'):
+                obj = TrackedObject.TrackedObject(tracker.centroids[row].copy(), None, tracker.histories[row])
+                obj.disappeared = int(tracker.disappeared[row])
+                obj.rate = float(tracker.rates[row])
+                if not np.isnan(obj.rate):
+                    obj.size_increase = 10000 * obj.rate
+                self.__objects[int(tracker.ids[row])] = obj
+        return self.__objects
+
+    def __getitem__(self, object_id):
+        return self.__materialize()[object_id]
+
+    def __iter__(self):
+        return iter(self.__materialize())
+
+    def __len__(self):
+        return len(self.__materialize())
+
+
 class CentroidTracker:
-    def __init__(self, max_disappeared=20):
-        # initialize the next unique object ID along with two ordered
-        # dictionaries used to keep track of mapping a given object
-        # ID to its centroid and number of consecutive frames it has
-        # been marked as "disappeared", respectively
+    def __init__(self, max_disappeared=20, prediction=None, assignment=None, cost=None, max_cost=None,
+                 capacity=64):
+        # initialize the next unique object ID, and the arrays holding
+        # the state of the objects. The first count rows are in use
         self.nextObjectID = 0
-        self.objects = OrderedDict()
+        self.count = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.centroids = np.zeros((capacity, 2), dtype=np.int64)
+        # last bounding box of each object, NaN when it is unknown
+        self.rects = np.full((capacity, 4), np.nan)
+        # number of consecutive frames each object has been marked as "disappeared"
+        self.disappeared = np.zeros(capacity, dtype=np.int64)
+        # size and timestamp of the last data of each object, and the
+        # exponential moving average of its size increase rate (NaN until known)
+        self.sizes = np.full(capacity, np.nan)
+        self.timestamps = np.full(capacity, np.nan)
+        self.rates = np.full(capacity, np.nan)
+        # TrackHistory of each object, and the log their old samples are spilled to
+        self.histories = []
+        self.history_depth = config.TRACK_HISTORY_DEPTH
+        self.log = TrackLog(config.TRACK_LOG) if config.TRACK_LOG else None
+
+        # TrackedObject snapshots, built on first access after a change
+        self.__objects = None
 
         # store the number of maximum consecutive frames a given
         # object is allowed to be marked as "disappeared" until we
         # need to deregister the object from tracking
         self.maxDisappeared = max_disappeared
 
+        # constant velocity filter with the same rows as the arrays
+        # above, None when objects are matched to their last centroid
+        if prediction is None:
+            prediction = config.TRACKER_PREDICTION
+        self.filter = None
+        if prediction:
+            self.filter = KalmanFilter(config.KALMAN_PROCESS_NOISE,
+                                       config.KALMAN_MEASUREMENT_NOISE,
+                                       config.KALMAN_VELOCITY_UNCERTAINTY,
+                                       capacity)
+        # time of the last update, see update
+        self.last_timestamp = None
+
+        # how objects are matched to new inputs ('centroid', 'size' or 'iou'
+        # cost), see association.py. Pairs costing more than max_cost are never matched
+        self.assignment = assignment or config.ASSOCIATION
+        self.cost = cost or config.ASSOCIATION_COST
+        self.max_cost = config.ASSOCIATION_MAX_COST[self.cost] if max_cost is None else max_cost
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def objects(self):
+        # ordered mapping of object ID to TrackedObject, see TrackedObjects
+        if self.__objects is None:
+            self.__objects = TrackedObjects(self)
+        return self.__objects
+
+    def changed(self):
+        # drops the TrackedObject snapshots
+        self.__objects = None
+
+    def close(self):
+        # spills the samples of the objects still tracked and closes the log
+        for history in self.histories:
+            history.close()
+            history.log = None
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
     def draw_objects(self, img):
         # loop over the tracked objects and display the centroid
         for (objID, obj) in self.objects.items():
             obj.draw_object(objID, img)
 
-    def register(self, centroid, data_obj):
+    def __grow(self):
+        grow = max(len(self.ids), 1)
+
+        def extend(array, fill):
+            return np.concatenate((array, np.full((grow,) + array.shape[1:], fill, dtype=array.dtype)))
+
+        self.ids = extend(self.ids, 0)
+        self.centroids = extend(self.centroids, 0)
+        self.rects = extend(self.rects, np.nan)
+        self.disappeared = extend(self.disappeared, 0)
+        self.sizes = extend(self.sizes, np.nan)
+        self.timestamps = extend(self.timestamps, np.nan)
+        self.rates = extend(self.rates, np.nan)
+
+    def register(self, centroid, data_obj, scale=0, rect=None):
         # when registering an object we use the next available object
-        # ID to store the centroid
-        self.objects[self.nextObjectID] = TrackedObject.TrackedObject(centroid, data_obj)
+        # ID and the next free row to store its state. rect is its
+        # bounding box around centroid, the rect of data_obj by default
+        if self.count == len(self.ids):
+            self.__grow()
+
+        row = self.count
+        self.ids[row] = self.nextObjectID
+        self.centroids[row] = centroid
+        if rect is None:
+            rect = getattr(data_obj, 'rect', None)
+        self.rects[row] = np.nan if rect is None else rect
+        self.disappeared[row] = 0
+        self.sizes[row] = getattr(data_obj, 'size', np.nan)
+        self.timestamps[row] = getattr(data_obj, 'timestamp', np.nan)
+        self.rates[row] = np.nan
+        history = TrackHistory(self.history_depth, self.log, self.nextObjectID)
+        history.append(data_obj)
+        self.histories.append(history)
+
+        self.count += 1
         self.nextObjectID += 1
 
+        if self.filter is not None:
+            self.filter.add(centroid, scale)
+        self.changed()
+
+    def remove_rows(self, rows):
+        # the last rows take the place of the removed ones, rows are
+        # removed from the last one so no row moves twice
+        for row in sorted(np.asarray(rows, dtype=int).tolist(), reverse=True):
+            last = self.count - 1
+            for array in (self.ids, self.centroids, self.rects, self.disappeared,
+                          self.sizes, self.timestamps, self.rates):
+                array[row] = array[last]
+            self.histories[row].close()
+            self.histories[row] = self.histories[last]
+            self.histories.pop()
+            self.count = last
+
+            if self.filter is not None:
+                self.filter.remove(row)
+        self.changed()
+
     def deregister(self, object_id):
-        # to deregister an object ID we delete the object ID from
-        # both of our respective dictionaries
-        del self.objects[object_id]
+        # to deregister an object ID we remove its row
+        self.remove_rows(np.flatnonzero(self.ids[:self.count] == object_id))
+
+    def age(self, rows):
+        # marks objects as disappeared and deregisters the ones that
+        # have been missing for more than maxDisappeared frames
+        self.disappeared[rows] += 1
+        self.remove_rows(np.flatnonzero(self.disappeared[:self.count] > self.maxDisappeared))
+
+    def move(self, offsets, rows=None, timestamp=None):
+        """Move objects without a new detection, e.g. with optical flow
+
+        @param: offsets (np array): (dx, dy) of each moved object
+        @param: rows (np array): rows of the moved objects, all of them by default
+        @param: timestamp (float): time of the frame the objects moved in, see update
+        """
+        if rows is None:
+            rows = np.arange(self.count)
+        rows = np.asarray(rows, dtype=int)
+        offsets = np.broadcast_to(np.asarray(offsets, dtype=float), (len(rows), 2))
+        moved = self.centroids[rows] + offsets
+        self.centroids[rows] = np.round(moved).astype(np.int64)
+        self.rects[rows] += np.tile(offsets, 2)
+
+        # the moved positions are measurements of the filtered objects, so the
+        # filter is predicted up to the frame before it is corrected
+        self.predict(timestamp)
+        if self.filter is not None:
+            self.filter.correct(rows, np.column_stack((moved, self.filter.x[rows, 2])))
+
+        # keep the drawn bounding box with the object
+        for (row, (dx, dy)) in zip(rows.tolist(), offsets):
+            data = self.histories[row].last
+            rect = getattr(data, 'rect', None)
+            if rect is not None:
+                (startX, startY, endX, endY) = rect
+                data.rect = (int(round(startX + dx)), int(round(startY + dy)),
+                             int(round(endX + dx)), int(round(endY + dy)))
+        self.changed()
+
+    def predict(self, timestamp):
+        # move the filtered objects to where they are expected at timestamp,
+        # updates without a timestamp are one time unit apart
+        if timestamp is None or self.last_timestamp is None:
+            dt = 1.0
+        else:
+            dt = max(timestamp - self.last_timestamp, 0)
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+
+        if self.filter is not None and len(self.filter):
+            self.filter.predict(dt)
+
+    def coast(self):
+        # objects that were not detected follow their predicted centroid
+        if self.filter is not None:
+            coasting = np.flatnonzero(self.disappeared[:self.count] > 0)
+            self.centroids[coasting] = self.filter.positions[coasting].astype(np.int64)
+
+    def object_scales(self):
+        # square root of the bounding box area of every object
+        if self.filter is not None:
+            return self.filter.x[:, 2]
+        rects = self.rects[:self.count]
+        return np.nan_to_num(np.sqrt(np.abs((rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1]))))
+
+    def object_rects(self, object_centroids):
+        # last bounding box of every object moved to object_centroids,
+        # an empty box on the centroid without one
+        rects = self.rects[:self.count]
+        sizes = np.nan_to_num(rects[:, 2:] - rects[:, :2])
+        low = object_centroids - sizes / 2
+        return np.concatenate((low, low + sizes), axis=1)
+
+    def update_rows(self, rows, centroids, rects, sizes, timestamps, data):
+        # sets the new centroid and data of the matched objects and
+        # resets their disappeared counter
+        self.centroids[rows] = centroids
+        self.disappeared[rows] = 0
+        self.rects[rows] = np.where(np.isnan(rects), self.rects[rows], rects)
+
+        # exponential moving average of the rate of size increase
+        self.rates[rows] = TrackedObject.update_rates(self.rates[rows], self.sizes[rows], sizes,
+                                                      self.timestamps[rows], timestamps)
+
+        has_data = np.array([d is not None for d in data], dtype=bool)
+        self.sizes[rows[has_data]] = sizes[has_data]
+        self.timestamps[rows[has_data]] = timestamps[has_data]
+        for (row, data_obj) in zip(rows[has_data].tolist(), np.asarray(data, dtype=object)[has_data]):
+            self.histories[row].append(data_obj)
 
     # Parameter newObjs is a list of rectangle lists [startX, startY, endX, endY]
-    def update(self, new_objs):
+    # Parameter centroids optionally gives their centroids, e.g. mapped from an unwarped frame
+    # Parameter timestamp is the time of the detections, defaults to the timestamp of new_objs
+    # (see Detections) or of their data
+    def update(self, new_objs, centroids=None, timestamp=None):
+        if timestamp is None:
+            timestamp = getattr(new_objs, 'timestamp', None)
+        if timestamp is None and len(new_objs):
+            timestamp = getattr(new_objs[0][4], 'timestamp', None)
+        self.predict(timestamp)
+
         # check to see if the list of input bounding box rectangles
         # is empty
         if len(new_objs) == 0:
-            # loop over any existing tracked objects and mark them
-            # as disappeared
-            for object_id in list(self.objects.keys()):
-                self.objects[object_id].update(disappeared=True)
-
-                # if we have reached a maximum number of consecutive
-                # frames where a given object has been marked as
-                # missing, deregister it
-                if self.objects[object_id].disappeared > self.maxDisappeared:
-                    self.deregister(object_id)
+            # mark all existing tracked objects as disappeared
+            self.age(np.arange(self.count))
+            self.coast()
 
             # return early as there are no centroids or tracking info
             # to update
             return self.objects
 
-        # initialize an array of input centroids for the current frame
-        input_centroids = np.zeros((len(new_objs), 2), dtype="int")
-        input_data = []
-        # loop over the bounding box rectangles
-        for (i, (startX, startY, endX, endY, dataObj)) in enumerate(new_objs):
-            # use the bounding box coordinates to derive the centroid
-            c_x = int((startX + endX) / 2.0)
-            c_y = int((startY + endY) / 2.0)
-            input_centroids[i] = (c_x, c_y)
-            input_data.append(dataObj)
-
-        # if we are currently not tracking any objects take the input
-        # centroids and register each of them
-        if len(self.objects) == 0:
-            for i in range(0, len(input_centroids)):
-                self.register(input_centroids[i], input_data[i])
-
-        # otherwise, we are currently tracking objects so we need to
-        # try to match the input centroids to existing object
-        # centroids
+        # initialize the arrays of the inputs of the current frame
+        entries = list(new_objs)
+        input_rects = np.array([entry[:4] for entry in entries], dtype=float).reshape(-1, 4)
+        input_data = [entry[4] for entry in entries]
+        input_sizes = np.array([getattr(d, 'size', np.nan) for d in input_data], dtype=float)
+        input_timestamps = np.array([getattr(d, 'timestamp', np.nan) for d in input_data], dtype=float)
+
+        # use the bounding box coordinates to derive the centroids
+        input_centroids = ((input_rects[:, :2] + input_rects[:, 2:]) / 2.0).astype(np.int64)
+        input_scales = np.sqrt(np.abs(np.prod(input_rects[:, 2:] - input_rects[:, :2], axis=1)))
+
+        if centroids is not None:
+            # move the rects with their centroids
+            centroids = np.asarray(centroids, dtype=np.int64).reshape(-1, 2)
+            input_rects += np.tile(centroids - input_centroids, 2)
+            input_centroids = centroids
+
+        # compute the cost of matching each pair of object and
+        # input, then find the cheapest matches whose cost is
+        # within the gate
+        if self.filter is not None:
+            # match against where the objects are expected to be
+            object_centroids = self.filter.positions
         else:
-            # grab the set of object IDs and corresponding centroids
-            object_ids = list(self.objects.keys())
-            object_centroids = [o.centroid for o in self.objects.values()]
-
-            # compute the distance between each pair of object
-            # centroids and input centroids, respectively -- our
-            # goal will be to match an input centroid to an existing
-            # object centroid
-            d = dist.cdist(np.array(object_centroids), input_centroids)
-
-            # in order to perform this matching we must (1) find the
-            # smallest value in each row and then (2) sort the row
-            # indexes based on their minimum values so that the row
-            # with the smallest value as at the *front* of the index
-            # list
-            rows = d.min(axis=1).argsort()
-
-            # next, we perform a similar process on the columns by
-            # finding the smallest value in each column and then
-            # sorting using the previously computed row index list
-            cols = d.argmin(axis=1)[rows]
-
-            # in order to determine if we need to update, register,
-            # or deregister an object we need to keep track of which
-            # of the rows and column indexes we have already examined
-            used_rows = set()
-            used_cols = set()
-
-            # loop over the combination of the (row, column) index
-            # tuples
-            for (row, col) in zip(rows, cols):
-                # if we have already examined either the row or
-                # column value before, ignore it
-                # val
-                if row in used_rows or col in used_cols:
-                    continue
-
-                # otherwise, grab the object ID for the current row,
-                # set its new centroid, and reset the disappeared
-                # counter
-                object_id = object_ids[row]
-                self.objects[object_id].update(centroid=input_centroids[col],
-                                               data=input_data[col])
-
-                # indicate that we have examined each of the row and
-                # column indexes, respectively
-                used_rows.add(row)
-                used_cols.add(col)
-
-            # compute both the row and column index we have NOT yet
-            # examined
-            unused_rows = set(range(0, d.shape[0])).difference(used_rows)
-            unused_cols = set(range(0, d.shape[1])).difference(used_cols)
-
-            # in the event that the number of object centroids is
-            # equal or greater than the number of input centroids
-            # we need to check and see if some of these objects have
-            # potentially disappeared
-            if d.shape[0] >= d.shape[1]:
-                # loop over the unused row indexes
-                for row in unused_rows:
-                    # grab the object ID for the corresponding row
-                    # index and increment the disappeared counter
-                    object_id = object_ids[row]
-                    self.objects[object_id].update(disappeared=True)
-
-                    # check to see if the number of consecutive
-                    # frames the object has been marked "disappeared"
-                    # for warrants deregistering the object
-                    if self.objects[object_id].disappeared > self.maxDisappeared:
-                        self.deregister(object_id)
-
-            # otherwise, if the number of input centroids is greater
-            # than the number of existing object centroids we need to
-            # register each new input centroid as a trackable object
-            else:
-                for col in unused_cols:
-                    self.register(input_centroids[col], input_data[col])
+            object_centroids = self.centroids[:self.count].astype(float)
+
+        if self.cost == 'iou':
+            d = association.iou_cost(self.object_rects(object_centroids), input_rects)
+        elif self.cost == 'size':
+            d = association.size_cost(object_centroids, input_centroids,
+                                      self.object_scales(), input_scales)
+        else:
+            d = association.centroid_cost(object_centroids, input_centroids)
+        (rows, cols, unused_rows, unused_cols) = association.associate(d, self.assignment, self.max_cost)
+
+        self.update_rows(rows, input_centroids[cols], input_rects[cols], input_sizes[cols],
+                         input_timestamps[cols], [input_data[col] for col in cols])
+
+        # correct the filter of the matched objects before rows
+        # are moved by deregistering
+        if self.filter is not None:
+            self.filter.correct(rows, np.column_stack((input_centroids[cols], input_scales[cols])))
+
+        # objects without a match have potentially disappeared,
+        # inputs without a match are new trackable objects
+        self.age(np.flatnonzero(unused_rows))
+        for col in np.flatnonzero(unused_cols):
+            self.register(input_centroids[col], input_data[col], input_scales[col], input_rects[col])
+
+        self.coast()
+        self.changed()
 
         # return the set of trackable objects
         return self.objects
@@ -0,0 +1,91 @@
+""" Detections found by the DNN in a single image, stored as a struct of arrays.
+    * Stores the bounding boxes, class IDs, confidences, colors and sizes of
+    every detection in NumPy arrays, along with the time they were found.
+    Class IDs are resolved to labels (see labels.py) only when displayed.
+    * Behaves like the list of [startX, startY, endX, endY, ObjData] entries
+    expected by CentroidTracker.update. The ObjData object of a detection is
+    only built when its entry is read.
+    * Detections found in an unwarped frame can be mapped through the
+    orientation homography, which only moves a few points per detection.
+"""
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+# ================ User Imports ================ #
+
+from object_detection import ObjData
+from object_detection import labels
+
+
+# ================ Class defenition ================ #
+class Detections:
+    def __init__(self, rects, timestamp, class_ids, confidences, colors, sizes, centers=None):
+        # rects is an N x 4 integer array of (startX, startY, endX, endY)
+        self.rects = np.asarray(rects, dtype=int).reshape(-1, 4)
+        # N x 2 centroids when they are not the middle of the rects (see transform)
+        self.centers = centers
+        self.timestamp = timestamp
+        # index of the class of each detection in LABELS, label names are accepted too
+        self.class_ids = labels.class_ids(class_ids)
+        self.confidences = confidences
+        self.colors = colors
+        # Size is a measure of the bounding box area as a fraction of the image area
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.rects)
+
+    @property
+    def labels(self):
+        return labels.LABELS_ARRAY[self.class_ids]
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError("detection index out of range")
+
+        rect = tuple(self.rects[i].tolist())
+        data = ObjData.ObjData(rect,
+                               self.timestamp,
+                               int(self.class_ids[i]),
+                               float(self.confidences[i]),
+                               int(self.colors[i]),
+                               float(self.sizes[i]))
+        return [*rect, data]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def centroids(self):
+        if self.centers is not None:
+            return self.centers
+        # centroids of every bounding box, truncated like CentroidTracker.update
+        return ((self.rects[:, :2] + self.rects[:, 2:]) / 2.0).astype(int)
+
+    def transform(self, h):
+        """Map the detections through a homography
+
+        @param: h (np array): 3x3 homography, e.g. from the raw to the orientation corrected frame
+
+        @return: Detections with the rects enclosing the mapped corners and the mapped centroids
+        """
+        centers = (self.rects[:, :2] + self.rects[:, 2:]) / 2.0
+        # the four corners of every rect, followed by its center
+        points = np.concatenate((self.rects[:, [[0, 1], [2, 1], [2, 3], [0, 3]]],
+                                 centers[:, np.newaxis]), axis=1)
+
+        mapped = np.concatenate((points, np.ones(points.shape[:2] + (1,))), axis=2) @ h.T
+        mapped = mapped[..., :2] / mapped[..., 2:]
+
+        # keep the (left, bottom, right, top) order of the DNN output
+        (low, high) = (mapped[:, :4].min(axis=1), mapped[:, :4].max(axis=1))
+        flip_y = self.rects[:, 1] > self.rects[:, 3]
+        rects = np.stack((low[:, 0],
+                          np.where(flip_y, high[:, 1], low[:, 1]),
+                          high[:, 0],
+                          np.where(flip_y, low[:, 1], high[:, 1])), axis=1)
+
+        return Detections(rects, self.timestamp, self.class_ids, self.confidences,
+                          self.colors, self.sizes, centers=mapped[:, 4].astype(int))
@@ -0,0 +1,107 @@
+""" Wrapper around the OpenCV DNN used for object detection.
+    * The network is only loaded the first time it is used, so importing
+    the detection modules stays cheap.
+    * After loading, a configurable number of warm-up passes absorb the
+    graph initialization cost before the first real frame.
+    * Backend, target, thread count and the available models are read from
+    config.py, and the active model can be swapped at runtime. Loaded
+    networks are kept so switching back to a model is free.
+"""
+
+# ================ Built-in Imports ================ #
+
+import os
+
+# ================ Third Party Imports ================ #
+
+import cv2
+import numpy as np
+
+# ================ User Imports ================ #
+
+import config
+
+
+# ================ Class defenition ================ #
+class Detector:
+    def __init__(self, model=None):
+        # name of the active model in config.DNN_MODELS
+        self.model = model or config.DNN_MODEL
+        self.nets = {}
+
+    @property
+    def params(self):
+        return config.DNN_MODELS[self.model]
+
+    @property
+    def input_size(self):
+        return tuple(self.params.get('input_size', (300, 300)))
+
+    @property
+    def net(self):
+        # load the active model on first use
+        if self.model not in self.nets:
+            self.nets[self.model] = self.load(self.model)
+        return self.nets[self.model]
+
+    def use_model(self, model):
+        """Swap the active model, it is loaded the next time it is used
+
+        @param: model (str): name of the model in config.DNN_MODELS
+        """
+        if model not in config.DNN_MODELS:
+            raise KeyError("Unknown DNN model: {}".format(model))
+        self.model = model
+
+    def load(self, model):
+        """Load a model with the configured backend and target, then warm it up
+
+        @param: model (str): name of the model in config.DNN_MODELS
+
+        @return: the loaded cv2.dnn network
+        """
+        params = config.DNN_MODELS[model]
+        weights = os.path.join(config.ROOT_DIR, params['weights'])
+        graph = os.path.join(config.ROOT_DIR, params['config']) if params.get('config') else ''
+
+        if config.DNN_THREADS:
+            cv2.setNumThreads(config.DNN_THREADS)
+
+        net = cv2.dnn.readNet(weights, graph)
+        net.setPreferableBackend(getattr(cv2.dnn, 'DNN_BACKEND_' + config.DNN_BACKEND.upper()))
+        net.setPreferableTarget(getattr(cv2.dnn, 'DNN_TARGET_' + config.DNN_TARGET.upper()))
+
+        # the first forward passes absorb the graph initialization
+        (width, height) = params.get('input_size', (300, 300))
+        warmup_blob = np.zeros((1, 3, height, width), dtype=np.float32)
+        for _ in range(config.DNN_WARMUP_RUNS):
+            net.setInput(warmup_blob)
+            net.forward()
+
+        return net
+
+    def forward(self, imgs):
+        """Run a single forward pass on a batch of images
+
+        @param: imgs (list): 3D arrays representing pixels in each image, of any size
+
+        @return: the network output for the whole batch
+        """
+        params = self.params
+        size = self.input_size
+
+        # Use the given images as input, which needs to be blob(s).
+        # Originally, parameters for blob were
+        # blobFromImage(img,size=(300,300), swapRB=True, crop=True)
+        # This seems to work better
+        # Images already warped to the input size are not resized again
+        blob = cv2.dnn.blobFromImages([img if img.shape[1::-1] == size else cv2.resize(img, size)
+                                       for img in imgs],
+                                      scalefactor=params.get('scale', 1.0),
+                                      mean=tuple(params.get('mean', (0, 0, 0))),
+                                      swapRB=params.get('swap_rb', True),
+                                      crop=True)
+
+        net = self.net
+        net.setInput(blob)
+        return net.forward()
@@ -0,0 +1,131 @@
+""" Constant velocity Kalman filter of every tracked object at once.
+    * The state of an object is its centroid and bounding box scale (the
+    square root of its area) along with their velocities.
+    * States and covariances of all objects are stacked in preallocated
+    NumPy arrays, one row per object, so predicting and correcting them are
+    single vectorized operations. Removing an object moves the last row
+    into its place.
+    * Objects without a detection keep following their predicted motion.
+"""
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+# ================ Global Variables ================ #
+
+# Centroid x, centroid y and scale, then their velocities
+STATE_SIZE = 6
+MEASUREMENT_SIZE = 3
+
+
+# ================ Class defenition ================ #
+class KalmanFilter:
+    def __init__(self, process_noise=1.0, measurement_noise=5.0, velocity_uncertainty=100.0, capacity=64):
+        """
+        @param: process_noise (float): standard deviation of the accelerations (pixels / time unit^2)
+        @param: measurement_noise (float): standard deviation of the detected centroids and scales (pixels)
+        @param: velocity_uncertainty (float): standard deviation of the velocities of new objects
+        @param: capacity (int): number of objects the arrays are allocated for, they grow when full
+        """
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.velocity_uncertainty = velocity_uncertainty
+
+        # one row per object, the first count rows are in use
+        self.count = 0
+        self.states = np.zeros((capacity, STATE_SIZE))
+        self.covariances = np.zeros((capacity, STATE_SIZE, STATE_SIZE))
+
+        self.R = np.eye(MEASUREMENT_SIZE) * measurement_noise ** 2
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def x(self):
+        return self.states[:self.count]
+
+    @x.setter
+    def x(self, value):
+        self.states[:self.count] = value
+
+    @property
+    def P(self):
+        return self.covariances[:self.count]
+
+    @P.setter
+    def P(self, value):
+        self.covariances[:self.count] = value
+
+    @property
+    def positions(self):
+        # current centroid estimate of every object
+        return self.x[:, :2]
+
+    def add(self, centroid, scale=0):
+        """Start filtering a new object, at rest
+
+        @param: centroid (tuple): (x, y) of the object
+        @param: scale (float): square root of the bounding box area
+        """
+        x = np.zeros(STATE_SIZE)
+        x[:2] = centroid
+        x[2] = scale
+        P = np.diag([self.measurement_noise ** 2] * MEASUREMENT_SIZE
+                    + [self.velocity_uncertainty ** 2] * MEASUREMENT_SIZE)
+
+        if self.count == len(self.states):
+            grow = max(len(self.states), 1)
+            self.states = np.concatenate((self.states, np.zeros((grow, STATE_SIZE))))
+            self.covariances = np.concatenate((self.covariances, np.zeros((grow, STATE_SIZE, STATE_SIZE))))
+
+        self.states[self.count] = x
+        self.covariances[self.count] = P
+        self.count += 1
+
+    def remove(self, row):
+        # the last row takes the place of the removed one
+        self.count -= 1
+        self.states[row] = self.states[self.count]
+        self.covariances[row] = self.covariances[self.count]
+
+    def predict(self, dt):
+        """Move every object along its velocity
+
+        @param: dt (float): time since the last prediction
+        """
+        F = np.eye(STATE_SIZE)
+        F[:MEASUREMENT_SIZE, MEASUREMENT_SIZE:] = np.eye(MEASUREMENT_SIZE) * dt
+
+        # white noise acceleration
+        q = self.process_noise ** 2
+        Q = np.zeros((STATE_SIZE, STATE_SIZE))
+        Q[:MEASUREMENT_SIZE, :MEASUREMENT_SIZE] = np.eye(MEASUREMENT_SIZE) * q * dt ** 4 / 4
+        Q[:MEASUREMENT_SIZE, MEASUREMENT_SIZE:] = np.eye(MEASUREMENT_SIZE) * q * dt ** 3 / 2
+        Q[MEASUREMENT_SIZE:, :MEASUREMENT_SIZE] = np.eye(MEASUREMENT_SIZE) * q * dt ** 3 / 2
+        Q[MEASUREMENT_SIZE:, MEASUREMENT_SIZE:] = np.eye(MEASUREMENT_SIZE) * q * dt ** 2
+
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+
+    def correct(self, rows, measurements):
+        """Correct the state of the detected objects
+
+        @param: rows (np array): rows of the detected objects
+        @param: measurements (np array): M x 3 detected (x, y, scale) of each of them
+        """
+        rows = np.asarray(rows, dtype=int)
+        if len(rows) == 0:
+            return
+
+        x = self.x[rows]
+        P = self.P[rows]
+
+        # the measurement is the first half of the state
+        S = P[:, :MEASUREMENT_SIZE, :MEASUREMENT_SIZE] + self.R
+        K = P[:, :, :MEASUREMENT_SIZE] @ np.linalg.inv(S)
+        innovation = np.asarray(measurements, dtype=float) - x[:, :MEASUREMENT_SIZE]
+
+        self.x[rows] = x + (K @ innovation[:, :, np.newaxis])[:, :, 0]
+        self.P[rows] = P - K @ P[:, :MEASUREMENT_SIZE, :]
@@ -0,0 +1,131 @@
+""" Decides when the DNN runs and moves tracked objects in between.
+    * The DNN runs every few frames, or sooner when a downscaled grayscale
+    frame differs enough from the one of the last detection.
+    * In between, the tracked objects are moved with sparse Lucas-Kanade
+    optical flow on a few points of each object, so their bearings are
+    updated at the frame rate for a fraction of the inference cost.
+    * Flow is computed on the DNN input of each frame. A matrix maps the
+    coordinates of the tracker into that image, which also accounts for
+    the orientation homography when detecting in captured frames.
+"""
+
+# ================ Third Party Imports ================ #
+
+import cv2
+import numpy as np
+
+# ================ User Imports ================ #
+
+import config
+
+# ================ Global Variables ================ #
+
+# Points tracked inside each bounding box, as fractions of its width and height
+GRID = np.array([(x, y) for y in (0.25, 0.5, 0.75) for x in (0.25, 0.5, 0.75)])
+
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+# ================ Functions ================ #
+
+def transform_points(points, h):
+    # maps N x 2 points through a 3x3 homography
+    mapped = np.concatenate((points, np.ones((len(points), 1))), axis=1) @ h.T
+    return mapped[:, :2] / mapped[:, 2:]
+
+
+# ================ Class defenition ================ #
+class MotionGate:
+    def __init__(self, detect_every=None, threshold=None, flow_width=None):
+        # the DNN runs at least once every detect_every frames
+        self.detect_every = detect_every or config.DETECTION_EVERY
+        # mean absolute difference of gray levels that triggers the DNN
+        self.threshold = config.MOTION_THRESHOLD if threshold is None else threshold
+        self.flow_width = flow_width or config.FLOW_WIDTH
+
+        # grayscale frame of the last detection and frames since then
+        self.key_gray = None
+        self.frames_since_detection = 0
+
+        # last frame the tracker was updated with and its coordinate mapping
+        self.prev_gray = None
+        self.prev_matrix = None
+
+    def prepare(self, img, frame_size, homography=None):
+        """Downscale a frame for the motion measure and the optical flow
+
+        @param: img (np array): DNN input of the frame
+        @param: frame_size (tuple): (rows, cols) of the frame the tracker coordinates refer to
+        @param: homography (np array): homography from img (at frame size) to the tracker
+                coordinates, None when img is already orientation corrected
+
+        @return: (grayscale image, matrix from the tracker coordinates to the image)
+        """
+        (rows, cols) = img.shape[:2]
+        width = min(self.flow_width, cols)
+        height = max(int(round(rows * width / cols)), 1)
+        gray = cv2.cvtColor(cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+
+        matrix = np.diag([width / frame_size[1], height / frame_size[0], 1.0])
+        if homography is not None:
+            matrix = matrix @ np.linalg.inv(homography)
+        return gray, matrix
+
+    def motion(self, gray):
+        # mean absolute difference with the frame of the last detection
+        if self.key_gray is None or self.key_gray.shape != gray.shape:
+            return np.inf
+        return cv2.absdiff(gray, self.key_gray).mean()
+
+    def needs_detection(self, gray):
+        """Whether the DNN should run on a frame, counts the frame as detected if so
+
+        @param: gray (np array): grayscale image from prepare
+
+        @return: bool
+        """
+        self.frames_since_detection += 1
+        if self.frames_since_detection >= self.detect_every or self.motion(gray) > self.threshold:
+            self.key_gray = gray
+            self.frames_since_detection = 0
+            return True
+        return False
+
+    def track(self, gray, matrix):
+        """Remember the frame the tracker was last updated with
+
+        @param: gray (np array): grayscale image from prepare
+        @param: matrix (np array): matrix from prepare
+        """
+        self.prev_gray = gray
+        self.prev_matrix = matrix
+
+    def propagate(self, tracker, gray, matrix, timestamp=None):
+        """Move the tracked objects with the optical flow since the previous frame
+
+        @param: tracker (CentroidTracker): tracker with the objects to move
+        @param: gray (np array): grayscale image from prepare
+        @param: matrix (np array): matrix from prepare
+        @param: timestamp (float): capture time of the frame, see CentroidTracker.move
+        """
+        if len(tracker) and self.prev_gray is not None and self.prev_gray.shape == gray.shape:
+            # a few points per object, inside its bounding box or on its centroid
+            rects = tracker.rects[:len(tracker)]
+            rects = np.where(np.isnan(rects), np.tile(tracker.centroids[:len(tracker)], 2), rects)
+            points = (rects[:, np.newaxis, :2] + GRID * (rects[:, np.newaxis, 2:] - rects[:, np.newaxis, :2]))
+            points = points.reshape(-1, 2)
+
+            prev_points = transform_points(points, self.prev_matrix).astype(np.float32)
+            next_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray,
+                                                              prev_points.reshape(-1, 1, 2), None,
+                                                              **LK_PARAMS)
+            moved = transform_points(next_points.reshape(-1, 2), np.linalg.inv(matrix)) - points
+            found = status.reshape(-1).astype(bool)
+
+            # median displacement of the points found in the new frame
+            moved = np.where(found[:, np.newaxis], moved, np.nan).reshape(len(tracker), len(GRID), 2)
+            rows = np.flatnonzero(found.reshape(len(tracker), len(GRID)).any(axis=1))
+            tracker.move(np.nanmedian(moved[rows], axis=1), rows, timestamp)
+
+        self.track(gray, matrix)
@@ -1,6 +1,9 @@
 """ Object to store position data generated by a DNN object detector.
-    * Stores the bounding box, label, confidence, a timestamp of when
+    * Stores the bounding box, class ID, confidence, a timestamp of when
     the object was found, and a color to draw the object.
+    * Uses __slots__, a detection is a handful of attributes without a
+    __dict__. The label is resolved from the class ID (see labels.py) when
+    it is read, e.g. on display.
     * The class countains a method to draw the object on the image where
     it was detected.
 """
@@ -9,6 +12,10 @@
 
 import cv2 as cv2
 
+# ================ User Imports ================ #
+
+from object_detection import labels
+
 # ================ Authorship ================ #
 
 __author__ = "Donald Max Harkins"
@@ -19,15 +26,22 @@ __contributors__ = ["Donald Max Harkins"]
 
 
 class ObjData:
+    __slots__ = ('rect', 'timestamp', 'class_id', 'confidence', 'color', 'size')
+
+    # label is a class ID or the name of one of labels.LABELS
     def __init__(self, rect, timestamp, label, confidence, color, size):
         self.rect = rect
         self.timestamp = timestamp
-        self.label = label
+        self.class_id = label if type(label) is int else labels.class_id(label)
         self.confidence = confidence
         self.color = color
         # Sixe is a measure of bounding box width as a fraction of the image width
         self.size = size
 
+    @property
+    def label(self):
+        return labels.label(self.class_id)
+
     def draw_data(self, img):
         # draw a coloured rectangle around object.
         # rectangle did not play nice with numpy array, hence manual casting
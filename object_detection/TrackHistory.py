@@ -0,0 +1,140 @@
+""" Bounded history of the data of a tracked object
+    * Timestamps, bounding boxes, sizes, confidences and class IDs of the
+    last depth detections are kept in a preallocated ring buffer, so an
+    object that stays in view for hours uses a fixed amount of memory.
+    * Only the newest data object is kept whole, for drawing and for its
+    color.
+    * Samples about to be overwritten, and the samples kept when the object
+    is deregistered, can be appended to an on-disk TrackLog.
+"""
+
+# ================ Built-in Imports ================ #
+
+import operator
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+# ================ User Imports ================ #
+
+from classes.RingBuffer import RingBuffer
+from object_detection import labels
+from object_detection.ObjData import ObjData
+
+# ================ Global Variables ================ #
+
+COLUMNS = ('timestamp', 'startX', 'startY', 'endX', 'endY', 'size', 'confidence', 'class_id')
+
+TRACK_LOG_DTYPE = np.dtype([('track_id', '<i8'),
+                            ('timestamp', '<f8'),
+                            ('rect', '<f8', (4,)),
+                            ('size', '<f8'),
+                            ('confidence', '<f8'),
+                            ('class_id', '<i8')])
+
+
+# ================ Functions ================ #
+
+def read_track_log(filepath: str) -> np.ndarray:
+    """Read Track Log
+    @param: filepath (str): path of a log written by TrackLog
+    @return: ndarray: TRACK_LOG_DTYPE records in the order they were spilled
+    """
+    return np.fromfile(filepath, dtype=TRACK_LOG_DTYPE)
+
+
+# ================ Class definition ================ #
+
+class TrackLog:
+
+    def __init__(self, filepath):
+        """
+        @param: filepath (str): binary file the samples are appended to
+        """
+        self.filepath = filepath
+        self.fd = open(filepath, 'ab')
+
+    def write(self, track_id, rows):
+        """Write
+            Appends samples of a track to the log
+        @param: track_id (int): ID of the tracked object
+        @param: rows (ndarray): N x len(COLUMNS) samples
+        """
+        records = np.zeros(len(rows), dtype=TRACK_LOG_DTYPE)
+        records['track_id'] = track_id
+        records['timestamp'] = rows[:, 0]
+        records['rect'] = rows[:, 1:5]
+        records['size'] = rows[:, 5]
+        records['confidence'] = rows[:, 6]
+        records['class_id'] = rows[:, 7]
+        records.tofile(self.fd)
+
+    def close(self):
+        self.fd.close()
+
+
+class TrackHistory:
+
+    def __init__(self, depth=64, log=None, track_id=None):
+        """
+        @param: depth (int): number of samples kept in memory
+        @param: log (TrackLog): where overwritten samples are spilled, None to drop them
+        @param: track_id (int): ID of the tracked object written to the log
+        """
+        self.samples = RingBuffer(depth, COLUMNS)
+        self.log = log
+        self.track_id = track_id
+        # newest data object, None before the first one
+        self.last = None
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, index):
+        # the newest data object, or an ObjData rebuilt from the kept samples
+        # with the color of the newest one
+        index = operator.index(index)
+        if index in (-1, len(self) - 1) and len(self):
+            return self.last
+        if not -len(self) <= index < len(self):
+            raise IndexError("TrackHistory index out of range")
+
+        row = self.samples.window()[:, index]
+        rect = tuple(int(v) for v in row[1:5]) if not np.isnan(row[1:5]).any() else None
+        return ObjData(rect, row[0], int(row[7]), row[6],
+                       getattr(self.last, 'color', None), row[5])
+
+    def append(self, data):
+        """Append
+            Adds the data of a new detection, spilling the oldest sample when full
+        @param: data (ObjData): data of the detection, None is ignored
+        """
+        if data is None:
+            return
+        if self.log is not None and len(self.samples) == self.samples.capacity:
+            # the oldest sample is about to be overwritten
+            self.log.write(self.track_id, self.samples.window(len(self.samples))[:, :1].T)
+
+        rect = getattr(data, 'rect', None)
+        sample = ([getattr(data, 'timestamp', None)] + list(rect if rect is not None else (None,) * 4)
+                  + [getattr(data, 'size', None), getattr(data, 'confidence', None),
+                     getattr(data, 'class_id', labels.UNKNOWN)])
+        self.samples.extend([[np.nan if value is None else value for value in sample]])
+        self.last = data
+
+    def tail(self, n=None):
+        """Tail
+            Copies the newest samples in chronological order
+        @param: n (int): number of samples, None for every sample kept
+        @return: ndarray: up to n x len(COLUMNS) array of samples
+        """
+        return self.samples.tail(n)
+
+    def column(self, rows, name):
+        return self.samples.column(rows, name)
+
+    def close(self):
+        # spills the kept samples, once the object is no longer tracked
+        if self.log is not None and len(self.samples):
+            self.log.write(self.track_id, self.samples.tail())
@@ -1,5 +1,5 @@
 """ Object to store data used by centroid tracker
-    * Stores a list of objData objects to track postition over time
+    * Stores the last TRACK_HISTORY_DEPTH objData samples to track postition over time
     * Stores a count of all frames where the object has disappeared
     * Stores the most recent centroid for each object
     * Stores and updates doubling time using moving average
@@ -8,48 +8,82 @@
 # ================ Third Party Imports ================ #
 
 import cv2 as cv2
+import numpy as np
+
+# ================ User Imports ================ #
+
+import config
+from object_detection.TrackHistory import TrackHistory
 
 # ================ Authorship ================ #
 
 __author__ = "Donald Max Harkins"
 __contributors__ = ["Donald Max Harkins"]
 
-# ================ Class defenition ================ #
+# ================ Global Variables ================ #
 
 # Weight for exponential moving average
 ALPHA = 0.15
 
 
+# ================ Functions ================ #
+
+def update_rates(rates, prev_sizes, sizes, prev_timestamps, timestamps):
+    """Update Rates
+        Exponential moving averages of the rates of size increase of objects.
+        Objects without a known size or elapsed time keep their average, and
+        the first known rate of an object starts its average
+    @param: rates (np array): current averages, NaN while unknown
+    @param: prev_sizes (np array): sizes of the previous detections
+    @param: sizes (np array): sizes of the new detections
+    @param: prev_timestamps (np array): timestamps of the previous detections
+    @param: timestamps (np array): timestamps of the new detections
+    @return: np array of the updated averages
+    """
+    t_elapsed = timestamps - prev_timestamps
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = (sizes - prev_sizes) / t_elapsed
+    rate[rate == 0] = 1e-10
+    known = np.isfinite(rate) & (t_elapsed > 0)
+
+    rates = np.array(rates, dtype=float)
+    rates[known] = np.where(np.isnan(rates[known]), rate[known],
+                            (1 - ALPHA) * rates[known] + ALPHA * rate[known])
+    return rates
+
+
+# ================ Class defenition ================ #
+
 class TrackedObject:
-    def __init__(self, centroid, data):
+    def __init__(self, centroid, data, history=None):
+        """
+        @param: centroid (tuple): centroid of the object
+        @param: data (ObjData): data of the detection, appended to the history
+        @param: history (TrackHistory): existing history of the object, a new one is made when None
+        """
         self.centroid = centroid
-        self.data = [data]
+        self.data = history if history is not None else TrackHistory(config.TRACK_HISTORY_DEPTH)
+        self.data.append(data)
         self.disappeared = 0
         self.size_increase = None  # This is the time untill the distance to the detected object is halved
-        self.__exponential_rate_average = None
+        # exponential moving average of the rate of size increase, NaN while unknown
+        self.rate = np.nan
 
     # Note that distance is related to angular size where dist = actual width / tan(angular size)
     # Since true size of the object must be known to calculate the distance to an object (given angular size)
     # we opt to simply report the rate of bounding box increase
     def __update_size_increase(self):
         if len(self.data) > 1:
-            t_elapsed = self.data[-1].timestamp - self.data[-2].timestamp
-            # Calculate the rate by calculating the time difference and size increase
-            size_increase = self.data[-1].size - self.data[-2].size
-            rate = size_increase / t_elapsed
-            if rate == 0:
-                rate = 1e-10
-
-            # Calculate the exponential weighted average if there has already been
-            # one rate found, otherwise use the first rate found
-            if self.__exponential_rate_average is None:
-                self.__exponential_rate_average = rate
-            else:
-                self.__exponential_rate_average = (1 - ALPHA) * self.__exponential_rate_average + ALPHA * rate
-
-            # Here we set the size_increase public variable as the private exponential average
+            # Only the two newest samples are read
+            tail = self.data.tail(2)
+            (timestamps, sizes) = (self.data.column(tail, 'timestamp'), self.data.column(tail, 'size'))
+            self.rate = float(update_rates(np.array([self.rate]), sizes[:1], sizes[1:],
+                                           timestamps[:1], timestamps[1:])[0])
+
+            # Here we set the size_increase public variable as the exponential average
             # Value is scaled by 10000 to increase human readability
-            self.size_increase = 10000 * self.__exponential_rate_average
+            if not np.isnan(self.rate):
+                self.size_increase = 10000 * self.rate
 
     def update(self, centroid=None, data=None, disappeared=False):
         if disappeared:
@@ -71,6 +105,6 @@ class TrackedObject:
         # If the most recent data we're storing with the object has a draw function,
         # we call it
         try:
-            self.data[-1].draw_data(img)
+            self.data.last.draw_data(img)
         except AttributeError:
             pass
@@ -0,0 +1,106 @@
+""" Matching of tracked objects to new detections.
+    * Cost functions build a (tracked objects x detections) cost matrix
+    from centroid distances, size aware distances or bounding box overlap.
+    * Assignment functions pair rows and columns of a cost matrix, either
+    optimally (Hungarian algorithm) or greedily, cheapest pairs first.
+    Pairs costing more than a gate are never matched, so a far away
+    detection registers a new object instead of stealing an existing ID.
+    * Bookkeeping uses boolean masks, so busy scenes with hundreds of
+    objects stay cheap.
+"""
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial import distance as dist
+
+
+# ================ Cost functions ================ #
+
+def centroid_cost(object_centroids, input_centroids):
+    # euclidean distance in pixels
+    return dist.cdist(np.asarray(object_centroids, dtype=float), np.asarray(input_centroids, dtype=float))
+
+
+def size_cost(object_centroids, input_centroids, object_scales, input_scales):
+    # distance in units of the object scales plus how much the scales differ,
+    # small objects must be closer than large ones to match
+    scales = (np.asarray(object_scales, dtype=float)[:, np.newaxis] + np.asarray(input_scales, dtype=float)) / 2
+    ratio = np.log(np.maximum(np.asarray(object_scales, dtype=float)[:, np.newaxis], 1)
+                   / np.maximum(np.asarray(input_scales, dtype=float), 1))
+    return centroid_cost(object_centroids, input_centroids) / np.maximum(scales, 1) + np.abs(ratio)
+
+
+def iou_cost(object_rects, input_rects):
+    # 1 - intersection over union of the bounding boxes
+    a = np.asarray(object_rects, dtype=float)
+    b = np.asarray(input_rects, dtype=float)
+    (a_low, a_high) = (np.minimum(a[:, :2], a[:, 2:]), np.maximum(a[:, :2], a[:, 2:]))
+    (b_low, b_high) = (np.minimum(b[:, :2], b[:, 2:]), np.maximum(b[:, :2], b[:, 2:]))
+
+    overlap = np.clip(np.minimum(a_high[:, np.newaxis], b_high) - np.maximum(a_low[:, np.newaxis], b_low), 0, None)
+    intersection = overlap[..., 0] * overlap[..., 1]
+    area_a = np.prod(a_high - a_low, axis=1)
+    area_b = np.prod(b_high - b_low, axis=1)
+    union = area_a[:, np.newaxis] + area_b - intersection
+
+    return 1 - np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+# ================ Assignment functions ================ #
+
+def hungarian_assignment(cost, max_cost):
+    # pairs minimizing the total cost, gated pairs can not be chosen
+    gated = cost > max_cost
+    rows, cols = linear_sum_assignment(np.where(gated, max_cost * 2 + 1, cost))
+    keep = ~gated[rows, cols]
+    return rows[keep], cols[keep]
+
+
+def greedy_assignment(cost, max_cost):
+    # cheapest pairs first, each row and column is used once
+    (row_used, col_used) = (np.zeros(cost.shape[0], dtype=bool), np.zeros(cost.shape[1], dtype=bool))
+    (rows, cols) = ([], [])
+
+    candidates = np.flatnonzero(cost <= max_cost)
+    for i in candidates[np.argsort(cost.flat[candidates], kind='stable')]:
+        (row, col) = divmod(int(i), cost.shape[1])
+        if row_used[row] or col_used[col]:
+            continue
+        row_used[row] = col_used[col] = True
+        rows.append(row)
+        cols.append(col)
+
+        if row_used.all() or col_used.all():
+            break
+
+    return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+
+ASSIGNMENTS = {
+    'hungarian': hungarian_assignment,
+    'greedy': greedy_assignment,
+}
+
+
+def associate(cost, method='hungarian', max_cost=np.inf):
+    """Match tracked objects (rows) to detections (columns)
+
+    @param: cost (np array): N x M cost matrix
+    @param: method (str): name of the assignment in ASSIGNMENTS
+    @param: max_cost (float): pairs costing more are never matched
+
+    @return: (matched rows, matched columns, mask of unmatched rows, mask of unmatched columns)
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        rows = cols = np.zeros(0, dtype=int)
+    else:
+        rows, cols = ASSIGNMENTS[method](cost, max_cost)
+
+    unmatched_rows = np.ones(cost.shape[0], dtype=bool)
+    unmatched_rows[rows] = False
+    unmatched_cols = np.ones(cost.shape[1], dtype=bool)
+    unmatched_cols[cols] = False
+    return rows, cols, unmatched_rows, unmatched_cols
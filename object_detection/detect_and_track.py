@@ -1,5 +1,5 @@
 """ Script to do object detection with deep neural network.
-    The DNN is loaded, and colors and labels are defined before
+    The DNN detector is set up (the model is loaded on first use), and colors and labels are defined before
     an infinite loop runs to detect objects in a video feed input.
 """
 # ================ Built-in Imports ================ #
@@ -10,7 +10,13 @@ import time
 
 import cv2
 import numpy as np
-from object_detection import ObjData
+
+# ================ User Imports ================ #
+
+import config
+from object_detection import Detections
+from object_detection import Detector
+from object_detection import labels
 
 # ================ Authorship ================ #
 
@@ -19,88 +25,186 @@ __contributors__ = ["Donald Max Harkins"]
 
 # ================ Initialization ================ #
 
-# Load a model imported from Tensorflow
-tensorflowNet = cv2.dnn.readNetFromTensorflow(
-    'object_detection/ssd_inception_v2_smd_2019_01_29/frozen_inference_graph.pb',
-    'object_detection/ssd_inception_v2_smd_2019_01_29/graph.pbtxt')
-
-# Set up a list of class labels. There's a tensorflow method,
-# but in this case I'm just creating a list since there's only
-# 10 classes... Refactor later. See ./ssd_inc...1_29/labels.pbtxt
-# Upon further experimentation, this list seems to be out of order
-LABELS = ['Ferry',
-          'Buoy',
-          'Vessel/ship',
-          'Speed boat',
-          'Boat',
-          'Kayak',
-          'Sail boat',
-          'Swimming person',
-          'Flying bird/plane',
-          'Other',
-          '????',
-          'dock?']
-
-# initialize a list of colors to represent each possible class label
-np.random.seed(37)
-COLORS = np.random.randint(0, 255, size=(len(LABELS), 3),
-                           dtype="uint8")
+# The model is loaded lazily on the first detection, see config.DNN_MODEL
+detector = Detector.Detector()
+
+# Class labels and their colors, see labels.py
+LABELS = labels.LABELS
+COLORS = labels.COLORS
+LABELS_ARRAY = labels.LABELS_ARRAY
 
 
 # Define function to process Tensorflow network output
-def process_dnn_output(network_output, rows, cols):
-    # Loop on the outputs
-    rects = []
-    for detection in network_output[0, 0]:
-        score = float(detection[2])
-        if score > 0.5:
-            # Subtract 1 since LABEL list is 0 indexed while DNN output is 1 indexed
-            obj_id = int(detection[1]) - 1
-            # print("Found a " + LABELS[obj_id] + " with confidence " + str(detection[2]))
-            left = int(detection[3] * cols)
-            top = int(detection[4] * rows)
-            right = int(detection[5] * cols)
-            bottom = int(detection[6] * rows)
-            # Size is a measure of the bounding box area
-            size = (detection[6] - detection[4]) * (detection[5] - detection[3])
-            data = ObjData.ObjData((left, bottom, right, top),
-                                   # datetime.datetime.now().strftime("%H:%M:%S.%f"),
-                                   time.time(),
-                                   LABELS[obj_id],
-                                   detection[2],
-                                   int(COLORS[obj_id][0]),
-                                   size)
-            # centroid tracker takes format smallerX, smallerY, largerX, largerY
-            # and a data object/tuple/structure/etc.
-            rects.append([left, bottom, right, top, data])
-    return rects
+def process_dnn_output(network_output, rows, cols, threshold=None):
+    """Convert the SSD output of one image into detections
 
+    @param: network_output (np array): [1, 1, K, 7] SSD output
+    @param: rows (int): image height in pixels
+    @param: cols (int): image width in pixels
+    @param: threshold (float): minimum score of a detection, defaults to config.DETECTION_THRESHOLD
 
-def detect_in_image(img, ct):
-    """Detect and track objects in image
+    @return: Detections in the format expected by the centroid tracker
+    """
+    if threshold is None:
+        threshold = config.DETECTION_THRESHOLD
 
-    @param: img (np array): 3D array representing pixels in image
-    @param: cd (CentroidTracker): tracker to persistently track found objects
+    detections = network_output.reshape(-1, 7)
+    detections = detections[detections[:, 2] > threshold]
+
+    # Subtract 1 since LABEL list is 0 indexed while DNN output is 1 indexed
+    obj_ids = detections[:, 1].astype(int) - 1
+
+    # centroid tracker takes format smallerX, smallerY, largerX, largerY
+    # and a data object/tuple/structure/etc.
+    # columns are left, bottom, right, top
+    rects = (detections[:, [3, 6, 5, 4]] * [cols, rows, cols, rows]).astype(int)
 
+    # Size is a measure of the bounding box area
+    sizes = (detections[:, 6] - detections[:, 4]) * (detections[:, 5] - detections[:, 3])
+
+    return Detections.Detections(rects,
+                                 # datetime.datetime.now().strftime("%H:%M:%S.%f"),
+                                 time.time(),
+                                 obj_ids,
+                                 detections[:, 2],
+                                 COLORS[obj_ids, 0],
+                                 sizes)
+
+
+def split_dnn_output(network_output, num_images):
+    """Split the output of a batched forward pass per image
+
+    @param: network_output (np array): SSD output, either [1, 1, N*K, 7] where
+            column 0 holds the index of the image in the batch, or [N, 1, K, 7]
+    @param: num_images (int): number of images in the batch
+
+    @return: list of [1, 1, K, 7] arrays, one per image
     """
-    h, w = img.shape[:2]
+    if network_output.shape[0] == num_images and num_images > 1:
+        return [network_output[i:i + 1] for i in range(num_images)]
+
+    detections = network_output.reshape(-1, 7)
+    image_ids = detections[:, 0].astype(int)
+    return [detections[image_ids == i][np.newaxis, np.newaxis] for i in range(num_images)]
+
+
+def merge_tile_detections(detections, tiles, frame_size):
+    """Merge the detections found in the tiles of a frame
+
+    @param: detections (list): Detections of each tile, in tile coordinates
+    @param: tiles (list): (x, y, width, height) of each tile in the frame
+    @param: frame_size (tuple): (rows, cols) of the frame
 
-    # Use the given image as input, which needs to be blob(s).
-    # Originally, parameters for blob were
-    # blobFromImage(img,size=(300,300), swapRB=True, crop=True)
-    # This seems to work better
-    tensorflowNet.setInput(
-        cv2.dnn.blobFromImage(cv2.resize(img, (300, 300)),
-                              swapRB=True, crop=True))
+    @return: Detections in frame coordinates, duplicates found in overlapping tiles are suppressed
+    """
+    (rows, cols) = frame_size
+    rects = np.concatenate([d.rects + [x, y, x, y] for (d, (x, y, _, _)) in zip(detections, tiles)])
+    class_ids = np.concatenate([d.class_ids for d in detections])
+    confidences = np.concatenate([d.confidences for d in detections])
+    colors = np.concatenate([d.colors for d in detections])
+    # sizes are fractions of the tile area
+    sizes = np.concatenate([d.sizes * (w * h) / (rows * cols) for (d, (_, _, w, h)) in zip(detections, tiles)])
+
+    if len(rects):
+        boxes = np.stack((rects[:, 0],
+                          rects[:, [1, 3]].min(axis=1),
+                          rects[:, 2] - rects[:, 0],
+                          np.abs(rects[:, 3] - rects[:, 1])), axis=1)
+        keep = np.asarray(cv2.dnn.NMSBoxes(boxes.tolist(), confidences.tolist(),
+                                           0, config.ROI_NMS_THRESHOLD), dtype=int).reshape(-1)
+        keep.sort()
+        (rects, class_ids, confidences, colors, sizes) = (rects[keep], class_ids[keep], confidences[keep],
+                                                          colors[keep], sizes[keep])
+
+    return Detections.Detections(rects, detections[0].timestamp, class_ids, confidences, colors, sizes)
+
+
+def detect_objects(imgs, dnn=None, frame_sizes=None, homographies=None, tiles=None):
+    """Detect objects in a batch of images with a single forward pass
+
+    @param: imgs (list): 3D arrays representing pixels in each image
+    @param: dnn (Detector): detector to use, defaults to the module's detector
+    @param: frame_sizes (list): (rows, cols) of the frame each image was made from,
+            bounding boxes are scaled to it. Defaults to the size of the images
+    @param: homographies (list): homography mapping the boxes of each image into the
+            orientation corrected frame, None (for all or some images) to keep them as found
+    @param: tiles (list): (x, y, width, height) of the regions of each image to detect in,
+            None (for all or some images) to detect in the whole image. Every tile of the
+            batch is run in the same forward pass
+
+    @return: list of Detections, one per image
+    """
+    if frame_sizes is None:
+        frame_sizes = [img.shape[:2] for img in imgs]
+    if homographies is None:
+        homographies = [None] * len(imgs)
+    if tiles is None:
+        tiles = [None] * len(imgs)
+
+    # Crop the tiles of each image, keeping which ones belong to it
+    inputs = []
+    input_sizes = []
+    for (img, frame_size, img_tiles) in zip(imgs, frame_sizes, tiles):
+        if img_tiles is None:
+            inputs.append(img)
+            input_sizes.append(frame_size)
+        else:
+            inputs += [img[y:y + h, x:x + w] for (x, y, w, h) in img_tiles]
+            input_sizes += [(h, w) for (_, _, w, h) in img_tiles]
 
     # Runs a forward pass to compute the net output
-    network_output = tensorflowNet.forward()
+    network_output = (dnn or detector).forward(inputs)
 
     # Get list of objects from tensorflow network output
-    rows, cols = img.shape[:2]
-    rects = process_dnn_output(network_output, rows, cols)
+    found = (process_dnn_output(output, *input_size)
+             for (input_size, output) in zip(input_sizes, split_dnn_output(network_output, len(inputs))))
+
+    detections = []
+    for (frame_size, img_tiles) in zip(frame_sizes, tiles):
+        if img_tiles is None:
+            detections.append(next(found))
+        else:
+            tile_detections = [next(found) for _ in img_tiles]
+            detections.append(merge_tile_detections(tile_detections, img_tiles, frame_size))
+
+    return [rects if h is None else rects.transform(h)
+            for (rects, h) in zip(detections, homographies)]
+
+
+def detect_in_images(imgs, ct, on_tracked=None, dnn=None, frame_sizes=None, homographies=None, tiles=None):
+    """Detect and track objects in a batch of images
+
+    Runs a single forward pass for all images, then updates the tracker
+    with each image's detections in order.
+
+    @param: imgs (list): 3D arrays representing pixels in each image
+    @param: ct (CentroidTracker): tracker to persistently track found objects
+    @param: on_tracked (callable): called with the index of each image right
+            after the tracker has been updated with it
+    @param: dnn (Detector): detector to use, defaults to the module's detector
+    @param: frame_sizes (list): (rows, cols) of the frame each image was made from, see detect_objects
+    @param: homographies (list): homographies applied to the boxes of each image, see detect_objects
+    @param: tiles (list): regions of each image to detect in, see detect_objects
+
+    @return: list with the number of objects found in each image
+    """
+    counts = []
+    for (i, rects) in enumerate(detect_objects(imgs, dnn, frame_sizes, homographies, tiles)):
+        # Now, update the centroid tracker with the newly found bounding boxes
+        ct.update(rects, rects.centroids())
+        counts.append(len(rects))
 
-    # Now, update the centroid tracker with the newly found bounding boxes
-    tracked_objs = ct.update(rects)
+        if on_tracked is not None:
+            on_tracked(i)
 
-    return len(rects)
+    return counts
+
+
+def detect_in_image(img, ct):
+    """Detect and track objects in image
+
+    @param: img (np array): 3D array representing pixels in image
+    @param: cd (CentroidTracker): tracker to persistently track found objects
+
+    """
+    return detect_in_images([img], ct)[0]
@@ -0,0 +1,64 @@
+""" Classes predicted by the DNN models.
+    * Detections store the index of their class in LABELS, which is only
+    resolved to a name when it is displayed.
+"""
+
+# ================ Third Party Imports ================ #
+
+import numpy as np
+
+# ================ Global Variables ================ #
+
+# Set up a list of class labels. There's a tensorflow method,
+# but in this case I'm just creating a list since there's only
+# 10 classes... Refactor later. See ./ssd_inc...1_29/labels.pbtxt
+# Upon further experimentation, this list seems to be out of order
+LABELS = ['Ferry',
+          'Buoy',
+          'Vessel/ship',
+          'Speed boat',
+          'Boat',
+          'Kayak',
+          'Sail boat',
+          'Swimming person',
+          'Flying bird/plane',
+          'Other',
+          '????',
+          'dock?']
+
+# initialize a list of colors to represent each possible class label
+np.random.seed(37)
+COLORS = np.random.randint(0, 255, size=(len(LABELS), 3),
+                           dtype="uint8")
+
+# Look up table to resolve class IDs with numpy fancy indexing
+LABELS_ARRAY = np.array(LABELS, dtype=object)
+
+# Class ID of detections without a known class
+UNKNOWN = -1
+
+
+# ================ Functions ================ #
+
+def class_id(label) -> int:
+    # index of a label in LABELS, labels that already are class IDs are kept
+    if label is None:
+        return UNKNOWN
+    if isinstance(label, str):
+        return LABELS.index(label)
+    return int(label)
+
+
+def class_ids(labels) -> np.ndarray:
+    # class IDs of an array of labels or class IDs
+    labels = np.asarray(labels)
+    if labels.dtype.kind in 'iu':
+        return labels.astype(int)
+    return np.array([class_id(label) for label in labels], dtype=int)
+
+
+def label(class_id):
+    # name of a class ID, None when it is unknown
+    if class_id == UNKNOWN:
+        return None
+    return LABELS[class_id]
@@ -0,0 +1,72 @@
+"""Stand-ins for the navigation system, receive the messages of a Publisher or a TrackServer"""
+
+import os
+import socket
+
+from classes.Publisher import decode, open_socket
+from classes.TrackServer import LENGTH
+
+
+class NavigationConsumer:
+
+    def __init__(self, family='udp', address=None):
+        """
+        @param: family (str): 'udp' or 'unix'
+        @param: address (tuple or str): address to listen on, a free local port for 'udp' by default
+        """
+        self.family = family
+        self.sock = open_socket(family)
+        if family == 'udp':
+            self.sock.bind(address or ('127.0.0.1', 0))
+        else:
+            self.sock.bind(address)
+        self.address = self.sock.getsockname()
+
+    def receive(self, timeout=1.0):
+        # (frame id, capture time, tracks) of the next message, None on timeout
+        self.sock.settimeout(timeout)
+        try:
+            return decode(self.sock.recv(65536))
+        except socket.timeout:
+            return None
+
+    def close(self):
+        self.sock.close()
+        if self.family == 'unix' and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class TrackSubscriber:
+
+    def __init__(self, address, family='tcp', receive_buffer=None):
+        """
+        @param: address (tuple or str): address of the TrackServer
+        @param: family (str): 'tcp' or 'unix'
+        @param: receive_buffer (int): size of the socket receive buffer, None for the default
+        """
+        self.sock = socket.socket(socket.AF_INET if family == 'tcp' else socket.AF_UNIX, socket.SOCK_STREAM)
+        if receive_buffer:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        self.sock.connect(address)
+
+    def send(self, command):
+        self.sock.sendall(command)
+
+    def __read(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("disconnected by the server")
+            data += chunk
+        return data
+
+    def receive(self, timeout=1.0):
+        # (frame id, capture time, tracks) of the next message, None for an empty message
+        self.sock.settimeout(timeout)
+        (length,) = LENGTH.unpack(self.__read(LENGTH.size))
+        message = self.__read(length)
+        return decode(message) if message else None
+
+    def close(self):
+        self.sock.close()
@@ -1,5 +1,8 @@
 import unittest
+
+import main
 from object_detection.CentroidTracker import CentroidTracker
+from object_detection.Detections import Detections
 
 
 class TestCentroidTracker(unittest.TestCase):
@@ -57,3 +60,100 @@ class TestCentroidTracker(unittest.TestCase):
 
         # Assert all objects removed from tracker (since max disappeared exceeded)
         self.assertEqual(len(tracker.objects), 0)
+
+    def test_update_centroids(self):
+        # centroids given with the rectangles are used instead of their middle
+        tracker = CentroidTracker()
+        tracker.update([(0, 0, 10, 10, None), (20, 20, 30, 30, None)], centroids=[(7, 8), (40, 41)])
+
+        self.assertEqual(tracker.objects[0].centroid.tolist(), [7, 8])
+        self.assertEqual(tracker.objects[1].centroid.tolist(), [40, 41])
+        # new objects keep their rects moved with the centroids, like matched ones
+        self.assertEqual(tracker.rects[:2].tolist(), [[2, 3, 12, 13], [35, 36, 45, 46]])
+        tracker.update([(1, 1, 11, 11, None), (21, 21, 31, 31, None)], centroids=[(8, 9), (41, 42)])
+        self.assertEqual(tracker.rects[:2].tolist(), [[3, 4, 13, 14], [36, 37, 46, 47]])
+
+    def test_prediction(self):
+        # A fast object is matched where it is expected to be, not to a new object near its last centroid
+        for (prediction, expected_ids) in ((True, {0: 100, 1: 55}), (False, {0: 55, 1: 100})):
+            tracker = CentroidTracker(prediction=prediction)
+            tracker.update([(-10, -10, 10, 10, None)])
+            tracker.update([(40, -10, 60, 10, None)])
+            tracker.update([(90, -10, 110, 10, None), (45, -10, 65, 10, None)])
+
+            self.assertEqual({obj_id: obj.centroid[0] for (obj_id, obj) in tracker.objects.items()},
+                             expected_ids)
+
+    def test_coasting(self):
+        # An undetected object keeps moving with its estimated velocity
+        tracker = CentroidTracker(prediction=True)
+        tracker.update([(-10, -10, 10, 10, None)], timestamp=0)
+        tracker.update([(40, -10, 60, 10, None)], timestamp=1)
+        tracker.update([], timestamp=2)
+
+        self.assertEqual(tracker.objects[0].disappeared, 1)
+        self.assertAlmostEqual(tracker.objects[0].centroid[0], 100, delta=5)
+
+    def test_gate(self):
+        # A far away detection registers a new object instead of taking the ID of a lost one
+        tracker = CentroidTracker(prediction=False, max_cost=50)
+        tracker.update([(0, 0, 10, 10, None)])
+        tracker.update([(500, 500, 510, 510, None)])
+
+        self.assertEqual(tracker.objects[0].disappeared, 1)
+        self.assertEqual(tuple(tracker.objects[1].centroid), (505, 505))
+
+    def test_assignments(self):
+        # The greedy assignment takes the cheapest pair first, the hungarian one minimizes the total
+        for (assignment, expected) in (('greedy', {0: 25, 1: 9}), ('hungarian', {0: 9, 1: 25})):
+            tracker = CentroidTracker(prediction=False, assignment=assignment)
+            tracker.update([(-1, -1, 1, 1, None), (9, -1, 11, 1, None)])
+            tracker.update([(-1, -1, 1, 1, None), (9, -1, 11, 1, None)], centroids=[(9, 0), (25, 0)])
+
+            self.assertEqual({obj_id: obj.centroid[0] for (obj_id, obj) in tracker.objects.items()},
+                             expected)
+
+    def test_swap_remove(self):
+        tracker = CentroidTracker(prediction=False, capacity=2)
+        for x in (0, 100, 200, 300):
+            tracker.register((x, 0), None)
+        self.assertEqual(len(tracker), 4)
+
+        # the last object takes the row of the removed one
+        tracker.deregister(1)
+        self.assertEqual(tracker.ids[:len(tracker)].tolist(), [0, 3, 2])
+        self.assertEqual(tracker.centroids[1].tolist(), [300, 0])
+
+        # the objects view stays ordered by ID and is rebuilt after changes
+        self.assertEqual(list(tracker.objects), [0, 2, 3])
+        self.assertIs(tracker.objects, tracker.objects)
+        tracker.update([(295, -5, 305, 5, None)])
+        self.assertEqual(list(tracker.objects), [0, 2, 3])
+        self.assertEqual(tracker.objects[3].disappeared, 0)
+        self.assertEqual(tracker.objects[0].disappeared, 1)
+
+    def test_capture_time(self):
+        # Frames captured 1 s apart but detected 10 ms apart
+        tracker = CentroidTracker(prediction=True)
+        for (i, processed_at) in enumerate((500.0, 500.01, 500.02)):
+            frame = main.Frame(None, None, (480, 640), None, captured_at=100.0 + i)
+            detections = Detections([(10 * i, 0, 10 * i + 20, 20)], processed_at, [1], [0.9], [0], [0.01])
+            main.track_frame(frame, tracker, None, detections, publishers=[])
+
+        self.assertEqual(tracker.last_timestamp, 102.0)
+        self.assertEqual(tracker.objects[0].data.last.timestamp, 102.0)
+        # The velocity is measured per second of capture time
+        self.assertAlmostEqual(tracker.filter.x[0, 3], 10, delta=3)
+
+    def test_move_velocity(self):
+        # An object moving 10 px/s, detected every 5th frame and moved in between
+        tracker = CentroidTracker(prediction=True)
+        for frame in range(60):
+            (timestamp, x) = (frame * 0.1, 100 + frame)
+            if frame % 5 == 0:
+                tracker.update([(x - 10, 90, x + 10, 110, None)], timestamp=timestamp)
+            else:
+                tracker.move([(1, 0)], [0], timestamp=timestamp)
+
+        self.assertAlmostEqual(tracker.filter.x[0, 3], 10, delta=0.5)
+        self.assertEqual(tuple(tracker.centroids[0]), (159, 100))
@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+from object_detection.Detections import Detections
+from object_detection.ObjData import ObjData
+from object_detection.CentroidTracker import CentroidTracker
+
+
+class TestDetections(unittest.TestCase):
+
+    def setUp(self):
+        self.detections = Detections(np.array([[0, 0, 2, 2], [10, 10, 20, 30]]),
+                                     1.5,
+                                     np.array(['Boat', 'Buoy'], dtype=object),
+                                     np.float32([0.9, 0.6]),
+                                     np.uint8([255, 12]),
+                                     np.float32([0.1, 0.2]))
+
+    def test_entries(self):
+        self.assertEqual(len(self.detections), 2)
+
+        (startX, startY, endX, endY, data) = self.detections[1]
+        self.assertEqual((startX, startY, endX, endY), (10, 10, 20, 30))
+        self.assertIsInstance(data, ObjData)
+        self.assertEqual(data.rect, (10, 10, 20, 30))
+        self.assertEqual(data.label, 'Buoy')
+        self.assertEqual(data.color, 12)
+        self.assertEqual(data.timestamp, 1.5)
+        self.assertEqual(data.class_id, 1)
+        self.assertEqual(self.detections.class_ids.tolist(), [4, 1])
+
+        self.assertEqual(len(list(self.detections)), 2)
+        with self.assertRaises(IndexError):
+            self.detections[2]
+
+    def test_centroids(self):
+        self.assertEqual(self.detections.centroids().tolist(), [[1, 1], [15, 20]])
+
+    def test_transform(self):
+        # a translation moves the rects and their centroids
+        shifted = self.detections.transform(np.array([[1, 0, 10], [0, 1, 5], [0, 0, 1]], dtype=float))
+        self.assertEqual(shifted.rects.tolist(), [[10, 5, 12, 7], [20, 15, 30, 35]])
+        self.assertEqual(shifted.centroids().tolist(), [[11, 6], [25, 25]])
+        self.assertEqual(shifted[1][4].label, 'Buoy')
+
+        # a quarter turn swaps the sides of the rects, (left, bottom, right, top) is kept
+        flipped = Detections(np.array([[10, 30, 20, 10]]), 1.5, self.detections.labels[:1],
+                             self.detections.confidences[:1], self.detections.colors[:1],
+                             self.detections.sizes[:1])
+        turned = flipped.transform(np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]], dtype=float))
+        self.assertEqual(turned.rects.tolist(), [[-30, 20, -10, 10]])
+        self.assertEqual(turned.centroids().tolist(), [[-20, 15]])
+
+    def test_tracker_update(self):
+        tracker = CentroidTracker()
+        tracker.update(self.detections)
+        self.assertEqual(len(tracker.objects), 2)
+        self.assertEqual(tracker.objects[1].data[-1].label, 'Buoy')
+
+    def test_compact_data(self):
+        data = ObjData((0, 0, 2, 2), 1.5, 4, 0.9, 255, 0.1)
+        self.assertFalse(hasattr(data, '__dict__'))
+        self.assertEqual(data.label, 'Boat')
+        self.assertEqual(ObjData((0, 0, 2, 2), 1.5, 'Boat', 0.9, 255, 0.1).class_id, 4)
+        self.assertIsNone(ObjData(None, None, None, 0.9, 255, 0.1).label)
@@ -0,0 +1,22 @@
+import unittest
+import config
+from object_detection.Detector import Detector
+
+
+class TestDetector(unittest.TestCase):
+
+    def test_lazy_load(self):
+        detector = Detector()
+
+        # Nothing is loaded until the network is used
+        self.assertEqual(detector.model, config.DNN_MODEL)
+        self.assertEqual(detector.nets, {})
+
+    def test_use_model(self):
+        detector = Detector()
+        with self.assertRaises(KeyError):
+            detector.use_model('not a model')
+
+        detector.use_model(config.DNN_MODEL)
+        self.assertEqual(detector.model, config.DNN_MODEL)
+        self.assertEqual(detector.input_size, tuple(config.DNN_MODELS[config.DNN_MODEL]['input_size']))
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2 as cv
+
+import config
+import main
+from classes.FrameScheduler import FrameScheduler
+from classes.Imu import Imu
+
+MOCK_IMU_PATH = os.path.join(config.ROOT_DIR, 'test/mocks/IMU_timestamped_test_data.bin')
+
+
+class FakeCapture:
+    """Stand-in for cv.VideoCapture that counts the frames it decodes"""
+
+    def __init__(self, frames, fps=0, is_file=False):
+        self.frames = frames
+        self.fps = fps
+        self.is_file = is_file
+        self.position = 0
+        self.grabbed = None
+        self.decoded = 0
+
+    def get(self, prop):
+        if prop == cv.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv.CAP_PROP_FRAME_COUNT:
+            return self.frames if self.is_file else -1
+        return 0
+
+    def set(self, prop, value):
+        if prop == cv.CAP_PROP_POS_FRAMES:
+            self.position = int(value)
+        return True
+
+    def grab(self):
+        if self.position >= self.frames:
+            return False
+        self.grabbed = self.position
+        self.position += 1
+        return True
+
+    def retrieve(self):
+        self.decoded += 1
+        return True, self.grabbed
+
+
+class FakeClock:
+    """One tick of time per reading"""
+
+    def __init__(self, tick):
+        self.now = 0
+        self.tick = tick
+
+    def __call__(self):
+        self.now += self.tick
+        return self.now
+
+
+def drain(scheduler):
+    frames = []
+    while True:
+        captured = scheduler.next_frame()
+        if captured is None:
+            return frames
+        frames.append(captured[1])
+
+
+class TestFrameScheduler(unittest.TestCase):
+
+    def test_camera_fixed_interval(self):
+        # 0.125 s between frames read from a camera, 1 frame processed every 0.5 s
+        cap = FakeCapture(20)
+        scheduler = FrameScheduler(cap, interval=0.5, clock=FakeClock(0.125))
+
+        frames = drain(scheduler)
+
+        self.assertEqual(frames, [0, 4, 8, 12, 16])
+        # Skipped frames are never decoded
+        self.assertEqual(cap.decoded, 5)
+        self.assertEqual(scheduler.metrics()['skipped'], 15)
+
+    def test_file_fixed_interval(self):
+        # One frame every 0.5 s of a 10 fps video
+        cap = FakeCapture(20, fps=10, is_file=True)
+        scheduler = FrameScheduler(cap, interval=0.5)
+
+        self.assertEqual(drain(scheduler), [0, 5, 10, 15])
+        self.assertEqual(cap.decoded, 4)
+        self.assertEqual(scheduler.metrics()['skipped'], 16)
+
+    def test_file_seek(self):
+        # Long runs of skipped frames are seeked over
+        cap = FakeCapture(100, fps=10, is_file=True)
+        scheduler = FrameScheduler(cap, interval=5, seek_threshold=30)
+
+        self.assertEqual(scheduler.next_frame()[1], 0)
+        self.assertEqual(scheduler.next_frame()[1], 50)
+        self.assertEqual(scheduler.metrics()['seeked'], 49)
+        self.assertEqual(scheduler.metrics()['skipped'], 0)
+        self.assertIsNone(scheduler.next_frame())
+
+    def test_adaptive(self):
+        # The interval follows the recorded processing latency
+        cap = FakeCapture(100, fps=10, is_file=True)
+        scheduler = FrameScheduler(cap, interval=5, adaptive=True)
+
+        self.assertEqual(scheduler.next_frame()[1], 0)
+        scheduler.record(0.3)
+        self.assertEqual(scheduler.next_frame()[1], 3)
+        scheduler.record(0.8)
+        self.assertAlmostEqual(scheduler.latency, 0.4)
+        self.assertEqual(scheduler.next_frame()[1], 7)
+        self.assertEqual(scheduler.metrics()['processed'], 3)
+
+    def test_file_replay_attitudes(self):
+        # Frames of a replayed video are stamped with the video time from the start of the
+        # IMU log, not with the wall clock, so each one gets the attitude recorded at its time
+        with tempfile.TemporaryDirectory() as tmp:
+            imu = Imu(MOCK_IMU_PATH, cache=True, cache_dir=tmp)
+            start_time = main.replay_start_time(imu)
+            scheduler = FrameScheduler(FakeCapture(2000, fps=1, is_file=True), interval=300,
+                                       clock=FakeClock(1e9), start_time=start_time)
+
+            frames = [scheduler.next_frame() for _ in range(5)]
+            self.assertEqual([captured_at - start_time for (captured_at, _) in frames],
+                             [0, 300, 600, 900, 1200])
+
+            with mock.patch.object(config, 'IMU_CACHE', True), mock.patch.object(config, 'IMU_CLOCK_OFFSET', 0):
+                attitudes = [main.get_attitude(imu, captured_at) for (captured_at, _) in frames]
+            self.assertAlmostEqual(attitudes[0]['nuc_time'], imu.first_nuc_time())
+            self.assertEqual(len({attitude['roll'] for attitude in attitudes}), 5)
+            imu.close()
@@ -1,8 +1,12 @@
 import unittest
 import os
+import tempfile
+import time
+import numpy as np
 from config import ROOT_DIR
+from classes import imu_cache
 from classes.Imu import Imu
-from test.mocks.parsed_imu_data import imu_data_mock, imu_last_valid_data_mock
+from test.mocks.parsed_imu_data import imu_data_mock, imu_last_data_mock
 from numpy.testing import assert_allclose
 
 MOCK_IMU_PATH = os.path.join(ROOT_DIR, 'test/mocks/IMU_timestamped_test_data.bin')
@@ -25,11 +29,7 @@ class TestIMU(unittest.TestCase):
                            err_msg="yaw", verbose=True, atol=1e-6)
         assert_allclose(data['roll'], imu_data_mock['roll'],
                            err_msg="roll", verbose=True, atol=1e-6)
-        assert_allclose(data['valid_heading'], imu_data_mock['valid_heading'],
-                           err_msg="valid_heading", verbose=True, atol=1e-6)
-        assert_allclose(data['valid_orientation'], imu_data_mock['valid_orientation'],
-                           err_msg="valid_orientation",
-                           verbose=True, atol=1e-6)
+        self.assertEqual(data['valid_orientation'], 1)
         assert_allclose(data['nuc_time'], imu_data_mock['nuc_time'],
                            err_msg="nuc_time", verbose=True, atol=1e-6)
 
@@ -37,13 +37,129 @@ class TestIMU(unittest.TestCase):
         data = self.imu.get_last_valid_orientation()
         print(data)
         self.assertIsNotNone(data)
-        assert_allclose(data['heading'], imu_last_valid_data_mock['heading'],
+        assert_allclose(data['heading'], imu_last_data_mock['heading'],
                            err_msg="Heading", verbose=True, atol=1e-6)
-        assert_allclose(data['pitch'], imu_last_valid_data_mock['pitch'],
+        assert_allclose(data['pitch'], imu_last_data_mock['pitch'],
                            err_msg="pitch", verbose=True, atol=1e-6)
-        assert_allclose(data['yaw'], imu_last_valid_data_mock['yaw'],
+        assert_allclose(data['yaw'], imu_last_data_mock['yaw'],
                            err_msg="yaw", verbose=True, atol=1e-6)
-        assert_allclose(data['roll'], imu_last_valid_data_mock['roll'],
+        assert_allclose(data['roll'], imu_last_data_mock['roll'],
                            err_msg="roll", verbose=True, atol=1e-6)
-        assert_allclose(data['nuc_time'], imu_last_valid_data_mock['nuc_time'],
-                           err_msg="nuc_time", verbose=True, atol=1e-6)
\ No newline at end of file
+        assert_allclose(data['nuc_time'], imu_last_data_mock['nuc_time'],
+                           err_msg="nuc_time", verbose=True, atol=1e-6)
+
+    def test_follow_mode(self):
+        imu = Imu(MOCK_IMU_PATH, follow=True)
+        data = imu.get_last_orientation()
+        assert_allclose(data['roll'], imu_data_mock['roll'],
+                        err_msg="roll", verbose=True, atol=1e-6)
+        assert_allclose(data['nuc_time'], imu_data_mock['nuc_time'],
+                        err_msg="nuc_time", verbose=True, atol=1e-6)
+
+        # Nothing was appended, the kept samples are returned again
+        data = imu.get_last_orientation()
+        assert_allclose(data['roll'], imu_data_mock['roll'],
+                        err_msg="roll", verbose=True, atol=1e-6)
+        imu.close()
+
+    def test_background_reader(self):
+        imu = Imu(MOCK_IMU_PATH)
+        imu.start(poll_interval=0.001)
+        snapshot = imu.get_latest_attitude()
+        imu.stop()
+        imu.close()
+
+        self.assertIsNotNone(snapshot)
+        for field in ('heading', 'pitch', 'roll', 'yaw', 'nuc_time'):
+            assert_allclose(snapshot[field], imu_last_data_mock[field],
+                            err_msg=field, verbose=True, atol=1e-6)
+
+        # Snapshots are immutable
+        with self.assertRaises(TypeError):
+            snapshot['roll'] = 0
+        with self.assertRaises(TypeError):
+            snapshot['roll'][...] = 0
+
+    def test_background_reader_bad_chunks(self):
+        class Reader:
+            chunks = [{'IMU': {'nuc_time': np.array([1.])}},  # no attitude
+                      ValueError("corrupt chunk"),
+                      {'IMU': {'nuc_time': np.array([2.]),
+                               'cf_euler_angles': {'roll': np.array([.1]), 'pitch': np.array([.2]),
+                                                   'yaw': np.array([.3])}}}]
+
+            def read(self):
+                chunk = self.chunks.pop(0) if self.chunks else {}
+                if isinstance(chunk, Exception):
+                    raise chunk
+                return chunk
+
+            def close(self):
+                pass
+
+        imu = Imu(MOCK_IMU_PATH)
+        imu.reader = Reader()
+        with self.assertLogs('classes.Imu', 'ERROR'):
+            imu.start(poll_interval=0.001)
+            deadline = time.time() + 5
+            while imu.get_latest_attitude() is None and time.time() < deadline:
+                time.sleep(0.001)
+        imu.close()
+
+        # The reader kept going after the bad chunks
+        self.assertEqual(imu.get_latest_attitude()['nuc_time'], 2.)
+        self.assertEqual(len(imu.attitudes), 1)
+
+    def test_orientation_at(self):
+        imu = Imu(MOCK_IMU_PATH, follow=True)
+        self.assertIsNone(imu.orientation_at(0))
+        imu.get_last_orientation()
+
+        times = imu_data_mock['nuc_time'][:, 0]
+        roll = imu_data_mock['roll'][0]
+
+        # Exactly on a sample
+        data = imu.orientation_at(times[10])
+        assert_allclose(data['roll'], roll[10], atol=1e-6)
+
+        # Halfway between two samples
+        data = imu.orientation_at((times[10] + times[11]) / 2)
+        assert_allclose(data['roll'], (roll[10] + roll[11]) / 2, atol=1e-6)
+
+        # Outside of the buffered range
+        assert_allclose(imu.orientation_at(times[0] - 1)['roll'], roll[0], atol=1e-6)
+        assert_allclose(imu.orientation_at(times[-1] + 1)['roll'], roll[-1], atol=1e-6)
+        imu.close()
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            imu = Imu(MOCK_IMU_PATH, cache=True, cache_dir=tmp)
+            cache_path = imu_cache.cache_path_for(MOCK_IMU_PATH, tmp)
+            self.assertTrue(os.path.exists(cache_path))
+            self.assertIsInstance(imu.cached, np.memmap)
+
+            times = imu_data_mock['nuc_time'][:, 0]
+            data = imu.orientation_at(times[10])
+            assert_allclose(data['roll'], imu_data_mock['roll'][0][10], atol=1e-6)
+            assert_allclose(data['heading'], imu_data_mock['heading'][0][0], atol=1e-6)
+
+            # The second run maps the existing cache
+            mtime = os.path.getmtime(cache_path)
+            cached = Imu(MOCK_IMU_PATH, cache=True, cache_dir=tmp).cached
+            self.assertEqual(os.path.getmtime(cache_path), mtime)
+            assert_allclose(cached, imu.cached)
+            del imu, cached
+
+    def test_cache_cleanup(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Caches of an earlier version of the log and an unrelated file
+            name = os.path.basename(MOCK_IMU_PATH)
+            for stale in (name + '.10.20.npy', name + '.10.20.idx.npy', 'other.10.20.npy'):
+                open(os.path.join(tmp, stale), 'wb').close()
+
+            imu = Imu(MOCK_IMU_PATH, cache=True, cache_dir=tmp)
+            cache_path = imu_cache.cache_path_for(MOCK_IMU_PATH, tmp)
+
+            # Only the current cache is left, without an index sidecar
+            self.assertEqual(sorted(os.listdir(tmp)), sorted([os.path.basename(cache_path), 'other.10.20.npy']))
+            imu.close()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from config import ROOT_DIR
+from classes import ImuLog as imu_log
+from classes import mip_parser
+from test.mocks.parsed_imu_data import imu_data_mock
+
+MOCK_IMU_PATH = os.path.join(ROOT_DIR, 'test/mocks/IMU_timestamped_test_data.bin')
+
+
+class TestImuLog(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.index_path = os.path.join(cls.tmp.name, 'imu' + imu_log.INDEX_SUFFIX)
+        cls.log = imu_log.ImuLog(MOCK_IMU_PATH, cls.index_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.log.close()
+        cls.tmp.cleanup()
+
+    def test_index_matches_full_parse(self):
+        full = mip_parser.parse_imu(np.fromfile(MOCK_IMU_PATH, dtype=np.uint8), parse_nuc_timestamps=True)
+        self.assertTrue(os.path.exists(self.index_path))
+        self.assertEqual(len(self.log), len(full['IMU']['nuc_time']))
+        assert_allclose(self.log.imu_index['nuc_time'], full['IMU']['nuc_time'])
+
+    def test_chunked_index(self):
+        chunk_bytes = imu_log.CHUNK_BYTES
+        imu_log.CHUNK_BYTES = 10007
+        try:
+            index = imu_log.build_index(MOCK_IMU_PATH, os.path.join(self.tmp.name, 'chunked.npy'))
+        finally:
+            imu_log.CHUNK_BYTES = chunk_bytes
+
+        expected = np.load(self.index_path)
+        self.assertEqual(index['offset'].tolist(), expected['offset'].tolist())
+
+    def test_index_path_without_suffix(self):
+        # The index is written and read at the given path, even without .npy
+        index_path = os.path.join(self.tmp.name, 'sidecar')
+        log = imu_log.ImuLog(MOCK_IMU_PATH, index_path)
+        log.close()
+
+        self.assertTrue(os.path.exists(index_path))
+        self.assertFalse(os.path.exists(index_path + '.npy'))
+        self.assertEqual(len(log), len(self.log))
+
+    def test_slice(self):
+        times = imu_data_mock['nuc_time'][:, 0]
+        samples = self.log.slice(times[0] - 1e-7, times[-1] + 1e-7)
+
+        assert_allclose(samples['nuc_time'], times, atol=1e-6)
+        assert_allclose(samples['roll'], imu_data_mock['roll'][0], atol=1e-6)
+        assert_allclose(samples['pitch'], imu_data_mock['pitch'][0], atol=1e-6)
+        assert_allclose(samples['yaw'], imu_data_mock['yaw'][0], atol=1e-6)
+        assert_allclose(samples['heading'], imu_data_mock['heading'][0][0], atol=1e-6)
+
+    def test_seek(self):
+        self.assertEqual(self.log.seek(0), 0)
+        self.assertEqual(self.log.seek(self.log.end_time + 1), len(self.log))
+        self.assertEqual(self.log.seek(self.log.imu_index['nuc_time'][100]), 100)
+        self.assertEqual(len(self.log.slice(self.log.end_time + 1, self.log.end_time + 2)), 0)
@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+from object_detection.KalmanFilter import KalmanFilter
+
+
+class TestKalmanFilter(unittest.TestCase):
+
+    def test_constant_velocity(self):
+        kf = KalmanFilter(process_noise=1.0, measurement_noise=1.0)
+        kf.add((0, 0), 10)
+        kf.add((100, 50), 20)
+
+        # Both objects move at a constant velocity, the second one shrinks
+        for t in range(1, 10):
+            kf.predict(1.0)
+            kf.correct([0, 1], [(5 * t, 0, 10), (100, 50 - 2 * t, 20 - t)])
+
+        kf.predict(1.0)
+        np.testing.assert_allclose(kf.positions, [[50, 0], [100, 30]], atol=0.5)
+        np.testing.assert_allclose(kf.x[:, 3:], [[5, 0, 0], [0, -2, -1]], atol=0.2)
+
+    def test_remove(self):
+        kf = KalmanFilter()
+        kf.add((0, 0))
+        kf.add((1, 1))
+        kf.remove(0)
+
+        self.assertEqual(len(kf), 1)
+        self.assertEqual(kf.positions.tolist(), [[1, 1]])
+        self.assertEqual(kf.P.shape, (1, 6, 6))
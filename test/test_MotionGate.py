@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+import numpy as np
+import config
+import main
+from object_detection import detect_and_track
+from object_detection.MotionGate import MotionGate
+from object_detection.CentroidTracker import CentroidTracker
+from object_detection.ObjData import ObjData
+
+
+def scene(dx=0, dy=0):
+    # textured square on a dark background, moved by (dx, dy)
+    img = np.full((240, 320, 3), 20, dtype=np.uint8)
+    rng = np.random.RandomState(0)
+    img[100 + dy:160 + dy, 100 + dx:160 + dx] = rng.randint(60, 255, size=(60, 60, 1))
+    return img
+
+
+class TestMotionGate(unittest.TestCase):
+
+    def test_needs_detection(self):
+        gate = MotionGate(detect_every=3, threshold=5, flow_width=160)
+        (still, _) = gate.prepare(scene(), (240, 320))
+
+        # The first frame, then every third frame of a still scene
+        self.assertEqual([gate.needs_detection(still) for _ in range(7)],
+                         [True, False, False, True, False, False, True])
+
+        # Motion triggers the DNN sooner
+        (moved, _) = gate.prepare(np.zeros((240, 320, 3), dtype=np.uint8), (240, 320))
+        self.assertTrue(gate.needs_detection(moved))
+
+    def test_propagate(self):
+        tracker = CentroidTracker()
+        tracker.update([(100, 100, 160, 160, ObjData((100, 100, 160, 160), 0, 'Boat', 0.9, 255, 0.1))])
+
+        # Flow is computed on half resolution images, moves are in frame coordinates
+        gate = MotionGate(flow_width=160)
+        gate.track(*gate.prepare(scene(), (240, 320)))
+        gate.propagate(tracker, *gate.prepare(scene(6, -4), (240, 320)))
+
+        obj = tracker.objects[0]
+        self.assertEqual(tuple(obj.centroid), (136, 126))
+        self.assertEqual(obj.data[-1].rect, (106, 96, 166, 156))
+        self.assertEqual(obj.disappeared, 0)
+
+    def test_propagate_prediction(self):
+        # The flow is a measurement of the filtered objects, detections are matched to them
+        tracker = CentroidTracker(prediction=True, max_cost=5)
+        tracker.update([(100, 100, 160, 160, None)], timestamp=0)
+
+        gate = MotionGate(flow_width=160)
+        gate.track(*gate.prepare(scene(), (240, 320)))
+        gate.propagate(tracker, *gate.prepare(scene(6, -4), (240, 320)), timestamp=1)
+        self.assertEqual(tracker.filter.positions.round().tolist(), [[136, 126]])
+
+        # The object keeps moving at the speed measured by the flow
+        tracker.update([(112, 92, 172, 152, None)], timestamp=2)
+        self.assertEqual(list(tracker.objects), [0])
+        np.testing.assert_allclose(tracker.filter.x[0, 3:5], [6, -4], atol=0.5)
+
+    @mock.patch.multiple(config, PREPROCESSING='fused', BATCH_SIZE=3, MOTION_GATING=True,
+                         DETECTION_EVERY=5, MOTION_THRESHOLD=255, DRAW_TO_SCREEN=False)
+    def test_sequential_batches(self):
+        # Frames the gate skips wait with the batch instead of flushing it
+        from test.test_detect_and_track import StubDetector
+
+        class Scheduler:
+            frames = iter([(float(i), scene(i, 0)) for i in range(12)])
+
+            def next_frame(self):
+                return next(self.frames, None)
+
+            def record(self, seconds):
+                pass
+
+        class Imu:
+            def orientation_at(self, t):
+                return None
+
+        class Recorder:
+            frame_ids = []
+
+            def publish(self, frame_id, captured_at, tracks):
+                self.frame_ids.append(frame_id)
+
+        batches = []
+        detector = StubDetector()
+        detector.input_size = (300, 300)
+        forward = detector.forward
+        detector.forward = lambda imgs: forward(batches.append(len(imgs)) or imgs)
+
+        recorder = Recorder()
+        with mock.patch.object(detect_and_track, 'detector', detector):
+            main.run_sequential(Scheduler(), Imu(), CentroidTracker(), [recorder])
+
+        # the DNN runs on frames 0, 5 and 10, in one forward pass, and every frame is output in order
+        self.assertEqual(batches, [3])
+        self.assertEqual(recorder.frame_ids, list(range(12)))
@@ -0,0 +1,36 @@
+import unittest
+from classes.Pipeline import DropOldestQueue, Pipeline, QueueClosed
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_drop_oldest(self):
+        queue = DropOldestQueue(2)
+        for i in range(5):
+            queue.put(i)
+
+        self.assertEqual(queue.dropped, 3)
+        self.assertEqual(queue.get_many(5), [3, 4])
+        self.assertEqual(queue.get_many(5, timeout=0.01), [])
+
+        queue.put(5)
+        queue.close()
+        self.assertEqual(queue.get(), 5)
+        with self.assertRaises(QueueClosed):
+            queue.get()
+
+    def test_stages_in_order(self):
+        source = iter(range(20))
+        pipeline = Pipeline(queue_size=100)
+        pipeline.add_source('source', lambda: next(source, None))
+        pipeline.add_stage('double', lambda items: [2 * i for i in items])
+        pipeline.add_stage('pairs', lambda items: [tuple(items)], batch_size=2)
+        pipeline.start()
+
+        results = list(pipeline.results())
+        pipeline.stop()
+
+        flat = [i for batch in results for i in batch]
+        self.assertEqual(flat, [2 * i for i in range(20)])
+        self.assertEqual(pipeline.dropped(), {'source': 0, 'double': 0, 'pairs': 0})
+        self.assertEqual([stage.processed for stage in pipeline.stages], [20, 20, 20])
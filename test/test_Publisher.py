@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from classes.Publisher import HEADER, TRACK_DTYPE, Publisher, decode, encode, make_tracks
+from test.mocks.navigation_consumer import NavigationConsumer
+
+
+class TestPublisher(unittest.TestCase):
+
+    def setUp(self):
+        self.tracks = make_tracks([3, 7], [-12.5, 30.25], [np.nan, 4.0], [4, -1])
+
+    def test_encode_decode(self):
+        message = encode(42, 1600000000.25, self.tracks)
+        self.assertEqual(len(message), HEADER.size + 2 * TRACK_DTYPE.itemsize)
+
+        (frame_id, captured_at, tracks) = decode(message)
+        self.assertEqual((frame_id, captured_at), (42, 1600000000.25))
+        self.assertEqual(tracks['id'].tolist(), [3, 7])
+        self.assertEqual(tracks['bearing'].tolist(), [-12.5, 30.25])
+        self.assertTrue(np.isnan(tracks['size_increase'][0]))
+        self.assertEqual(tracks['class_id'].tolist(), [4, -1])
+
+        with self.assertRaises(ValueError):
+            decode(message[:-1])
+
+    def test_udp(self):
+        consumer = NavigationConsumer('udp')
+        publisher = Publisher(consumer.address, 'udp')
+        try:
+            for frame_id in range(3):
+                publisher.publish(frame_id, 1.5, self.tracks)
+
+            received = [consumer.receive() for _ in range(3)]
+            self.assertEqual([message[0] for message in received], [0, 1, 2])
+            self.assertEqual(received[2][2]['id'].tolist(), [3, 7])
+        finally:
+            publisher.close(1.0)
+            consumer.close()
+        self.assertEqual(publisher.metrics(), {'sent': 3, 'dropped': 0, 'failed': 0})
+
+    def test_unix_without_consumer(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'navigation.sock')
+
+            # nothing is listening, messages are dropped without blocking
+            publisher = Publisher(path, 'unix')
+            publisher.publish(0, 1.5, self.tracks)
+            publisher.close(1.0)
+            self.assertEqual(publisher.metrics()['failed'], 1)
+
+            consumer = NavigationConsumer('unix', path)
+            publisher = Publisher(path, 'unix')
+            try:
+                publisher.publish(1, 1.5, self.tracks)
+                self.assertEqual(consumer.receive()[0], 1)
+            finally:
+                publisher.close(1.0)
+                consumer.close()
+
+    def test_drop_oldest(self):
+        consumer = NavigationConsumer('udp')
+        publisher = Publisher(consumer.address, 'udp', queue_size=2)
+        try:
+            # the sender waits for the queue lock while it fills up
+            with publisher.queue.cond:
+                for frame_id in range(3):
+                    publisher.publish(frame_id, 1.5, self.tracks)
+        finally:
+            publisher.close(1.0)
+        received = [consumer.receive(0.5) for _ in range(2)]
+        consumer.close()
+        self.assertEqual(publisher.metrics()['dropped'], 1)
+        self.assertEqual([message[0] for message in received], [1, 2])
@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from classes.RingBuffer import RingBuffer
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_extend_wraps_around(self):
+        buffer = RingBuffer(5, ('t', 'x'))
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.tail().shape, (0, 2))
+
+        buffer.extend([[0, 0], [1, 10], [2, 20]])
+        self.assertEqual(len(buffer), 3)
+
+        buffer.extend([[3, 30], [4, 40], [5, 50], [6, 60]])
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(buffer.count, 7)
+
+        rows = buffer.tail()
+        self.assertEqual(buffer.column(rows, 't').tolist(), [2, 3, 4, 5, 6])
+        self.assertEqual(buffer.column(rows, 'x').tolist(), [20, 30, 40, 50, 60])
+        self.assertEqual(buffer.tail(2).tolist(), [[5, 50], [6, 60]])
+
+    def test_extend_more_than_capacity(self):
+        buffer = RingBuffer(4, ('t',))
+        buffer.extend(np.arange(10))
+        self.assertEqual(buffer.tail()[:, 0].tolist(), [6, 7, 8, 9])
+
+    def test_window_is_contiguous_view(self):
+        buffer = RingBuffer(4, ('t', 'x'))
+        buffer.extend([[i, 10 * i] for i in range(6)])
+
+        window = buffer.window()
+        self.assertTrue(window[0].flags['C_CONTIGUOUS'])
+        self.assertTrue(window.base is buffer.data)
+        self.assertEqual(window[0].tolist(), [2, 3, 4, 5])
+        self.assertEqual(window[0].searchsorted(3.5), 2)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import config
+from object_detection.CentroidTracker import CentroidTracker
+from object_detection.ObjData import ObjData
+from object_detection.TrackHistory import TrackHistory, TrackLog, read_track_log
+
+
+def data(i):
+    return ObjData((i, i, i + 10, i + 10), float(i), 'Boat', 0.5, (0, 0, 255), 0.1 * i)
+
+
+class TestTrackHistory(unittest.TestCase):
+
+    def test_bounded(self):
+        history = TrackHistory(depth=4)
+        for i in range(10):
+            history.append(data(i))
+        history.append(None)
+
+        self.assertEqual(len(history), 4)
+        self.assertEqual(history.column(history.tail(), 'timestamp').tolist(), [6, 7, 8, 9])
+
+        # the newest data object is kept whole, older ones are rebuilt
+        self.assertIs(history[-1], history.last)
+        self.assertEqual(history[0].rect, (6, 6, 16, 16))
+        self.assertEqual(history[-2].label, 'Boat')
+        self.assertEqual(history.column(history.tail(), 'class_id').tolist(), [4] * 4)
+        with self.assertRaises(IndexError):
+            history[4]
+
+    def test_spill(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'tracks.bin')
+            log = TrackLog(path)
+            history = TrackHistory(depth=3, log=log, track_id=7)
+            for i in range(5):
+                history.append(data(i))
+            history.close()
+            log.close()
+
+            records = read_track_log(path)
+            self.assertEqual(records['track_id'].tolist(), [7] * 5)
+            self.assertEqual(records['timestamp'].tolist(), [0, 1, 2, 3, 4])
+            self.assertEqual(records['rect'][4].tolist(), [4, 4, 14, 14])
+            self.assertEqual(records['class_id'].tolist(), [4] * 5)
+
+    def test_tracker_close(self):
+        # The samples of the objects still tracked are written when the tracker is closed
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'tracks.bin')
+            with mock.patch.object(config, 'TRACK_LOG', path):
+                tracker = CentroidTracker(prediction=False)
+            for i in range(3):
+                tracker.update([(*data(i).rect, data(i))])
+            tracker.close()
+            tracker.close()
+
+            records = read_track_log(path)
+            self.assertEqual(records['track_id'].tolist(), [0] * 3)
+            self.assertEqual(records['timestamp'].tolist(), [0, 1, 2])
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from classes.Publisher import make_tracks
+from classes.TrackServer import LATEST, SUBSCRIBE, Client, TrackServer
+from test.mocks.navigation_consumer import TrackSubscriber
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestTrackServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tracks = make_tracks([3, 7], [-12.5, 30.25], [0.5, 4.0], [4, -1])
+
+    def test_fan_out(self):
+        server = TrackServer(('127.0.0.1', 0)).start()
+        subscribers = [TrackSubscriber(server.address) for _ in range(3)]
+        try:
+            for subscriber in subscribers:
+                subscriber.send(SUBSCRIBE)
+            self.assertTrue(wait_for(lambda: len(server.subscribers) == 3))
+
+            for frame_id in range(4):
+                server.publish(frame_id, 1.5, self.tracks)
+            for subscriber in subscribers:
+                received = [subscriber.receive() for _ in range(4)]
+                self.assertEqual([message[0] for message in received], [0, 1, 2, 3])
+                self.assertEqual(received[3][2]['id'].tolist(), [3, 7])
+        finally:
+            for subscriber in subscribers:
+                subscriber.close()
+            server.close(1.0)
+
+    def test_latest(self):
+        with tempfile.TemporaryDirectory() as folder:
+            server = TrackServer(os.path.join(folder, 'tracks.sock'), 'unix').start()
+            client = TrackSubscriber(server.address, 'unix')
+            try:
+                # nothing was published yet
+                client.send(LATEST)
+                self.assertIsNone(client.receive())
+
+                for frame_id in range(5):
+                    server.publish(frame_id, 1.5, self.tracks)
+                self.assertTrue(wait_for(lambda: server.published == 5))
+
+                # only the last frame is sent, not the history
+                client.send(LATEST)
+                (frame_id, _, tracks) = client.receive()
+                self.assertEqual(frame_id, 4)
+                self.assertEqual(tracks['bearing'].tolist(), [-12.5, 30.25])
+            finally:
+                client.close()
+                server.close(1.0)
+
+    def test_slow_client_eviction(self):
+        server = TrackServer(('127.0.0.1', 0), buffer_size=2).start()
+        slow = TrackSubscriber(server.address, receive_buffer=4096)
+        fast = TrackSubscriber(server.address)
+        try:
+            slow.send(SUBSCRIBE)
+            fast.send(SUBSCRIBE)
+            self.assertTrue(wait_for(lambda: len(server.subscribers) == 2))
+
+            # large messages fill the socket buffers of the client that never reads
+            tracks = make_tracks(range(4000), 0, 0, 0)
+            received = 0
+            for frame_id in range(200):
+                server.publish(frame_id, 1.5, tracks)
+                fast.receive()
+                received += 1
+
+            self.assertTrue(wait_for(lambda: server.evicted == 1))
+            self.assertEqual(received, 200)
+            self.assertEqual(server.metrics()['clients'], 1)
+        finally:
+            slow.close()
+            fast.close()
+            server.close(1.0)
+
+    def test_connection_lost(self):
+        # A client whose connection is reset while sending is disconnected, not counted as slow
+        class Writer:
+            def write(self, data):
+                pass
+
+            async def drain(self):
+                raise ConnectionResetError()
+
+            def close(self):
+                pass
+
+        async def send():
+            disconnected = []
+            client = Client(Writer(), 2, disconnected.append)
+            client.queue.put_nowait(b'message')
+            await client.task
+            return client, disconnected
+
+        (client, disconnected) = asyncio.run(send())
+        self.assertEqual(disconnected, [client])
+        self.assertIsNone(client.task.exception())
@@ -1,6 +1,8 @@
 import unittest
+from object_detection.CentroidTracker import CentroidTracker
 from object_detection.TrackedObject import TrackedObject
 from object_detection.ObjData import ObjData
+from object_detection.TrackHistory import TrackHistory
 
 
 class TestTrackedObject(unittest.TestCase):
@@ -64,3 +66,25 @@ class TestTrackedObject(unittest.TestCase):
         self.assertEqual(obj.data, old_data)
         self.assertEqual(obj.disappeared, old_disappeared)
         self.assertEqual(obj.size_increase, old_halving_time)
+
+    def test_existing_history(self):
+        history = TrackHistory(4)
+        history.append(ObjData((0, 0, 2, 2), 1, "Boat", 0.99, 255, 0.2))
+
+        # The history is used as is, without appending a missing detection
+        obj = TrackedObject((1, 1), None, history)
+        self.assertIs(obj.data, history)
+        self.assertEqual(len(obj.data), 1)
+
+    def test_same_rate_as_tracker(self):
+        # The object and the tracker share the moving average, samples without elapsed time are skipped
+        data = [ObjData((0, 0, 2, 2), time, "Boat", 0.99, 255, size)
+                for (time, size) in ((1, 0.2), (2, 0.4), (2, 0.5), (3, 0.45))]
+        obj = TrackedObject((1, 1), data[0])
+        for d in data[1:]:
+            obj.update(centroid=(1, 1), data=d)
+        tracker = CentroidTracker(prediction=False)
+        for d in data:
+            tracker.update([(0, 0, 2, 2, d)])
+
+        self.assertAlmostEqual(obj.size_increase, tracker.objects[0].size_increase)
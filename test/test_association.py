@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+from object_detection import association
+
+
+class TestAssociation(unittest.TestCase):
+
+    def test_associate(self):
+        cost = np.array([[1, 2, 9],
+                         [2, 8, 9],
+                         [9, 9, 9]])
+
+        # The greedy assignment takes (0, 0) first and is left with (1, 1)
+        (rows, cols, unused_rows, unused_cols) = association.associate(cost, 'greedy', max_cost=5)
+        self.assertEqual(list(zip(rows, cols)), [(0, 0)])
+        self.assertEqual(unused_rows.tolist(), [False, True, True])
+        self.assertEqual(unused_cols.tolist(), [False, True, True])
+
+        # The hungarian assignment finds (0, 1) and (1, 0)
+        (rows, cols, unused_rows, unused_cols) = association.associate(cost, 'hungarian', max_cost=5)
+        self.assertEqual(sorted(zip(rows.tolist(), cols.tolist())), [(0, 1), (1, 0)])
+        self.assertEqual(unused_rows.tolist(), [False, False, True])
+        self.assertEqual(unused_cols.tolist(), [False, False, True])
+
+    def test_associate_empty(self):
+        (rows, cols, unused_rows, unused_cols) = association.associate(np.zeros((2, 0)))
+        self.assertEqual(len(rows), 0)
+        self.assertEqual(unused_rows.tolist(), [True, True])
+
+    def test_iou_cost(self):
+        cost = association.iou_cost([(0, 0, 10, 10)], [(0, 0, 10, 10), (5, 10, 15, 0), (20, 20, 30, 30)])
+        np.testing.assert_allclose(cost, [[0, 1 - 50 / 150, 1]])
+
+    def test_size_cost(self):
+        # The same distance costs less for larger objects
+        np.testing.assert_allclose(association.size_cost([(0, 0)], [(10, 0)], [10], [10]), [[1]])
+        np.testing.assert_allclose(association.size_cost([(0, 0)], [(10, 0)], [100], [100]), [[0.1]])
+
+        # Different sizes cost their log ratio
+        np.testing.assert_allclose(association.size_cost([(0, 0)], [(0, 0)], [10], [100]), [[np.log(10)]])
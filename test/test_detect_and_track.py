@@ -2,6 +2,17 @@ import unittest
 from object_detection import detect_and_track
 from object_detection import CentroidTracker as cT
 import cv2 as cv
+import numpy as np
+
+
+class StubDetector:
+    """Returns a single detection covering the center quarter of every image"""
+
+    def forward(self, imgs):
+        output = np.zeros((1, 1, len(imgs), 7), dtype=np.float32)
+        output[0, 0, :, 0] = np.arange(len(imgs))
+        output[0, 0, :, 1:] = [1, 0.9, 0.25, 0.25, 0.75, 0.75]
+        return output
 
 
 class TestDetectAndTrack(unittest.TestCase):
@@ -16,3 +27,50 @@ class TestDetectAndTrack(unittest.TestCase):
         cv.imshow('test', img)
         # Assert 5 boats found
         self.assertEqual(detect_and_track.detect_in_image(img, self.tracker), 5)
+
+    # Test that a batch finds the same boats in each image
+    def test_detect_in_images(self):
+        img = cv.imread("test/mocks/boats_snapshot.png", 1)
+        tracker = cT.CentroidTracker()
+        tracked = []
+        counts = detect_and_track.detect_in_images([img, img], tracker,
+                                                   on_tracked=tracked.append)
+        self.assertEqual(counts, [5, 5])
+        self.assertEqual(tracked, [0, 1])
+
+    def test_split_dnn_output(self):
+        # Batched SSD output keeps the image index in column 0
+        output = np.zeros((1, 1, 5, 7), dtype=np.float32)
+        output[0, 0, :, 0] = [0, 1, 1, 0, 1]
+        output[0, 0, :, 2] = [0.1, 0.2, 0.3, 0.4, 0.5]
+
+        (first, second) = detect_and_track.split_dnn_output(output, 2)
+        self.assertEqual(first.shape, (1, 1, 2, 7))
+        self.assertEqual(second[0, 0, :, 2].tolist(), np.float32([0.2, 0.3, 0.5]).tolist())
+
+    def test_detect_objects_frame_sizes(self):
+        # Boxes found in a network sized image are scaled to the frame it was made from
+        img = np.zeros((300, 300, 3), dtype=np.uint8)
+        (small, large) = detect_and_track.detect_objects([img, img], dnn=StubDetector(),
+                                                         frame_sizes=[(300, 300), (480, 640)])
+        self.assertEqual(small.rects.tolist(), [[75, 225, 225, 75]])
+        self.assertEqual(large.rects.tolist(), [[160, 360, 480, 120]])
+
+    def test_detect_objects_homographies(self):
+        # Boxes found in the captured frame are mapped into the corrected frame
+        img = np.zeros((300, 300, 3), dtype=np.uint8)
+        shift = np.array([[1, 0, 10], [0, 1, 5], [0, 0, 1]], dtype=float)
+        (kept, mapped) = detect_and_track.detect_objects([img, img], dnn=StubDetector(),
+                                                         homographies=[None, shift])
+        self.assertEqual(kept.rects.tolist(), [[75, 225, 225, 75]])
+        self.assertEqual(mapped.rects.tolist(), [[85, 230, 235, 80]])
+        self.assertEqual(mapped.centroids().tolist(), [[160, 155]])
+
+    def test_detect_objects_tiles(self):
+        # Detections of each tile are moved into the frame, duplicates from overlapping tiles are merged
+        img = np.zeros((480, 640, 3), dtype=np.uint8)
+        (tiled,) = detect_and_track.detect_objects([img], dnn=StubDetector(),
+                                                   tiles=[[(0, 100, 200, 200), (20, 100, 200, 200),
+                                                           (400, 100, 200, 200)]])
+        self.assertEqual(tiled.rects.tolist(), [[50, 250, 150, 150], [450, 250, 550, 150]])
+        self.assertAlmostEqual(tiled.sizes[0], 0.25 * 200 * 200 / (480 * 640), places=6)
@@ -5,17 +5,21 @@
 
 import unittest
 from os import path
+from unittest import mock
 
 # ================ Third Party Imports ================ #
 
 import cv2
+from numpy import zeros, array
 from imutils import rotate
 from skimage.metrics import structural_similarity
 
 # ================ User Imports ================ #
 
-from config import ROOT_DIR
+import config
 from image_manipulation import image_transformation
+from image_manipulation.InterpolationSelector import InterpolationSelector
+from image_manipulation.TransformationCache import TransformationCache
 from test.mocks.parsed_imu_data import imu_last_valid_data_mock_roll_60_deg
 
 # ================ Authorship ================ #
@@ -23,7 +27,13 @@ from test.mocks.parsed_imu_data import imu_last_valid_data_mock_roll_60_deg
 __author__ = "Gregory Sanchez"
 
 
-IMG_PATH = path.join(ROOT_DIR, 'image_manipulation/logitech_camera/data/frame129.jpg')
+IMG_PATH = path.join(config.ROOT_DIR, 'image_manipulation/logitech_camera/data/frame129.jpg')
+
+PITCH_AND_ROLL = {
+    'pitch': array(0.05),
+    'roll': array(1.0472),
+    'yaw': array(0.),
+}
 
 
 class TestImageTransformation(unittest.TestCase):
@@ -45,3 +55,175 @@ class TestImageTransformation(unittest.TestCase):
         print("SSIM: {0}".format(score))
 
         self.assertGreaterEqual(score, 0.99)
+
+    @mock.patch.object(config, 'USE_PITCH', True)
+    def test_cached_transformation(self):
+        """Test Cached Transformation
+            Ensures that repeated attitudes reuse the remap tables and match warpPerspective"""
+        img = cv2.imread(IMG_PATH)
+        image_transformation.transformation_cache.clear()
+
+        # The tables are built once the attitude repeats
+        image_transformation.rotate_image(img, PITCH_AND_ROLL)
+        self.assertEqual(len(image_transformation.transformation_cache), 0)
+        actual = image_transformation.rotate_image(img, PITCH_AND_ROLL)
+        image_transformation.rotate_image(img, PITCH_AND_ROLL)
+        self.assertEqual(len(image_transformation.transformation_cache), 1)
+        self.assertEqual(image_transformation.transformation_cache.hits, 1)
+
+        # The tables warp like warpPerspective at the quantized attitude
+        rows, cols = img.shape[:2]
+        (t, _, _) = image_transformation.get_cached_transformation(PITCH_AND_ROLL, (cols, rows))
+        expected = cv2.warpPerspective(img, t, (cols, rows), flags=cv2.INTER_LANCZOS4)
+
+        diff = cv2.absdiff(actual, expected)
+        self.assertLess(diff.mean(), 0.5)
+
+    def test_roll_fast_path(self):
+        """Test Roll Fast Path
+            Ensures that a pure roll is warped affinely like the full perspective warp"""
+        img = cv2.imread(IMG_PATH)
+        rows, cols = img.shape[:2]
+
+        actual = image_transformation.warp_image(img, imu_last_valid_data_mock_roll_60_deg, cv2.INTER_LANCZOS4)
+        t = image_transformation.get_transformation_matrix(imu_last_valid_data_mock_roll_60_deg,
+                                                           (cols / 2, rows / 2))
+        expected = cv2.warpPerspective(img, t, (cols, rows), flags=cv2.INTER_LANCZOS4)
+
+        self.assertLess(cv2.absdiff(actual, expected).mean(), 0.5)
+
+    def test_roll_dead_band(self):
+        """Test Roll Dead Band
+            Ensures that rolls within the dead band leave the image untouched"""
+        img = cv2.imread(IMG_PATH)
+        orientation = {'pitch': array(0.), 'roll': array(config.ROLL_DEAD_BAND / 2), 'yaw': array(0.)}
+
+        self.assertIs(image_transformation.rotate_image(img, orientation), img)
+
+    @mock.patch.object(config, 'USE_PITCH', True)
+    def test_warp_to_size(self):
+        """Test Warp To Size
+            Ensures that warping straight to a smaller size matches warping then resizing"""
+        img = cv2.imread(IMG_PATH)
+        dsize = (300, 300)
+
+        for orientation in (PITCH_AND_ROLL, imu_last_valid_data_mock_roll_60_deg):
+            actual = image_transformation.warp_image(img, orientation, cv2.INTER_LINEAR, dsize)
+            expected = cv2.resize(image_transformation.warp_image(img, orientation, cv2.INTER_LINEAR), dsize)
+
+            self.assertEqual(actual.shape, (300, 300, 3))
+            gray_a = cv2.cvtColor(actual, cv2.COLOR_BGR2GRAY)
+            gray_b = cv2.cvtColor(expected, cv2.COLOR_BGR2GRAY)
+            self.assertGreaterEqual(structural_similarity(gray_a, gray_b), 0.9)
+
+    @mock.patch.object(config, 'USE_PITCH', True)
+    def test_frame_homography(self):
+        """Test Frame Homography
+            Ensures that points mapped through the homography land where the warp moves the pixels"""
+        img = zeros((480, 640, 3), dtype='uint8')
+        img[100, 200] = 255
+
+        for orientation in (PITCH_AND_ROLL, imu_last_valid_data_mock_roll_60_deg):
+            h = image_transformation.get_frame_homography(orientation, (640, 480))
+            (x, y, w) = h @ [200, 100, 1]
+
+            warped = image_transformation.warp_image(img, orientation, cv2.INTER_LINEAR)
+            (_, _, _, (wx, wy)) = cv2.minMaxLoc(cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY))
+            self.assertLessEqual(abs(x / w - wx), 1)
+            self.assertLessEqual(abs(y / w - wy), 1)
+
+        level = {'pitch': array(0.), 'roll': array(0.), 'yaw': array(0.)}
+        self.assertIsNone(image_transformation.get_frame_homography(level, (640, 480)))
+
+
+class TestInterpolationSelector(unittest.TestCase):
+
+    def test_fixed_mode(self):
+        selector = InterpolationSelector('cubic')
+        selector.record('cubic', 1.0)
+        self.assertEqual(selector.select(), 'cubic')
+        self.assertEqual(selector.flag('cubic'), cv2.INTER_CUBIC)
+
+    def test_auto_mode_fits_budget(self):
+        selector = InterpolationSelector('auto', time_budget=0.01)
+        self.assertEqual(selector.select(), 'lanczos')
+
+        selector.record('lanczos', 0.05)
+        self.assertEqual(selector.select(), 'cubic')
+
+        selector.record('cubic', 0.02)
+        selector.record('linear', 0.005)
+        self.assertEqual(selector.select(), 'linear')
+
+        # Every tier over budget falls back to the fastest one
+        selector.record('linear', 0.5)
+        selector.record('nearest', 0.5)
+        self.assertEqual(selector.select(), 'nearest')
+
+    def test_auto_mode_probes_better_tier(self):
+        selector = InterpolationSelector('auto', time_budget=0.01, probe_interval=5)
+
+        # One slow lanczos warp, e.g. a cold first warp
+        selector.record(selector.select(), 0.5)
+        selections = [selector.select() for _ in range(3)]
+        self.assertEqual(selections, ['cubic'] * 3)
+        for name in selections:
+            selector.record(name, 0.005)
+
+        # Lanczos is measured again and is picked once it fits the budget
+        self.assertEqual(selector.select(), 'lanczos')
+        selector.record('lanczos', 0.008)
+        self.assertEqual(selector.select(), 'lanczos')
+
+    def test_auto_mode_per_size(self):
+        selector = InterpolationSelector('auto', time_budget=0.01)
+        selector.record('lanczos', 0.05, (1920, 1080))
+        self.assertEqual(selector.select((1920, 1080)), 'cubic')
+        self.assertEqual(selector.select((300, 300)), 'lanczos')
+
+    def test_no_warp_not_recorded(self):
+        selector = InterpolationSelector('auto')
+        img = zeros((20, 40, 3), dtype='uint8')
+        with mock.patch.object(image_transformation, 'interpolation_selector', selector):
+            # Within the roll dead band the frame is only resized
+            dead_band = {'pitch': array(0.), 'yaw': array(0.), 'roll': array(0.0001)}
+            image_transformation.rotate_image(img, dead_band, (20, 10))
+            self.assertEqual(selector.warp_times, {})
+
+            rolled = {'pitch': array(0.), 'yaw': array(0.), 'roll': array(0.1)}
+            image_transformation.rotate_image(img, rolled, (20, 10))
+            self.assertEqual(list(selector.warp_times), [(20, 10)])
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            InterpolationSelector('bilinear')
+
+
+class TestTransformationCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = TransformationCache(max_bytes=2 * 800)
+        build = lambda: (zeros(100),)  # 800 bytes
+
+        cache.get('a', build)
+        cache.get('b', build)
+        cache.get('a', build)  # 'a' becomes the most recently used
+        cache.get('c', build)  # evicts 'b'
+
+        self.assertEqual(list(cache.entries.keys()), ['a', 'c'])
+        self.assertEqual(cache.nbytes, 1600)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_min_requests(self):
+        cache = TransformationCache(max_bytes=2 * 800, max_pending=1)
+        build = lambda: (zeros(100),)
+
+        self.assertIsNone(cache.get('a', build, min_requests=2))
+        self.assertIsNotNone(cache.get('a', build, min_requests=2))
+        self.assertEqual(list(cache.entries.keys()), ['a'])
+
+        # Only the most recently requested keys are counted
+        cache.get('b', build, min_requests=2)
+        cache.get('c', build, min_requests=2)
+        self.assertIsNone(cache.get('b', build, min_requests=2))
+        self.assertEqual(len(cache), 1)
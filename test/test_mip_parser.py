@@ -0,0 +1,92 @@
+import unittest
+import os
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from config import ROOT_DIR
+from classes import mip_parser
+from test.mocks.parsed_imu_data import imu_data_mock
+
+MOCK_IMU_PATH = os.path.join(ROOT_DIR, 'test/mocks/IMU_timestamped_test_data.bin')
+
+
+def fletcher(packet):
+    sum1 = 0
+    sum2 = 0
+    for byte in packet:
+        sum1 = (sum1 + int(byte)) % 256
+        sum2 = (sum2 + sum1) % 256
+    return (sum1 << 8) + sum2
+
+
+class TestMipParser(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.buf = mip_parser.read_tail(MOCK_IMU_PATH, 5000)
+
+    def test_fletcher_checksums(self):
+        rng = np.random.RandomState(7)
+        buf = rng.randint(0, 256, size=2000).astype(np.uint8)
+        start = np.array([0, 10, 500, 1700])
+        length = np.array([4, 259, 60, 300])
+
+        actual = mip_parser.fletcher_checksums(buf, start, length)
+        expected = [fletcher(buf[s:s + n]) for (s, n) in zip(start, length)]
+        self.assertEqual(actual.tolist(), expected)
+
+    def test_parse_imu(self):
+        data = mip_parser.parse_imu(self.buf, parse_nuc_timestamps=True)
+
+        euler = data['IMU']['cf_euler_angles']
+        assert_allclose(euler['roll'], imu_data_mock['roll'][0], atol=1e-6)
+        assert_allclose(euler['pitch'], imu_data_mock['pitch'][0], atol=1e-6)
+        assert_allclose(euler['yaw'], imu_data_mock['yaw'][0], atol=1e-6)
+        assert_allclose(data['IMU']['nuc_time'], imu_data_mock['nuc_time'][:, 0], atol=1e-6)
+        assert_allclose(data['GNSS']['velocity_north_east_down_frame']['heading'],
+                        imu_data_mock['heading'][0], atol=1e-6)
+        self.assertEqual(data['units']['IMU']['cf_euler_angles']['roll'], 'radians')
+
+    def test_corrupt_packet_discarded(self):
+        header = mip_parser.find_headers(self.buf, parse_nuc_timestamps=True)
+        buf = self.buf.copy()
+
+        # Flip a payload byte of the first packet
+        buf[header['index'][0] + 6] ^= 0xFF
+        corrupt = mip_parser.find_headers(buf, parse_nuc_timestamps=True)
+
+        self.assertEqual(len(corrupt['index']), len(header['index']) - 1)
+        self.assertEqual(corrupt['index'].tolist(), header['index'][1:].tolist())
+
+    def test_empty_buffer(self):
+        self.assertEqual(mip_parser.parse_imu(b''), {})
+
+    def test_tail_reader_chunked(self):
+        full = np.fromfile(MOCK_IMU_PATH, dtype=np.uint8)[:60000]
+        expected = mip_parser.parse_imu(full, parse_nuc_timestamps=True)
+
+        rng = np.random.RandomState(3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'imu.bin')
+            open(path, 'wb').close()
+            reader = mip_parser.TailReader(path, parse_nuc_timestamps=True)
+
+            roll, nuc_time = [], []
+            written = 0
+            while written < len(full):
+                # Chunks small enough to split packets and timestamps
+                chunk = full[written:written + rng.randint(1, 400)]
+                with open(path, 'ab') as fd:
+                    fd.write(chunk.tobytes())
+                written += len(chunk)
+
+                data = reader.read()
+                if 'IMU' in data:
+                    roll.append(data['IMU']['cf_euler_angles']['roll'])
+                    nuc_time.append(data['IMU']['nuc_time'])
+            reader.close()
+
+        assert_allclose(np.concatenate(roll), expected['IMU']['cf_euler_angles']['roll'])
+        assert_allclose(np.concatenate(nuc_time), expected['IMU']['nuc_time'])
@@ -1,5 +1,6 @@
 import unittest
-from classes.object_position_processing import calculate_angle
+import numpy as np
+from classes.object_position_processing import angle_table, calculate_angle, calculate_angles
 
 
 class TestObjectPositionProcessing(unittest.TestCase):
@@ -22,3 +23,17 @@ class TestObjectPositionProcessing(unittest.TestCase):
         object_x = 500
         object_y = 700
         self.assertTrue(calculate_angle(width, height, viewport_angle, object_x) == -9.396673759624047)
+
+    def test_calculate_angles(self):
+        width = 1920
+        # focal length of 1000 pixels
+        centroids_x = np.array([960, 1960, -40, 0, 1919])
+        angles = calculate_angles(centroids_x, width, focal_length=1000, sensor_width=1920)
+
+        expected = np.degrees(np.arctan((centroids_x - 960) / 1000))
+        np.testing.assert_allclose(angles, expected)
+        self.assertEqual(angles[0], 0)
+        self.assertAlmostEqual(angles[1], 45)
+
+        # the table is computed once per width and camera
+        self.assertIs(angle_table(width, 1000, 1920), angle_table(width, 1000, 1920))
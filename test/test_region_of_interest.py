@@ -0,0 +1,64 @@
+""" Python Unit Test for the Region Of Interest
+"""
+
+# ================ Built-in Imports ================ #
+
+import unittest
+from math import tan
+from unittest import mock
+
+# ================ Third Party Imports ================ #
+
+from numpy import array
+from numpy.linalg import inv
+
+# ================ User Imports ================ #
+
+import config
+from image_manipulation import image_transformation
+from image_manipulation.region_of_interest import horizon_band, band_tiles
+
+
+class TestRegionOfInterest(unittest.TestCase):
+
+    def test_level_horizon_band(self):
+        # A level horizon is on the middle row
+        self.assertEqual(horizon_band(None, (1920, 1080), 0.15), (378, 702))
+        self.assertEqual(horizon_band(None, (1920, 1080), 1), (0, 1080))
+
+    def test_rolled_horizon_band(self):
+        # The band of a rolled frame covers the tilted horizon
+        roll = {'pitch': array(0.), 'roll': array(0.2), 'yaw': array(0.)}
+        (top, bottom) = horizon_band(roll, (1920, 1080), 0.05)
+
+        # the ends of the horizon are half the width times tan(0.2) off the middle row
+        self.assertAlmostEqual(top, 540 - 195 - 54, delta=1)
+        self.assertAlmostEqual(bottom, 540 + 195 + 54, delta=1)
+
+        # it matches the horizon of the orientation correction
+        h = image_transformation.get_frame_homography(roll, (1920, 1080))
+        ends = array([[0, 540, 1], [1920, 540, 1]]) @ inv(h).T
+        ys = ends[:, 1] / ends[:, 2]
+        self.assertAlmostEqual(top, ys.min() - 54, delta=6)
+
+    @mock.patch.object(config, 'USE_PITCH', False)
+    def test_pitched_horizon_band(self):
+        # The horizon moves f * tan(pitch) rows even when the correction ignores the pitch
+        pitch = {'pitch': array(0.1), 'roll': array(0.), 'yaw': array(0.)}
+        f = config.CAM_FOCAL_LENGTH / config.CAM_SENSOR_WIDTH * 1920
+        row = 540 + f * tan(0.1)
+
+        self.assertEqual(horizon_band(pitch, (1920, 1080), 0.05), (int(row - 54), int(row + 54)))
+
+    def test_band_tiles(self):
+        tiles = band_tiles((378, 702), (1920, 1080), 300, 0.2)
+
+        # square tiles as high as the band, overlapping across the whole width
+        self.assertTrue(all((y, w, h) == (378, 324, 324) for (_, y, w, h) in tiles))
+        self.assertEqual(tiles[0][0], 0)
+        self.assertEqual(tiles[-1][0] + 324, 1920)
+        gaps = [b[0] - a[0] for (a, b) in zip(tiles, tiles[1:])]
+        self.assertLessEqual(max(gaps), 324 * 0.8)
+
+        # a band thinner than a tile is centered in a tile that stays in the frame
+        self.assertEqual(band_tiles((1070, 1080), (1920, 1080), 300, 0.2)[0][1:], (780, 300, 300))
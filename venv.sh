@@ -19,15 +19,4 @@ fi
 $python -m $pip install --upgrade pip
 $python -m pip install -r requirements.txt
 
-# Set the matlab_root_dir to the root directory of the system's Matlab installation
-matlab_root_dir=/usr/local/MATLAB/R2018b
-matlab_python_dir=$matlab_root_dir/extern/engines/python
-
-# Set the absolute_path_to_venv to the absolute path to the (to be) venv directory
-absolute_path_to_venv="/home/max/temp/AVVS/venv"
-
-cd "$matlab_python_dir"
-$python setup.py install --prefix="$absolute_path_to_venv"
-cd -
-
 deactivate